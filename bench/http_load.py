@@ -0,0 +1,286 @@
+# bench/http_load.py
+# HTTP load test for the core and portfolio read APIs against a seeded throwaway database
+#   python -m bench.http_load --dsn postgresql://localhost/gsa_bench --reset-db
+#   python -m bench.http_load --dsn ... --reset-db --concurrency 1,4,16,64 --duration 15 --workers 2
+#   python -m bench.http_load --dsn ... --asgi            # in-process (no sockets, no uvicorn)
+#   python -m bench.http_load --core-url http://127.0.0.1:8000 --portfolio-url http://127.0.0.1:8001 \
+#       --admin-token $ADMIN_TOKEN                          # already-running servers, no seeding
+# Seeds odds_raw with synthetic snapshots (bench.payloads), normalizes them into odds_norm, starts
+# services.core.app and services.portfolio.app under uvicorn, then drives each endpoint with a closed
+# loop of N clients for --duration seconds per level. Reports requests/s, p50/p95/p99 and error rate.
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import secrets
+import socket
+import subprocess
+import sys
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from .ingest_load import _latency
+from .payloads import DEFAULT_MARKETS, PayloadGenerator
+from .run import BENCH_DDL, RESET_SQL, RESULTS_DIR, _git_sha
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# name -> (service, path, needs admin token)
+ENDPOINTS: Dict[str, Tuple[str, str, bool]] = {
+    "core_latest_lines": ("core", "/core/latest-lines?limit=50", False),
+    "core_latest_lines_sport": ("core", "/core/latest-lines?sport=americanfootball_nfl&limit=200", False),
+    "core_metrics": ("core", "/core/metrics", False),
+    "portfolio_norm_counts": ("portfolio", "/admin/norm_counts", True),
+}
+APPS = {"core": "services.core.app:app", "portfolio": "services.portfolio.app:app"}
+
+
+# --------------------------------------------------------------------------------------
+# Seeding
+# --------------------------------------------------------------------------------------
+
+async def seed(args: argparse.Namespace) -> Dict[str, int]:
+    """odds_raw snapshots for every bench sport + the core views + odds_norm via normalize_from_raw.
+
+    The portfolio pool stays open under --asgi: psycopg_pool can't reopen a closed pool and the
+    in-process app reuses this module instance.
+    """
+    import asyncpg
+
+    from services.db.create_views import SQL as VIEWS_SQL
+    from services.ingestor import ingest_odds
+    from services.portfolio import app as portfolio
+
+    conn = await asyncpg.connect(args.dsn)
+    try:
+        await ingest_odds.ensure_schema(conn)
+        await conn.execute(BENCH_DDL)
+        await conn.execute(VIEWS_SQL)
+        existing = await conn.fetchval("SELECT count(*) FROM public.odds_raw")
+        if existing and not args.reset_db:
+            raise SystemExit(f"odds_raw has {existing} rows; pass --reset-db to truncate (throwaway DBs only)")
+        await conn.execute(RESET_SQL)
+        for sport in ("americanfootball_nfl", "basketball_nba"):
+            gen = PayloadGenerator(sport, games=args.games, books=args.books, markets=DEFAULT_MARKETS, seed=args.seed)
+            for snap in gen.snapshots(args.snapshots):
+                await ingest_odds.write_batch(conn, sport, snap, False)
+        raw = await conn.fetchval("SELECT count(*) FROM public.odds_raw")
+    finally:
+        await conn.close()
+
+    await portfolio._ensure_pool_open()
+    try:
+        await portfolio.normalize_from_raw(
+            _="bench", dry_run=False, limit=10000, projection=False, stream=True, chunk=500, reset_cursor=True
+        )
+    finally:
+        if not args.asgi:
+            await portfolio.pool.close()
+    return {"odds_raw": int(raw)}
+
+
+# --------------------------------------------------------------------------------------
+# Targets
+# --------------------------------------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@asynccontextmanager
+async def _spawned(service: str, env: Dict[str, str], workers: int) -> AsyncIterator[str]:
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", APPS[service], "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base, timeout=2) as c:
+            for _ in range(150):
+                if proc.poll() is not None:
+                    raise SystemExit(f"{service} exited with {proc.returncode}")
+                try:
+                    if (await c.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.2)
+            else:
+                raise SystemExit(f"{service} did not become healthy on {base}")
+        yield base
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+@asynccontextmanager
+async def _in_process(service: str) -> AsyncIterator[httpx.ASGITransport]:
+    # env (DATABASE_URL, ADMIN_TOKEN) is already set; run the app's startup/shutdown handlers by hand
+    import importlib
+
+    mod = importlib.import_module(APPS[service].split(":")[0])
+    await mod.app.router.startup()
+    try:
+        yield httpx.ASGITransport(app=mod.app)
+    finally:
+        await mod.app.router.shutdown()
+
+
+# --------------------------------------------------------------------------------------
+# Load loop
+# --------------------------------------------------------------------------------------
+
+async def _level(client: httpx.AsyncClient, path: str, concurrency: int, duration: float) -> Dict[str, Any]:
+    lat: List[float] = []
+    statuses: Dict[str, int] = {}
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                r = await client.get(path)
+                code = str(r.status_code)
+            except httpx.HTTPError as e:
+                code = type(e).__name__
+            dt = time.perf_counter() - t0
+            statuses[code] = statuses.get(code, 0) + 1
+            if code == "200":
+                lat.append(dt)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    total = len(lat) + errors
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "requests_per_s": round(len(lat) / wall, 1) if wall else None,
+        "error_rate": round(errors / total, 4) if total else None,
+        "statuses": statuses,
+        **_latency(lat),
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    names = [n.strip() for n in args.endpoints.split(",") if n.strip()]
+    unknown = [n for n in names if n not in ENDPOINTS]
+    if unknown:
+        raise SystemExit(f"unknown endpoints {unknown}; known: {sorted(ENDPOINTS)}")
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    urls = {"core": args.core_url, "portfolio": args.portfolio_url}
+    token = args.admin_token or secrets.token_hex(32)
+    seeded: Optional[Dict[str, int]] = None
+
+    if args.dsn:
+        # config is read at import time by both apps (and by seed())
+        os.environ["DATABASE_URL"] = args.dsn
+        os.environ["ADMIN_TOKEN"] = token
+        os.environ.setdefault("SLOW_QUERY_EXPLAIN_SAMPLE", "0")
+        if not args.no_seed:
+            seeded = await seed(args)
+    elif not all(urls[ENDPOINTS[n][0]] for n in names):
+        raise SystemExit("pass --dsn to start the apps locally, or --core-url/--portfolio-url for running ones")
+
+    results: Dict[str, Any] = {}
+    async with AsyncExitStack() as stack:
+        clients: Dict[str, httpx.AsyncClient] = {}
+        limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+        for service in sorted({ENDPOINTS[n][0] for n in names}):
+            kw: Dict[str, Any] = {"timeout": args.timeout, "limits": limits}
+            if urls[service]:
+                kw["base_url"] = urls[service]
+            elif args.asgi:
+                kw["base_url"] = "http://bench"
+                kw["transport"] = await stack.enter_async_context(_in_process(service))
+            else:
+                env = {**os.environ, "PYTHONPATH": str(ROOT)}
+                kw["base_url"] = await stack.enter_async_context(_spawned(service, env, args.workers))
+            clients[service] = await stack.enter_async_context(httpx.AsyncClient(**kw))
+
+        for name in names:
+            service, path, admin = ENDPOINTS[name]
+            client = clients[service]
+            client.headers.pop("authorization", None)
+            if admin:
+                client.headers["authorization"] = f"Bearer {token}"
+            await _level(client, path, 1, args.warmup)
+            results[name] = []
+            for c in levels:
+                lv = await _level(client, path, c, args.duration)
+                results[name].append(lv)
+                print(
+                    f"{name:26} c={c:<4} {lv['requests_per_s'] or 0:>8.1f} req/s  p50={lv['p50_ms'] or 0:>7.1f}  "
+                    f"p95={lv['p95_ms'] or 0:>7.1f}  p99={lv['p99_ms'] or 0:>7.1f} ms  err={lv['error_rate'] or 0:.2%}",
+                    file=sys.stderr,
+                )
+
+    return {
+        "meta": {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "git_sha": _git_sha(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mode": "external" if not args.dsn else ("asgi" if args.asgi else f"uvicorn x{args.workers}"),
+            "duration_s": args.duration,
+            "concurrency": levels,
+            "seeded": seeded,
+            "games_per_sport": args.games,
+            "snapshots": args.snapshots,
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test core/portfolio read endpoints at several concurrency levels.")
+    parser.add_argument("--dsn", default=None, help="throwaway Postgres to seed and serve from")
+    parser.add_argument("--reset-db", action="store_true", help="allow truncating odds_raw/odds_norm in --dsn")
+    parser.add_argument("--no-seed", action="store_true", help="serve --dsn as-is")
+    parser.add_argument("--games", type=int, default=60, help="games per sport when seeding")
+    parser.add_argument("--books", type=int, default=8)
+    parser.add_argument("--snapshots", type=int, default=6, help="odds_raw snapshots per sport when seeding")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--concurrency", default="1,4,16,64")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per endpoint per level")
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers per spawned app")
+    parser.add_argument("--asgi", action="store_true", help="call the apps in-process instead of spawning uvicorn")
+    parser.add_argument("--core-url", default=None)
+    parser.add_argument("--portfolio-url", default=None)
+    parser.add_argument("--admin-token", default=os.getenv("ADMIN_TOKEN"))
+    parser.add_argument("--out", default=None, help="result JSON path (default bench/results/http-<utc>.json)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    out = Path(args.out) if args.out else RESULTS_DIR / f"http-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(json.dumps({k: [(lv["concurrency"], lv["requests_per_s"]) for lv in v] for k, v in report["results"].items()}))
+    print(f"\nwrote {out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
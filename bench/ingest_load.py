@@ -0,0 +1,191 @@
+# bench/ingest_load.py
+# End-to-end ingest load driver (fetch_odds -> write_batch) against a local Odds API replay server
+#   python -m bench.odds_replay --port 8787 --latency-ms 150 --jitter-ms 50 &
+#   python -m bench.ingest_load --base-url http://127.0.0.1:8787 --concurrency 1,2,4,8 --iterations 40
+#   python -m bench.ingest_load --dsn postgresql://localhost/gsa_bench --reset-db    # real odds_raw writes
+# Each concurrency level runs `iterations` ingest cycles spread over --sports; reports throughput and
+# p50/p95/p99 for fetch, write and end-to-end. Results are written as JSON next to bench.run's.
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .fakes import FakeAsyncpgConnection
+from .run import RESULTS_DIR, _git_sha
+
+RESET_SQL = "TRUNCATE public.odds_raw RESTART IDENTITY"
+
+
+def _pct(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    s = sorted(values)
+    i = min(len(s) - 1, max(0, int(round(q * (len(s) - 1)))))
+    return round(s[i] * 1000, 2)
+
+
+def _latency(values: List[float]) -> Dict[str, Any]:
+    return {
+        "p50_ms": _pct(values, 0.50),
+        "p95_ms": _pct(values, 0.95),
+        "p99_ms": _pct(values, 0.99),
+        "mean_ms": round(statistics.fmean(values) * 1000, 2) if values else None,
+        "max_ms": round(max(values) * 1000, 2) if values else None,
+    }
+
+
+async def _level(args: argparse.Namespace, ingest_odds: Any, concurrency: int, pool: Any) -> Dict[str, Any]:
+    sports = [s.strip() for s in args.sports.split(",") if s.strip()]
+    jobs: asyncio.Queue = asyncio.Queue()
+    for i in range(args.iterations):
+        jobs.put_nowait(sports[i % len(sports)])
+
+    fetch_s: List[float] = []
+    write_s: List[float] = []
+    total_s: List[float] = []
+    errors: Dict[str, int] = {}
+    games = rows = 0
+    quota_used: Optional[str] = None
+
+    async def worker() -> None:
+        nonlocal games, rows, quota_used
+        while True:
+            try:
+                sport = jobs.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            t0 = time.perf_counter()
+            try:
+                payload, hdrs = await ingest_odds.fetch_odds(sport, args.regions, args.markets)
+            except Exception as e:
+                key = str(e).split(":", 1)[0]
+                errors[key] = errors.get(key, 0) + 1
+                continue
+            t1 = time.perf_counter()
+            if pool is None:
+                await ingest_odds.write_batch(FakeAsyncpgConnection(), sport, payload, False)
+            else:
+                async with pool.acquire() as conn:
+                    await ingest_odds.write_batch(conn, sport, payload, False)
+            t2 = time.perf_counter()
+            fetch_s.append(t1 - t0)
+            write_s.append(t2 - t1)
+            total_s.append(t2 - t0)
+            games += len(payload)
+            rows += sum(len(m.get("outcomes") or []) for g in payload for b in g.get("bookmakers") or []
+                        for m in b.get("markets") or [])
+            quota_used = hdrs.get("x-requests-used", quota_used)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "iterations": args.iterations,
+        "ok": len(total_s),
+        "errors": errors,
+        "wall_s": round(wall, 4),
+        "requests_per_s": round(len(total_s) / wall, 2) if wall else None,
+        "games_per_s": round(games / wall, 1) if wall else None,
+        "rows_per_s": round(rows / wall, 1) if wall else None,
+        "fetch": _latency(fetch_s),
+        "write": _latency(write_s),
+        "end_to_end": _latency(total_s),
+        "quota_used": quota_used,
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from services.ingestor import ingest_odds
+
+    # ingest_odds loads .env.local with override=True at import, so point it at the replay server afterwards
+    ingest_odds.ODDS_API_BASE_URL = args.base_url.rstrip("/")
+    ingest_odds.ODDS_API_KEY = args.api_key
+
+    pool = None
+    if args.dsn:
+        import asyncpg
+
+        pool = await asyncpg.create_pool(args.dsn, min_size=1, max_size=max(int(c) for c in args.concurrency.split(",")))
+        async with pool.acquire() as conn:
+            await ingest_odds.ensure_schema(conn)
+            existing = await conn.fetchval("SELECT count(*) FROM public.odds_raw")
+            if existing and not args.reset_db:
+                await pool.close()
+                raise SystemExit(f"odds_raw has {existing} rows; pass --reset-db to truncate (throwaway DBs only)")
+
+    levels = []
+    try:
+        for c in (int(x) for x in args.concurrency.split(",") if x.strip()):
+            if pool is not None and args.reset_db:
+                await pool.execute(RESET_SQL)
+            levels.append(await _level(args, ingest_odds, c, pool))
+    finally:
+        if pool is not None:
+            if args.reset_db:
+                await pool.execute(RESET_SQL)
+            await pool.close()
+
+    return {
+        "meta": {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "git_sha": _git_sha(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": "postgres" if args.dsn else "fake",
+            "base_url": args.base_url,
+            "sports": args.sports,
+            "markets": args.markets,
+            "regions": args.regions,
+        },
+        "levels": levels,
+    }
+
+
+def _print(report: Dict[str, Any]) -> None:
+    print(f"{'conc':>5} {'ok':>6} {'err':>5} {'req/s':>8} {'games/s':>10} {'e2e p50':>9} {'p95':>9} {'p99':>9} {'write p95':>10}")
+    for lv in report["levels"]:
+        e2e, w = lv["end_to_end"], lv["write"]
+        print(
+            f"{lv['concurrency']:>5} {lv['ok']:>6} {sum(lv['errors'].values()):>5} {lv['requests_per_s'] or 0:>8.1f} "
+            f"{lv['games_per_s'] or 0:>10,.0f} {e2e['p50_ms'] or 0:>9.1f} {e2e['p95_ms'] or 0:>9.1f} "
+            f"{e2e['p99_ms'] or 0:>9.1f} {w['p95_ms'] or 0:>10.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test fetch_odds + write_batch against a local Odds API replay.")
+    parser.add_argument("--base-url", default=os.getenv("ODDS_API_BASE_URL", "http://127.0.0.1:8787"))
+    parser.add_argument("--api-key", default="replay")
+    parser.add_argument("--sports", default="americanfootball_nfl,basketball_nba")
+    parser.add_argument("--regions", default="us")
+    parser.add_argument("--markets", default="h2h,spreads,totals")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="comma-separated levels to sweep")
+    parser.add_argument("--iterations", type=int, default=40, help="ingest cycles per concurrency level")
+    parser.add_argument("--dsn", default=None, help="throwaway Postgres; default writes to an in-memory fake")
+    parser.add_argument("--reset-db", action="store_true", help="allow truncating odds_raw in --dsn")
+    parser.add_argument("--out", default=None, help="result JSON path (default bench/results/ingest-<utc>.json)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    _print(report)
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"ingest-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"\nwrote {out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
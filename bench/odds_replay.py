@@ -0,0 +1,223 @@
+# bench/odds_replay.py
+# Local stand-in for the Odds API v4, for ingest load tests that spend no quota
+#   python -m bench.odds_replay --port 8787                          # synthetic payloads
+#   python -m bench.odds_replay --record-dir recordings/ --latency-ms 120 --jitter-ms 80
+#   python -m bench.odds_replay --error-rate 0.02 --rate-limit 10 --quota 500
+# Then run ingestion with ODDS_API_BASE_URL=http://127.0.0.1:8787
+#
+# Serves GET /v4/sports, /v4/sports/{sport}/events and /v4/sports/{sport}/odds with x-requests-* quota headers.
+# Recorded layout (optional): <dir>/sports.json and <dir>/<sport_key>/*.json (one odds response per
+# file, replayed in name order and looped). Sports without recordings get synthetic snapshots.
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+
+from .payloads import DEFAULT_MARKETS, SPORTS, PayloadGenerator, _iso
+
+# /v4/sports entries for leagues the generator doesn't model (listed, never served odds)
+OFF_SEASON = [
+    {"key": "baseball_mlb", "group": "Baseball", "title": "MLB", "description": "Major League Baseball",
+     "active": False, "has_outrights": False},
+    {"key": "icehockey_nhl", "group": "Ice Hockey", "title": "NHL", "description": "US Ice Hockey",
+     "active": True, "has_outrights": False},
+    {"key": "americanfootball_nfl_super_bowl_winner", "group": "American Football",
+     "title": "NFL Super Bowl Winner", "description": "Super Bowl Winner 2025/2026",
+     "active": True, "has_outrights": True},
+]
+
+
+@dataclass
+class ReplayConfig:
+    games: int = 16
+    books: int = 8
+    seed: int = 42
+    record_dir: Optional[Path] = None
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    rate_limit: float = 0.0  # requests/second across all clients; 0 = unlimited
+    quota: int = 20000
+    snapshot_minutes: int = 10
+
+
+@dataclass
+class _State:
+    used: int = 0
+    served: int = 0
+    errors: int = 0
+    throttled: int = 0
+    tokens: float = 0.0
+    refill_at: float = field(default_factory=time.monotonic)
+    cursors: Dict[str, int] = field(default_factory=dict)
+
+
+def _sports_catalog(cfg: ReplayConfig) -> List[Dict[str, Any]]:
+    if cfg.record_dir and (cfg.record_dir / "sports.json").exists():
+        return json.loads((cfg.record_dir / "sports.json").read_text())
+    out = [
+        {"key": k, "group": v["title"], "title": v["title"], "description": v["title"], "active": True,
+         "has_outrights": False}
+        for k, v in SPORTS.items()
+    ]
+    return out + OFF_SEASON
+
+
+def create_app(cfg: ReplayConfig) -> FastAPI:
+    app = FastAPI(title="Odds API replay")
+    state = _State(tokens=cfg.rate_limit)
+    rng = random.Random(cfg.seed)
+    generators: Dict[str, PayloadGenerator] = {}
+    recordings: Dict[str, List[Path]] = {}
+    if cfg.record_dir:
+        for d in sorted(p for p in cfg.record_dir.iterdir() if p.is_dir()):
+            files = sorted(d.glob("*.json"))
+            if files:
+                recordings[d.name] = files
+    catalog = _sports_catalog(cfg)
+
+    def _headers(cost: int) -> Dict[str, str]:
+        return {
+            "x-requests-used": str(state.used),
+            "x-requests-remaining": str(max(0, cfg.quota - state.used)),
+            "x-requests-last": str(cost),
+        }
+
+    async def _gate() -> Optional[JSONResponse]:
+        """Latency, token-bucket rate limit and random failures, applied before any payload work."""
+        if cfg.latency_ms or cfg.jitter_ms:
+            await asyncio.sleep(max(0.0, cfg.latency_ms + rng.uniform(-cfg.jitter_ms, cfg.jitter_ms)) / 1000)
+        if cfg.rate_limit > 0:
+            now = time.monotonic()
+            state.tokens = min(cfg.rate_limit, state.tokens + (now - state.refill_at) * cfg.rate_limit)
+            state.refill_at = now
+            if state.tokens < 1:
+                state.throttled += 1
+                return JSONResponse({"message": "Too many requests"}, status_code=429, headers={"retry-after": "1"})
+            state.tokens -= 1
+        if cfg.error_rate and rng.random() < cfg.error_rate:
+            state.errors += 1
+            return JSONResponse({"message": "Internal error (injected)"}, status_code=500)
+        return None
+
+    @app.get("/v4/sports")
+    async def sports(apiKey: str = Query(...), all: bool = Query(False)) -> JSONResponse:
+        blocked = await _gate()
+        if blocked:
+            return blocked
+        state.served += 1
+        body = catalog if all else [s for s in catalog if s.get("active")]
+        return JSONResponse(body, headers=_headers(0))  # the sports list is free upstream too
+
+    @app.get("/v4/sports/{sport}/odds")
+    async def odds(
+        sport: str,
+        apiKey: str = Query(...),
+        regions: str = Query("us"),
+        markets: str = Query(",".join(DEFAULT_MARKETS)),
+        oddsFormat: str = Query("american"),
+        dateFormat: str = Query("iso"),
+    ) -> JSONResponse:
+        blocked = await _gate()
+        if blocked:
+            return blocked
+        mkts = [m for m in markets.split(",") if m]
+        cost = max(1, len(mkts)) * max(1, len([r for r in regions.split(",") if r]))
+        if state.used + cost > cfg.quota:
+            return JSONResponse(
+                {"message": "Usage quota has been reached", "error_code": "OUT_OF_USAGE_CREDITS"},
+                status_code=401, headers=_headers(0),
+            )
+        state.used += cost
+        state.served += 1
+
+        if sport in recordings:
+            files = recordings[sport]
+            i = state.cursors.get(sport, 0)
+            state.cursors[sport] = i + 1
+            return JSONResponse(json.loads(files[i % len(files)].read_text()), headers=_headers(cost))
+        if sport not in SPORTS:
+            return JSONResponse([], headers=_headers(cost))
+
+        gen = generators.get(sport)
+        if gen is None:
+            gen = generators[sport] = PayloadGenerator(
+                sport, games=cfg.games, books=cfg.books, markets=mkts, seed=cfg.seed
+            )
+        n = state.cursors.get(sport, 0)
+        state.cursors[sport] = n + 1
+        body = gen.snapshot(gen.start + n * timedelta(minutes=cfg.snapshot_minutes))
+        return JSONResponse(body, headers=_headers(cost))
+
+    @app.get("/v4/sports/{sport}/events")
+    async def events(sport: str, apiKey: str = Query(...)) -> JSONResponse:
+        blocked = await _gate()
+        if blocked:
+            return blocked
+        state.served += 1
+        if sport not in SPORTS:
+            return JSONResponse([], headers=_headers(0))
+        gen = generators.get(sport)
+        if gen is None:
+            gen = generators[sport] = PayloadGenerator(sport, games=cfg.games, books=cfg.books, seed=cfg.seed)
+        # schedule shifted to start now, so discovery sees upcoming games
+        shift = datetime.now(timezone.utc) - gen.start
+        body = [
+            {"id": g["id"], "sport_key": g["sport_key"], "sport_title": g.get("sport_title"),
+             "commence_time": _iso(datetime.fromisoformat(g["commence_time"].replace("Z", "+00:00")) + shift),
+             "home_team": g["home_team"], "away_team": g["away_team"]}
+            for g in gen.snapshot(gen.start)
+        ]
+        return JSONResponse(body, headers=_headers(0))  # free upstream
+
+    @app.get("/__stats")
+    async def stats() -> Dict[str, Any]:
+        return {
+            "served": state.served,
+            "errors": state.errors,
+            "throttled": state.throttled,
+            "quota_used": state.used,
+            "quota_remaining": max(0, cfg.quota - state.used),
+        }
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve recorded or synthetic Odds API v4 responses locally.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--games", type=int, default=16)
+    parser.add_argument("--books", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--record-dir", type=Path, default=None)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests/second before 429s; 0 = off")
+    parser.add_argument("--quota", type=int, default=20000)
+    args = parser.parse_args()
+
+    cfg = ReplayConfig(
+        games=args.games, books=args.books, seed=args.seed, record_dir=args.record_dir,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        rate_limit=args.rate_limit, quota=args.quota,
+    )
+    uvicorn.run(create_app(cfg), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
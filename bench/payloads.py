@@ -0,0 +1,180 @@
+# bench/payloads.py
+# Seeded generator of realistic Odds API v4 payloads (GET /v4/sports/{sport}/odds shape)
+# - Same seed -> byte-identical payloads, so benchmark runs are reproducible offline
+# - Prices follow a small random walk across snapshots to mimic line movement
+
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+SPORTS: Dict[str, Dict[str, Any]] = {
+    "americanfootball_nfl": {
+        "title": "NFL",
+        "spread": (1.5, 10.5),
+        "total": (37.5, 54.5),
+        "teams": [
+            "Arizona Cardinals", "Atlanta Falcons", "Baltimore Ravens", "Buffalo Bills", "Carolina Panthers",
+            "Chicago Bears", "Cincinnati Bengals", "Cleveland Browns", "Dallas Cowboys", "Denver Broncos",
+            "Detroit Lions", "Green Bay Packers", "Houston Texans", "Indianapolis Colts", "Jacksonville Jaguars",
+            "Kansas City Chiefs", "Las Vegas Raiders", "Los Angeles Chargers", "Los Angeles Rams", "Miami Dolphins",
+            "Minnesota Vikings", "New England Patriots", "New Orleans Saints", "New York Giants", "New York Jets",
+            "Philadelphia Eagles", "Pittsburgh Steelers", "San Francisco 49ers", "Seattle Seahawks",
+            "Tampa Bay Buccaneers", "Tennessee Titans", "Washington Commanders",
+        ],
+    },
+    "basketball_nba": {
+        "title": "NBA",
+        "spread": (1.5, 12.5),
+        "total": (205.5, 242.5),
+        "teams": [
+            "Atlanta Hawks", "Boston Celtics", "Brooklyn Nets", "Charlotte Hornets", "Chicago Bulls",
+            "Cleveland Cavaliers", "Dallas Mavericks", "Denver Nuggets", "Detroit Pistons", "Golden State Warriors",
+            "Houston Rockets", "Indiana Pacers", "Los Angeles Clippers", "Los Angeles Lakers", "Memphis Grizzlies",
+            "Miami Heat", "Milwaukee Bucks", "Minnesota Timberwolves", "New Orleans Pelicans", "New York Knicks",
+            "Oklahoma City Thunder", "Orlando Magic", "Philadelphia 76ers", "Phoenix Suns", "Portland Trail Blazers",
+            "Sacramento Kings", "San Antonio Spurs", "Toronto Raptors", "Utah Jazz", "Washington Wizards",
+        ],
+    },
+}
+
+BOOKS = [
+    ("draftkings", "DraftKings"), ("fanduel", "FanDuel"), ("betmgm", "BetMGM"), ("caesars", "Caesars"),
+    ("pointsbetus", "PointsBet (US)"), ("betrivers", "BetRivers"), ("wynnbet", "WynnBET"), ("unibet_us", "Unibet"),
+    ("bovada", "Bovada"), ("mybookieag", "MyBookie.ag"), ("betonlineag", "BetOnline.ag"), ("lowvig", "LowVig.ag"),
+    ("betus", "BetUS"), ("superbook", "SuperBook"), ("williamhill_us", "William Hill (US)"), ("espnbet", "ESPN BET"),
+]
+
+DEFAULT_MARKETS = ("h2h", "spreads", "totals")
+
+
+def _iso(ts: datetime) -> str:
+    return ts.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _american(p: float) -> int:
+    """Fair win probability -> American odds, rounded like books do."""
+    p = min(max(p, 0.02), 0.98)
+    if p >= 0.5:
+        return -int(round(100 * p / (1 - p) / 5) * 5)
+    return int(round(100 * (1 - p) / p / 5) * 5)
+
+
+class PayloadGenerator:
+    """Generates Odds API events for one sport; prices drift between successive snapshots."""
+
+    def __init__(
+        self,
+        sport: str = "americanfootball_nfl",
+        games: int = 16,
+        books: int = 8,
+        markets: Sequence[str] = DEFAULT_MARKETS,
+        seed: int = 42,
+        start: Optional[datetime] = None,
+    ) -> None:
+        if sport not in SPORTS:
+            raise ValueError(f"unknown sport {sport!r}; known: {sorted(SPORTS)}")
+        self.sport = sport
+        self.meta = SPORTS[sport]
+        self.n_games = games
+        self.books = BOOKS[: max(1, min(books, len(BOOKS)))]
+        self.markets = list(markets)
+        self.rng = random.Random(seed)
+        self.start = start or datetime(2025, 9, 1, 12, 0, tzinfo=timezone.utc)
+        self._events = [self._event(i) for i in range(games)]
+
+    def _event(self, i: int) -> Dict[str, Any]:
+        rng = self.rng
+        home, away = rng.sample(self.meta["teams"], 2)
+        lo, hi = self.meta["spread"]
+        tlo, thi = self.meta["total"]
+        return {
+            "id": hashlib.md5(f"{self.sport}:{i}:{rng.random()}".encode()).hexdigest(),
+            "home": home,
+            "away": away,
+            "commence": self.start + timedelta(days=3 + i // 8, hours=rng.choice([13, 16, 20])),
+            "p_home": rng.uniform(0.3, 0.75),
+            "spread": round(rng.uniform(lo, hi) * 2) / 2,
+            "total": round(rng.uniform(tlo, thi) * 2) / 2,
+        }
+
+    def _outcomes(self, ev: Dict[str, Any], market: str, rng: random.Random) -> List[Dict[str, Any]]:
+        # each book shades the fair line a little
+        p = min(max(ev["p_home"] + rng.gauss(0, 0.015), 0.05), 0.95)
+        if market == "h2h":
+            vig = rng.uniform(0.015, 0.03)
+            return [
+                {"name": ev["home"], "price": _american(p + vig)},
+                {"name": ev["away"], "price": _american(1 - p + vig)},
+            ]
+        if market == "spreads":
+            pt = ev["spread"] if p < 0.5 else -ev["spread"]
+            return [
+                {"name": ev["home"], "price": rng.choice([-115, -110, -110, -105]), "point": pt},
+                {"name": ev["away"], "price": rng.choice([-115, -110, -110, -105]), "point": -pt},
+            ]
+        if market == "totals":
+            pt = ev["total"] + rng.choice([-0.5, 0, 0, 0.5])
+            return [
+                {"name": "Over", "price": rng.choice([-115, -110, -105]), "point": pt},
+                {"name": "Under", "price": rng.choice([-115, -110, -105]), "point": pt},
+            ]
+        return [{"name": ev["home"], "price": _american(p)}, {"name": ev["away"], "price": _american(1 - p)}]
+
+    def snapshot(self, at: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """One /v4/sports/{sport}/odds response; advances the line random walk."""
+        rng = self.rng
+        at = at or self.start
+        out = []
+        for ev in self._events:
+            ev["p_home"] = min(max(ev["p_home"] + rng.gauss(0, 0.01), 0.1), 0.9)
+            if rng.random() < 0.05:
+                ev["spread"] = max(0.5, ev["spread"] + rng.choice([-0.5, 0.5]))
+            bookmakers = []
+            for key, title in self.books:
+                ts = _iso(at - timedelta(seconds=rng.randint(0, 600)))
+                bookmakers.append({
+                    "key": key,
+                    "title": title,
+                    "last_update": ts,
+                    "markets": [
+                        {"key": m, "last_update": ts, "outcomes": self._outcomes(ev, m, rng)} for m in self.markets
+                    ],
+                })
+            out.append({
+                "id": ev["id"],
+                "sport_key": self.sport,
+                "sport_title": self.meta["title"],
+                "commence_time": _iso(ev["commence"]),
+                "home_team": ev["home"],
+                "away_team": ev["away"],
+                "bookmakers": bookmakers,
+            })
+        return out
+
+    def snapshots(self, n: int, every: timedelta = timedelta(minutes=10)) -> Iterator[List[Dict[str, Any]]]:
+        for i in range(n):
+            yield self.snapshot(self.start + i * every)
+
+
+def count_outcomes(games: Sequence[Dict[str, Any]]) -> int:
+    return sum(len(m.get("outcomes") or []) for g in games for b in g.get("bookmakers") or [] for m in b.get("markets") or [])
+
+
+def odds_raw_rows(games: Sequence[Dict[str, Any]], fetched_at: Optional[datetime] = None, start_id: int = 1) -> List[Dict[str, Any]]:
+    """Shape payloads like the normalize source SELECT returns them (dict_row over public.odds_raw)."""
+    fetched_at = fetched_at or datetime.now(timezone.utc)
+    rows = []
+    for i, g in enumerate(games):
+        rows.append({
+            "id": start_id + i,
+            "sport_key": g["sport_key"],
+            "game_id": g["id"],
+            "fetched_at": fetched_at,
+            "payload": g,
+            "payload_hash": hashlib.sha256(json.dumps(g, sort_keys=True, separators=(",", ":")).encode()).hexdigest(),
+        })
+    return rows
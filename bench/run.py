@@ -0,0 +1,270 @@
+# bench/run.py
+# Benchmarks for the ingest/normalize hot paths
+#   python -m bench.run                                   # in-memory fakes, default sizes
+#   python -m bench.run --games 500 --books 12 --repeat 7
+#   python -m bench.run --dsn postgresql://localhost/gsa_bench --reset-db   # throwaway Postgres
+#   python -m bench.run --baseline bench/results/<earlier>.json             # print speedups
+# Results are written as JSON (bench/results/ by default) so runs can be compared.
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .fakes import FakeAsyncpgConnection, FakePool
+from .payloads import DEFAULT_MARKETS, PayloadGenerator, count_outcomes, odds_raw_rows
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Minimal schema for a throwaway database (mirrors the columns and conflict keys normalize relies on)
+BENCH_DDL = """
+CREATE SCHEMA IF NOT EXISTS odds_norm;
+CREATE TABLE IF NOT EXISTS odds_norm.games (
+  game_uid TEXT PRIMARY KEY, sport_key TEXT, game_id TEXT,
+  home_team TEXT, away_team TEXT, commence_time TIMESTAMPTZ
+);
+CREATE TABLE IF NOT EXISTS odds_norm.markets (
+  game_uid TEXT, market_key TEXT, book_key TEXT, last_update TIMESTAMPTZ,
+  PRIMARY KEY (game_uid, market_key, book_key)
+);
+CREATE TABLE IF NOT EXISTS odds_norm.odds (
+  id BIGSERIAL PRIMARY KEY, game_uid TEXT, market_key TEXT, book_key TEXT, side TEXT,
+  price NUMERIC, point NUMERIC, last_update TIMESTAMPTZ, commence_time TIMESTAMPTZ,
+  UNIQUE (game_uid, market_key, book_key, side, last_update, commence_time)
+);
+CREATE TABLE IF NOT EXISTS odds_norm.odds_latest (
+  game_uid TEXT, market_key TEXT, book_key TEXT, side TEXT, price NUMERIC, point NUMERIC,
+  valid_from TIMESTAMPTZ,
+  PRIMARY KEY (game_uid, market_key, book_key, side)
+);
+"""
+RESET_SQL = "TRUNCATE public.odds_raw, odds_norm.games, odds_norm.markets, odds_norm.odds, odds_norm.odds_latest RESTART IDENTITY"
+
+
+def _git_sha() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _summarize(runs: List[float], games: int, rows: int) -> Dict[str, Any]:
+    best = min(runs)
+    return {
+        "runs_s": [round(r, 6) for r in runs],
+        "best_s": round(best, 6),
+        "median_s": round(statistics.median(runs), 6),
+        "games": games,
+        "rows": rows,
+        "games_per_s": round(games / best, 1) if best else None,
+        "rows_per_s": round(rows / best, 1) if best else None,
+    }
+
+
+def _time_sync(fn: Callable[[], Any], repeat: int) -> List[float]:
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return runs
+
+
+async def _time_async(
+    fn: Callable[[], Awaitable[Any]], repeat: int, before: Optional[Callable[[], Awaitable[Any]]] = None
+) -> List[float]:
+    runs = []
+    for _ in range(repeat):
+        if before:
+            await before()
+        t0 = time.perf_counter()
+        await fn()
+        runs.append(time.perf_counter() - t0)
+    return runs
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    # The portfolio app reads config at import time; keep the EXPLAIN sampler out of the timings.
+    os.environ["DATABASE_URL"] = args.dsn or os.environ.get("BENCH_FAKE_DSN", "postgresql://bench@localhost/bench")
+    os.environ.setdefault("SLOW_QUERY_EXPLAIN_SAMPLE", "0")
+
+    from services.ingestor import ingest_odds
+    from services.portfolio import app as portfolio
+
+    markets = [m.strip() for m in args.markets.split(",") if m.strip()]
+    gen = PayloadGenerator(args.sport, games=args.games, books=args.books, markets=markets, seed=args.seed)
+    games = gen.snapshot()
+    n_games, n_rows = len(games), count_outcomes(games)
+    results: Dict[str, Any] = {}
+
+    # -- stable_hash (same canonical core write_batch hashes)
+    cores = [
+        {
+            "sport_key": args.sport,
+            "id": g.get("id"),
+            "commence_time": g.get("commence_time"),
+            "home_team": g.get("home_team"),
+            "away_team": g.get("away_team"),
+            "bookmakers": g.get("bookmakers", []),
+        }
+        for g in games
+    ]
+    results["stable_hash"] = _summarize(
+        _time_sync(lambda: [ingest_odds.stable_hash(c) for c in cores], args.repeat), n_games, n_rows
+    )
+
+    # -- outcome -> side resolution over every outcome (per-game map built once, as normalize does)
+    resolver = portfolio.RESOLVER
+    game_calls = [
+        (f"{args.sport}:{g['id']}", g["home_team"], g["away_team"],
+         [((m.get("key") or "").strip().lower(), o.get("name") or "") for b in g["bookmakers"] for m in b["markets"]
+          for o in m["outcomes"]])
+        for g in games
+    ]
+
+    def _resolve_all() -> None:
+        for uid, home, away, outcomes in game_calls:
+            sides = resolver.game(args.sport, uid, home, away)
+            for mk, name in outcomes:
+                sides.side(mk, name)
+
+    results["resolve_side"] = _summarize(_time_sync(_resolve_all, args.repeat), n_games, n_rows)
+
+    async def _normalize(dry_run: bool, projection: bool = False, stream: bool = False) -> None:
+        await portfolio.normalize_from_raw(
+            _="bench", dry_run=dry_run, limit=10000, projection=projection, stream=stream, chunk=args.chunk,
+            reset_cursor=True,  # every repeat replays the same snapshots
+        )
+
+    if args.dsn:
+        import asyncpg
+
+        conn = await asyncpg.connect(args.dsn)
+        try:
+            await ingest_odds.ensure_schema(conn)
+            await conn.execute(BENCH_DDL)
+            existing = await conn.fetchval("SELECT count(*) FROM public.odds_raw")
+            if existing and not args.reset_db:
+                raise SystemExit(f"odds_raw has {existing} rows; pass --reset-db to truncate (throwaway DBs only)")
+
+            async def _reset() -> None:
+                await conn.execute(RESET_SQL)
+
+            results["write_batch"] = _summarize(
+                await _time_async(lambda: ingest_odds.write_batch(conn, args.sport, games, False), args.repeat, _reset),
+                n_games, n_rows,
+            )
+            await portfolio._ensure_pool_open()
+            try:
+                # odds_raw now holds one snapshot; start each run from empty odds_norm tables
+                async def _reset_norm() -> None:
+                    await conn.execute("TRUNCATE odds_norm.games, odds_norm.markets, odds_norm.odds, odds_norm.odds_latest")
+
+                results["normalize_from_raw"] = _summarize(
+                    await _time_async(lambda: _normalize(False), args.repeat, _reset_norm), n_games, n_rows
+                )
+                results["normalize_from_raw[dry_run]"] = _summarize(
+                    await _time_async(lambda: _normalize(True), args.repeat), n_games, n_rows
+                )
+                results["normalize_from_raw[stream]"] = _summarize(
+                    await _time_async(lambda: _normalize(False, stream=True), args.repeat, _reset_norm), n_games, n_rows
+                )
+                # server-side JSONB projection only changes what crosses the wire, so only a real DB shows it
+                results["normalize_from_raw[projection]"] = _summarize(
+                    await _time_async(lambda: _normalize(False, True), args.repeat, _reset_norm), n_games, n_rows
+                )
+                results["normalize_from_raw[dry_run,projection]"] = _summarize(
+                    await _time_async(lambda: _normalize(True, True), args.repeat), n_games, n_rows
+                )
+            finally:
+                await portfolio.pool.close()
+                if args.reset_db:
+                    await conn.execute(RESET_SQL)
+        finally:
+            await conn.close()
+    else:
+        fake = FakeAsyncpgConnection()
+        results["write_batch"] = _summarize(
+            await _time_async(lambda: ingest_odds.write_batch(fake, args.sport, games, False), args.repeat),
+            n_games, n_rows,
+        )
+        portfolio.pool = FakePool(odds_raw_rows(games))
+        results["normalize_from_raw"] = _summarize(
+            await _time_async(lambda: _normalize(False), args.repeat), n_games, n_rows
+        )
+        results["normalize_from_raw[dry_run]"] = _summarize(
+            await _time_async(lambda: _normalize(True), args.repeat), n_games, n_rows
+        )
+        results["normalize_from_raw[stream]"] = _summarize(
+            await _time_async(lambda: _normalize(False, stream=True), args.repeat), n_games, n_rows
+        )
+
+    return {
+        "meta": {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "git_sha": _git_sha(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": "postgres" if args.dsn else "fake",
+            "sport": args.sport,
+            "games": n_games,
+            "books": len(gen.books),
+            "markets": markets,
+            "outcomes": n_rows,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+
+def _print(report: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    base = (baseline or {}).get("results", {})
+    print(f"{'benchmark':32} {'best ms':>10} {'games/s':>12} {'rows/s':>14} {'vs base':>8}")
+    for name, r in report["results"].items():
+        ratio = ""
+        if name in base and base[name].get("rows_per_s") and r["rows_per_s"]:
+            # throughput ratio, so runs with different sizes still compare
+            ratio = f"{r['rows_per_s'] / base[name]['rows_per_s']:.2f}x"
+        print(f"{name:32} {r['best_s'] * 1000:10.2f} {r['games_per_s']:12,.0f} {r['rows_per_s']:14,.0f} {ratio:>8}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ingest/normalize hot paths on synthetic Odds API payloads.")
+    parser.add_argument("--sport", default="americanfootball_nfl")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--books", type=int, default=8)
+    parser.add_argument("--markets", default=",".join(DEFAULT_MARKETS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chunk", type=int, default=500, help="rows per chunk for the streamed normalize")
+    parser.add_argument("--dsn", default=None, help="throwaway Postgres; default uses in-memory fakes")
+    parser.add_argument("--reset-db", action="store_true", help="allow truncating odds_raw/odds_norm in --dsn")
+    parser.add_argument("--out", default=None, help="result JSON path (default bench/results/<utc>.json)")
+    parser.add_argument("--baseline", default=None, help="earlier result JSON to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    _print(report, baseline)
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"\nwrote {out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
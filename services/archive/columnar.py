@@ -0,0 +1,277 @@
+# services/archive/columnar.py
+# Columnar on-disk copy of odds_norm (games, markets, odds) for analytics
+# - <dir>/<table>/<column>.npy: one plain .npy file per column, readable with np.load(mmap_mode="r")
+# - Strings are dictionary-encoded: the column holds int32 codes into <dir>/dicts/<domain>.json.
+#   Domains are shared across tables (game_uid codes in odds match games), and dictionaries are
+#   append-only, so codes never change between exports
+# - Timestamps are datetime64[us] (UTC, NaT for NULL); price/point are float64 (NaN for NULL)
+# - <dir>/meta.json is the commit point: row counts per table plus the odds id watermark.
+#   Appends write column data first and meta.json last; readers only trust meta's row counts,
+#   so a crashed append is invisible and the next one truncates it away
+# Column headers are written with spare padding so appends can grow the shape in place.
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+FORMAT = "gsa-odds-columnar/1"
+HEADER_LEN = 128  # bytes before the data, fixed so the shape can grow without moving it
+NAT = np.iinfo(np.int64).min  # datetime64 NaT as int64
+
+# table -> [(column, kind, domain)]; kind: "code" (dictionary-encoded), "ts" (datetime64[us]), or a dtype
+SCHEMA: Dict[str, List[tuple]] = {
+    "games": [
+        ("game_uid", "code", "game_uid"),
+        ("sport_key", "code", "sport_key"),
+        ("game_id", "code", "game_id"),
+        ("home_team", "code", "team"),
+        ("away_team", "code", "team"),
+        ("commence_time", "ts", None),
+    ],
+    "markets": [
+        ("game_uid", "code", "game_uid"),
+        ("market_key", "code", "market_key"),
+        ("book_key", "code", "book_key"),
+        ("last_update", "ts", None),
+    ],
+    "odds": [
+        ("id", "int64", None),
+        ("game_uid", "code", "game_uid"),
+        ("market_key", "code", "market_key"),
+        ("book_key", "code", "book_key"),
+        ("side", "code", "side"),
+        ("price", "float64", None),
+        ("point", "float64", None),
+        ("last_update", "ts", None),
+    ],
+}
+
+
+def _dtype(kind: str) -> np.dtype:
+    if kind == "code":
+        return np.dtype("<i4")
+    if kind == "ts":
+        return np.dtype("<M8[us]")
+    return np.dtype(kind).newbyteorder("<")
+
+
+def _header(dtype: np.dtype, rows: int) -> bytes:
+    d = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (rows,)}
+    text = repr(d).encode("latin1")
+    pre = np.lib.format.magic(1, 0)
+    room = HEADER_LEN - len(pre) - 2 - 1  # u16 header length, trailing newline
+    if len(text) > room:
+        raise ValueError("npy header does not fit HEADER_LEN")
+    body = text + b" " * (room - len(text)) + b"\n"
+    return pre + len(body).to_bytes(2, "little") + body
+
+
+def _replace_json(path: Path, obj: Any) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(obj, indent=2 if path.name == "meta.json" else None))
+    os.replace(tmp, path)
+
+
+# --------------------------------------------------------------------------------------
+# Writing
+# --------------------------------------------------------------------------------------
+
+class ColumnStore:
+    """Writer side. `append(table, rows)` / `replace(table, rows)` then `commit(**meta)`."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        self.meta = _read_meta(self.root) or {"format": FORMAT, "rows": {t: 0 for t in SCHEMA}}
+        self._dicts: Dict[str, List[str]] = {}
+        self._index: Dict[str, Dict[str, int]] = {}
+        self._dirty: set = set()
+        self._staged: Dict[str, int] = {}
+
+    # -- dictionaries ---------------------------------------------------------------
+
+    def _domain(self, name: str) -> Dict[str, int]:
+        if name not in self._index:
+            path = self.root / "dicts" / f"{name}.json"
+            values = json.loads(path.read_text()) if path.exists() else []
+            self._dicts[name] = values
+            self._index[name] = {v: i for i, v in enumerate(values)}
+        return self._index[name]
+
+    def encode(self, domain: str, values: Iterable[Optional[str]]) -> np.ndarray:
+        """Strings -> int32 codes, growing the dictionary; None -> -1."""
+        idx = self._domain(domain)
+        words = self._dicts[domain]
+        out = []
+        for v in values:
+            if v is None:
+                out.append(-1)
+                continue
+            c = idx.get(v)
+            if c is None:
+                c = idx[v] = len(words)
+                words.append(v)
+                self._dirty.add(domain)
+            out.append(c)
+        return np.asarray(out, dtype="<i4")
+
+    # -- columns --------------------------------------------------------------------
+
+    def _arrays(self, table: str, cols: Dict[str, Sequence[Any]]) -> Dict[str, np.ndarray]:
+        out = {}
+        for name, kind, domain in SCHEMA[table]:
+            if kind == "code":
+                out[name] = self.encode(domain, cols[name])
+            elif kind == "ts":
+                # int64 µs since epoch (NAT for NULL) -> datetime64[us]
+                out[name] = np.asarray(cols[name], dtype="<i8").view("<M8[us]")
+            else:
+                out[name] = np.asarray(cols[name], dtype=_dtype(kind))
+        n = {len(a) for a in out.values()}
+        if len(n) != 1:
+            raise ValueError(f"{table}: columns have different lengths {sorted(n)}")
+        return out
+
+    def append(self, table: str, cols: Dict[str, Sequence[Any]]) -> int:
+        """Append a chunk (column name -> values) after the committed/staged rows of `table`."""
+        arrays = self._arrays(table, cols)
+        start = self._staged.get(table, self.meta["rows"].get(table, 0))
+        n = len(next(iter(arrays.values())))
+        d = self.root / table
+        d.mkdir(parents=True, exist_ok=True)
+        for name, kind, _ in SCHEMA[table]:
+            path = d / f"{name}.npy"
+            dtype = _dtype(kind)
+            mode = "r+b" if path.exists() else "w+b"
+            with open(path, mode) as f:
+                if mode == "w+b":
+                    f.write(_header(dtype, 0))
+                f.truncate(HEADER_LEN + start * dtype.itemsize)  # drop any uncommitted tail
+                f.seek(0, os.SEEK_END)
+                f.write(arrays[name].tobytes())
+                f.seek(0)
+                f.write(_header(dtype, start + n))
+        self._staged[table] = start + n
+        return n
+
+    def replace(self, table: str, chunks: Iterable[Dict[str, Sequence[Any]]]) -> int:
+        """Rewrite `table` from scratch (new files renamed into place, so open mmaps stay valid)."""
+        d = self.root / table
+        tmp = self.root / f".{table}.tmp"
+        tmp.mkdir(parents=True, exist_ok=True)
+        files = {}
+        for name, kind, _ in SCHEMA[table]:
+            files[name] = open(tmp / f"{name}.npy", "w+b")
+            files[name].write(_header(_dtype(kind), 0))
+        rows = 0
+        try:
+            for cols in chunks:
+                arrays = self._arrays(table, cols)
+                for name in files:
+                    files[name].write(arrays[name].tobytes())
+                rows += len(next(iter(arrays.values())))
+            for name, kind, _ in SCHEMA[table]:
+                files[name].seek(0)
+                files[name].write(_header(_dtype(kind), rows))
+        finally:
+            for f in files.values():
+                f.close()
+        d.mkdir(parents=True, exist_ok=True)
+        for name in files:
+            os.replace(tmp / f"{name}.npy", d / f"{name}.npy")
+        tmp.rmdir()
+        self._staged[table] = rows
+        return rows
+
+    def commit(self, **extra: Any) -> Dict[str, Any]:
+        """Flush dictionaries, then meta.json (the point at which new rows become visible)."""
+        (self.root / "dicts").mkdir(parents=True, exist_ok=True)
+        for domain in sorted(self._dirty):
+            _replace_json(self.root / "dicts" / f"{domain}.json", self._dicts[domain])
+        self._dirty.clear()
+        self.meta["rows"].update(self._staged)
+        self.meta.update(extra)
+        self.meta["format"] = FORMAT
+        _replace_json(self.root / "meta.json", self.meta)
+        self._staged.clear()
+        return self.meta
+
+
+def _read_meta(root: Path) -> Optional[Dict[str, Any]]:
+    path = Path(root) / "meta.json"
+    if not path.exists():
+        return None
+    meta = json.loads(path.read_text())
+    if meta.get("format") != FORMAT:
+        raise ValueError(f"{path}: unknown format {meta.get('format')!r}")
+    return meta
+
+
+# --------------------------------------------------------------------------------------
+# Reading
+# --------------------------------------------------------------------------------------
+
+class Columns:
+    """Read-only, memory-mapped view of an export.
+
+        cols = Columns("exports/odds_norm")
+        price = cols["odds"]["price"]                  # np.memmap, nothing copied
+        dk = cols["odds"]["book_key"] == cols.code("book_key", "draftkings")
+        books = cols.decode("book_key", cols["odds"]["book_key"][:10])
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        meta = _read_meta(self.root)
+        if meta is None:
+            raise FileNotFoundError(f"{self.root}: no meta.json (run services.archive.export_odds_norm first)")
+        self.meta = meta
+        self._tables: Dict[str, Dict[str, np.ndarray]] = {}
+        self._dicts: Dict[str, np.ndarray] = {}
+        self._index: Dict[str, Dict[str, int]] = {}
+
+    def rows(self, table: str) -> int:
+        return int(self.meta["rows"].get(table, 0))
+
+    def __getitem__(self, table: str) -> Dict[str, np.ndarray]:
+        if table not in self._tables:
+            n = self.rows(table)
+            cols = {}
+            for name, kind, _ in SCHEMA[table]:
+                path = self.root / table / f"{name}.npy"
+                if not n or not path.exists():
+                    cols[name] = np.empty(0, dtype=_dtype(kind))
+                    continue
+                # the header may count an uncommitted tail; meta's row count is authoritative
+                cols[name] = np.load(path, mmap_mode="r")[:n]
+            self._tables[table] = cols
+        return self._tables[table]
+
+    def dictionary(self, domain: str) -> np.ndarray:
+        if domain not in self._dicts:
+            path = self.root / "dicts" / f"{domain}.json"
+            words = json.loads(path.read_text()) if path.exists() else []
+            self._dicts[domain] = np.asarray(words + [None], dtype=object)  # code -1 -> None
+        return self._dicts[domain]
+
+    def code(self, domain: str, value: str) -> int:
+        """Code for a string (-2 when absent, which matches nothing)."""
+        if domain not in self._index:
+            self._index[domain] = {v: i for i, v in enumerate(self.dictionary(domain)[:-1])}
+        return self._index[domain].get(value, -2)
+
+    def decode(self, domain: str, codes: np.ndarray) -> np.ndarray:
+        return self.dictionary(domain)[np.asarray(codes)]
+
+    def frame(self, table: str, decode: bool = True):
+        """pandas DataFrame of one table (copies; pandas is optional and imported here)."""
+        import pandas as pd
+        data = {}
+        for name, kind, domain in SCHEMA[table]:
+            col = self[table][name]
+            data[name] = self.decode(domain, col) if kind == "code" and decode else np.asarray(col)
+        return pd.DataFrame(data)
@@ -0,0 +1,109 @@
+# services/archive/export_odds_norm.py
+# Export odds_norm games/markets/odds to the columnar format in services/archive/columnar.py
+#   python -m services.archive.export_odds_norm                      # first run: full export; later runs: append
+#   python -m services.archive.export_odds_norm --full               # rebuild from scratch
+#   python -c "from services.archive.columnar import Columns; c = Columns('exports/odds_norm'); print(c['odds']['price'][:5])"
+# odds rows are insert-only (ON CONFLICT DO NOTHING), so each run appends rows with id above the
+# previous watermark. games and markets are upserted in place and small, so they are rewritten whole.
+# Run it after normalize has finished: a row committed late with an id below the watermark is skipped.
+
+import os, sys, json, time, asyncio, argparse, shutil
+from pathlib import Path
+
+import asyncpg
+from dotenv import load_dotenv
+
+from services.archive.columnar import NAT, ColumnStore, SCHEMA
+
+load_dotenv(".env.local", override=True)
+DATABASE_URL = os.getenv("DATABASE_URL")
+COLUMNAR_DIR = os.getenv("COLUMNAR_DIR", "exports/odds_norm")
+
+# timestamps leave the server as int64 µs since epoch so no datetime objects are built per row
+_US = "COALESCE((extract(epoch FROM {0}) * 1000000)::int8, {1})"
+
+QUERIES = {
+    "games": f"""
+SELECT game_uid, sport_key, game_id, home_team, away_team, {_US.format("commence_time", NAT)} AS commence_time
+FROM odds_norm.games
+ORDER BY game_uid
+""",
+    "markets": f"""
+SELECT game_uid, market_key, book_key, {_US.format("last_update", NAT)} AS last_update
+FROM odds_norm.markets
+ORDER BY game_uid, market_key, book_key
+""",
+    "odds": f"""
+SELECT id, game_uid, market_key, book_key, side,
+       COALESCE(price::float8, 'NaN') AS price, COALESCE(point::float8, 'NaN') AS point,
+       {_US.format("last_update", NAT)} AS last_update
+FROM odds_norm.odds
+WHERE id > $1
+ORDER BY id
+""",
+}
+
+
+def _columns(table: str, rows) -> dict:
+    return {name: [r[name] for r in rows] for name, _, _ in SCHEMA[table]}
+
+
+async def _chunks(conn: asyncpg.Connection, table: str, chunk_rows: int, *args):
+    cur = await conn.cursor(QUERIES[table], *args)
+    while True:
+        rows = await cur.fetch(chunk_rows)
+        if not rows:
+            return
+        yield _columns(table, rows)
+
+
+async def export(conn: asyncpg.Connection, root: Path, chunk_rows: int) -> dict:
+    store = ColumnStore(root)
+    watermark = int(store.meta.get("odds_max_id") or 0)
+    t0 = time.perf_counter()
+    out = {}
+    # one REPEATABLE READ transaction: games, markets and odds come from the same snapshot
+    async with conn.transaction(isolation="repeatable_read", readonly=True):
+        for table in ("games", "markets"):
+            chunks = []
+            async for c in _chunks(conn, table, chunk_rows):
+                chunks.append(c)
+            out[table] = store.replace(table, chunks)
+        appended, max_id = 0, watermark
+        async for c in _chunks(conn, "odds", chunk_rows, watermark):
+            appended += store.append("odds", c)
+            max_id = c["id"][-1]
+    meta = store.commit(odds_max_id=max_id, exported_at=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
+    out.update({
+        "odds_appended": appended,
+        "rows": meta["rows"],
+        "odds_max_id": max_id,
+        "seconds": round(time.perf_counter() - t0, 3),
+    })
+    return out
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Export odds_norm to memory-mappable .npy columns (incremental).")
+    parser.add_argument("--dir", default=COLUMNAR_DIR)
+    parser.add_argument("--full", action="store_true", help="discard the existing export and rebuild")
+    parser.add_argument("--chunk-rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    if not DATABASE_URL:
+        print("DATABASE_URL missing", file=sys.stderr)
+        sys.exit(2)
+
+    root = Path(args.dir)
+    if args.full and root.exists():
+        shutil.rmtree(root)
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        res = await export(conn, root, args.chunk_rows)
+    finally:
+        await conn.close()
+    print(json.dumps({"ok": True, "dir": str(root), **res}, indent=2))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+# services/archive/export_odds_raw.py
+# Move closed days of public.odds_raw into zstd segment files (services/archive/segments.py)
+#   python -m services.archive.export_odds_raw --start 2025-09-01 --end 2025-10-01            # export only
+#   python -m services.archive.export_odds_raw --start 2025-09-01 --end 2025-10-01 --delete   # export + drop rows
+#   python -m services.archive.export_odds_raw --start 2025-09-01 --end 2025-10-01 --verify
+# Days are UTC and [start, end); a day is only exported once it is ARCHIVE_MIN_AGE_DAYS old.
+# --delete re-verifies each segment (sha256 + every frame decodes + id set matches the DB) before
+# deleting that day's rows, and records the deletion in audit_logs.
+
+import os, sys, json, asyncio, argparse
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+
+import asyncpg
+from dotenv import load_dotenv
+
+from services.archive.segments import Archive, SegmentReader, SegmentWriter, segment_path
+from services.ingestor.audit_compat import log_audit_compat
+
+load_dotenv(".env.local", override=True)
+DATABASE_URL = os.getenv("DATABASE_URL")
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive/odds_raw")
+MIN_AGE_DAYS = int(os.getenv("ARCHIVE_MIN_AGE_DAYS", "2"))
+
+DAY_SQL = """
+SELECT id, sport_key, game_id, fetched_at, payload::text AS payload, payload_hash
+FROM public.odds_raw
+WHERE fetched_at >= $1 AND fetched_at < $2
+ORDER BY fetched_at, id
+"""
+IDS_SQL = "SELECT id FROM public.odds_raw WHERE fetched_at >= $1 AND fetched_at < $2"
+DELETE_SQL = "DELETE FROM public.odds_raw WHERE id = ANY($1::bigint[])"
+DELETE_BATCH = 5000
+
+
+def _bounds(day: date):
+    lo = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    return lo, lo + timedelta(days=1)
+
+
+def _days(start: date, end: date):
+    d = start
+    while d < end:
+        yield d
+        d += timedelta(days=1)
+
+
+async def export_day(conn: asyncpg.Connection, archive: Archive, day: date, level: int, overwrite: bool) -> dict:
+    path = segment_path(archive.root, day)
+    if path.exists() and not overwrite:
+        return {"day": day.isoformat(), "skipped": "segment exists (use --overwrite)"}
+    lo, hi = _bounds(day)
+    writer = SegmentWriter(path, level=level)
+    try:
+        # server-side cursor: rows stream straight into the segment
+        async with conn.transaction():
+            async for r in conn.cursor(DAY_SQL, lo, hi, prefetch=500):
+                writer.append(r["id"], r["sport_key"], r["game_id"], r["fetched_at"], r["payload_hash"], r["payload"])
+    except BaseException:
+        writer.abort()
+        raise
+    if not writer.rows:
+        writer.abort()
+        return {"day": day.isoformat(), "rows": 0}
+    entry = writer.close()
+    archive.record(day, entry)
+    return {"day": day.isoformat(), **entry}
+
+
+async def delete_day(conn: asyncpg.Connection, archive: Archive, day: date) -> dict:
+    entry = archive.verify(day)
+    with SegmentReader(segment_path(archive.root, day)) as r:
+        archived = set(r.ids())
+    lo, hi = _bounds(day)
+    in_db = {row["id"] for row in await conn.fetch(IDS_SQL, lo, hi)}
+    if not in_db:
+        return {"day": day.isoformat(), "deleted": 0}
+    if in_db - archived:
+        # rows arrived after the export: re-export before deleting anything
+        raise SystemExit(f"{day}: {len(in_db - archived)} rows in odds_raw are not in the segment; re-run with --overwrite")
+    ids = sorted(in_db)
+    async with conn.transaction():
+        for i in range(0, len(ids), DELETE_BATCH):
+            await conn.execute(DELETE_SQL, ids[i: i + DELETE_BATCH])
+        await log_audit_compat(conn, "archive_delete", {
+            "day": day.isoformat(), "rows": len(ids), "segment": entry["segment"], "sha256": entry["sha256"],
+        })
+    return {"day": day.isoformat(), "deleted": len(ids)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Export closed days of odds_raw to zstd segments (optionally delete them).")
+    parser.add_argument("--start", required=True, type=date.fromisoformat, help="first UTC day, e.g. 2025-09-01")
+    parser.add_argument("--end", required=True, type=date.fromisoformat, help="exclusive end day")
+    parser.add_argument("--dir", default=ARCHIVE_DIR)
+    parser.add_argument("--level", type=int, default=9, help="zstd level")
+    parser.add_argument("--overwrite", action="store_true", help="re-export days that already have a segment")
+    parser.add_argument("--delete", action="store_true", help="delete exported rows from odds_raw after verifying")
+    parser.add_argument("--verify", action="store_true", help="only verify existing segments in the range")
+    args = parser.parse_args()
+
+    archive = Archive(Path(args.dir))
+    if args.verify:
+        out = []
+        for day in archive.days(args.start, args.end):
+            e = archive.verify(day)
+            out.append({"day": day.isoformat(), "rows": e["rows"], "ok": True})
+        print(json.dumps(out, indent=2))
+        return
+
+    last_closed = datetime.now(timezone.utc).date() - timedelta(days=MIN_AGE_DAYS)
+    if args.end > last_closed + timedelta(days=1):
+        print(f"--end must be <= {last_closed + timedelta(days=1)} (days younger than {MIN_AGE_DAYS}d are still open)", file=sys.stderr)
+        sys.exit(2)
+
+    if not DATABASE_URL:
+        print("DATABASE_URL missing", file=sys.stderr)
+        sys.exit(2)
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    results = []
+    try:
+        for day in _days(args.start, args.end):
+            res = await export_day(conn, archive, day, args.level, args.overwrite)
+            if args.delete and (res.get("rows") or "skipped" in res) and day.isoformat() in archive.manifest():
+                res.update(await delete_day(conn, archive, day))
+            results.append(res)
+            print(json.dumps(res), file=sys.stderr)
+    finally:
+        await conn.close()
+
+    rows = sum(r.get("rows") or 0 for r in results)
+    raw = sum(r.get("raw_bytes") or 0 for r in results)
+    size = sum(r.get("bytes") or 0 for r in results)
+    print(json.dumps({
+        "ok": True,
+        "days": len(results),
+        "rows": rows,
+        "deleted": sum(r.get("deleted") or 0 for r in results),
+        "raw_bytes": raw,
+        "bytes": size,
+        "ratio": round(raw / size, 2) if size else None,
+        "dir": str(archive.root),
+    }, indent=2))
+
+if __name__ == "__main__":
+    asyncio.run(main())
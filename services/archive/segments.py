@@ -0,0 +1,280 @@
+# services/archive/segments.py
+# On-disk archive format for odds_raw history
+# - One segment per UTC day: <dir>/<yyyy>/<mm>/odds_raw_<yyyy-mm-dd>.seg + .idx
+# - .seg = 8-byte magic, then records of <u32 length><zstd frame>; each frame is one odds_raw row
+#   as JSON ({"id", "sport_key", "game_id", "fetched_at", "payload_hash", "payload"}), compressed on
+#   its own so any record can be read from its offset
+# - .idx = fixed-width records (id, fetched_at µs, offset, length, game_id, sport_key) in
+#   (fetched_at, id) order, so readers filter and seek without touching the payloads
+# - manifest.json lists segments with row counts, id range, sizes and a sha256 of the .seg
+# Readers mmap both files; nothing is loaded whole.
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import zstandard
+
+MAGIC = b"GSAODDS1"
+LEN = struct.Struct("<I")
+# id, fetched_at (µs since epoch), offset, length, game_id, sport_key
+IDX = struct.Struct("<qqQI48s40s")
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_US = timedelta(microseconds=1)
+
+
+def to_us(ts: datetime) -> int:
+    return (ts - EPOCH) // _US
+
+
+def from_us(us: int) -> datetime:
+    return EPOCH + us * _US
+
+
+def segment_path(root: Path, day: date) -> Path:
+    return root / f"{day:%Y}" / f"{day:%m}" / f"odds_raw_{day.isoformat()}.seg"
+
+
+def _clip(s: str, n: int) -> bytes:
+    b = (s or "").encode("utf-8")
+    if len(b) > n:
+        raise ValueError(f"{s!r} longer than {n} bytes; widen the index format")
+    return b
+
+
+# --------------------------------------------------------------------------------------
+# Writing
+# --------------------------------------------------------------------------------------
+
+class SegmentWriter:
+    """Append rows in (fetched_at, id) order; `close()` returns the manifest entry.
+
+    Writes to *.tmp and renames on close, so a crashed export never leaves a half segment behind.
+    """
+
+    def __init__(self, path: Path, level: int = 9) -> None:
+        self.path = path
+        self.idx_path = path.with_suffix(".idx")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._seg = open(path.with_suffix(".seg.tmp"), "wb")
+        self._idx = open(path.with_suffix(".idx.tmp"), "wb")
+        self._cctx = zstandard.ZstdCompressor(level=level)
+        self._sha = hashlib.sha256()
+        self._seg.write(MAGIC)
+        self._sha.update(MAGIC)
+        self._offset = len(MAGIC)
+        self.rows = 0
+        self.raw_bytes = 0
+        self.min_id: Optional[int] = None
+        self.max_id: Optional[int] = None
+
+    def append(self, id: int, sport_key: str, game_id: str, fetched_at: datetime, payload_hash: str, payload: str) -> None:
+        """`payload` is the JSON text as stored (asyncpg returns jsonb as str), kept byte-for-byte."""
+        head = json.dumps(
+            {"id": id, "sport_key": sport_key, "game_id": game_id,
+             "fetched_at": fetched_at.isoformat(), "payload_hash": payload_hash},
+            separators=(",", ":"),
+        )
+        raw = (head[:-1] + ',"payload":' + payload + "}").encode("utf-8")
+        frame = self._cctx.compress(raw)
+        rec = LEN.pack(len(frame)) + frame
+        self._seg.write(rec)
+        self._sha.update(rec)
+        self._idx.write(IDX.pack(id, to_us(fetched_at), self._offset + LEN.size, len(frame),
+                                 _clip(game_id, 48), _clip(sport_key, 40)))
+        self._offset += len(rec)
+        self.rows += 1
+        self.raw_bytes += len(raw)
+        self.min_id = id if self.min_id is None else min(self.min_id, id)
+        self.max_id = id if self.max_id is None else max(self.max_id, id)
+
+    def close(self) -> Dict[str, Any]:
+        for f in (self._seg, self._idx):
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        os.replace(self.path.with_suffix(".seg.tmp"), self.path)
+        os.replace(self.path.with_suffix(".idx.tmp"), self.idx_path)
+        return {
+            "segment": self.path.name,
+            "rows": self.rows,
+            "min_id": self.min_id,
+            "max_id": self.max_id,
+            "raw_bytes": self.raw_bytes,
+            "bytes": self._offset,
+            "sha256": self._sha.hexdigest(),
+        }
+
+    def abort(self) -> None:
+        for f, p in ((self._seg, ".seg.tmp"), (self._idx, ".idx.tmp")):
+            f.close()
+            self.path.with_suffix(p).unlink(missing_ok=True)
+
+
+# --------------------------------------------------------------------------------------
+# Reading
+# --------------------------------------------------------------------------------------
+
+class SegmentReader:
+    """mmap-backed reader for one segment; decompresses only the records asked for."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._seg_f = open(self.path, "rb")
+        self._idx_f = open(self.path.with_suffix(".idx"), "rb")
+        self._seg = mmap.mmap(self._seg_f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._seg[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path}: not an odds_raw segment")
+        size = os.fstat(self._idx_f.fileno()).st_size
+        self._idx = mmap.mmap(self._idx_f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.rows = size // IDX.size
+        self._dctx = zstandard.ZstdDecompressor()
+
+    def __enter__(self) -> "SegmentReader":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for m in (getattr(self, "_seg", None), getattr(self, "_idx", None)):
+            if isinstance(m, mmap.mmap):
+                m.close()
+        self._seg_f.close()
+        self._idx_f.close()
+
+    def entry(self, i: int) -> Dict[str, Any]:
+        rid, us, off, ln, gid, sport = IDX.unpack_from(self._idx, i * IDX.size)
+        return {
+            "id": rid, "fetched_at_us": us, "offset": off, "length": ln,
+            "game_id": gid.rstrip(b"\0").decode(), "sport_key": sport.rstrip(b"\0").decode(),
+        }
+
+    def _us_at(self, i: int) -> int:
+        return struct.unpack_from("<q", self._idx, i * IDX.size + 8)[0]
+
+    def _span(self, since: Optional[datetime], until: Optional[datetime]) -> range:
+        # index is in fetched_at order: binary search the window instead of scanning
+        keys = _IdxKeys(self)
+        lo = bisect_left(keys, to_us(since)) if since else 0
+        hi = bisect_left(keys, to_us(until)) if until else self.rows
+        return range(lo, hi)
+
+    def read(self, i: int) -> bytes:
+        _, _, off, ln, _, _ = IDX.unpack_from(self._idx, i * IDX.size)
+        (stored,) = LEN.unpack_from(self._seg, off - LEN.size)
+        if stored != ln:
+            raise ValueError(f"{self.path}: record {i} length mismatch")
+        return self._dctx.decompress(self._seg[off: off + ln])  # copies one frame, never the file
+
+    def records(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        game_id: Optional[str] = None,
+        sport_key: Optional[str] = None,
+        raw: bool = False,
+    ) -> Iterator[Any]:
+        """Rows with since <= fetched_at < until, optionally for one game/sport, in (fetched_at, id) order."""
+        gid = game_id.encode() if game_id else None
+        sp = sport_key.encode() if sport_key else None
+        for i in self._span(since, until):
+            if gid or sp:
+                _, _, _, _, g, s = IDX.unpack_from(self._idx, i * IDX.size)
+                if gid and g.rstrip(b"\0") != gid:
+                    continue
+                if sp and s.rstrip(b"\0") != sp:
+                    continue
+            data = self.read(i)
+            yield data if raw else json.loads(data)
+
+    def ids(self) -> List[int]:
+        return [struct.unpack_from("<q", self._idx, i * IDX.size)[0] for i in range(self.rows)]
+
+
+class _IdxKeys:
+    """Sequence view of fetched_at µs for bisect."""
+
+    def __init__(self, r: SegmentReader) -> None:
+        self._r = r
+
+    def __len__(self) -> int:
+        return self._r.rows
+
+    def __getitem__(self, i: int) -> int:
+        return self._r._us_at(i)
+
+
+# --------------------------------------------------------------------------------------
+# Archive directory
+# --------------------------------------------------------------------------------------
+
+class Archive:
+    """A directory of day segments plus manifest.json."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        self.manifest_path = self.root / "manifest.json"
+
+    def manifest(self) -> Dict[str, Dict[str, Any]]:
+        if not self.manifest_path.exists():
+            return {}
+        return json.loads(self.manifest_path.read_text())
+
+    def record(self, day: date, entry: Dict[str, Any]) -> None:
+        m = self.manifest()
+        m[day.isoformat()] = entry
+        tmp = self.manifest_path.with_suffix(".json.tmp")
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(dict(sorted(m.items())), indent=2))
+        os.replace(tmp, self.manifest_path)
+
+    def days(self, since: Optional[date] = None, until: Optional[date] = None) -> List[date]:
+        out = []
+        for k in self.manifest():
+            d = date.fromisoformat(k)
+            if (since is None or d >= since) and (until is None or d < until):
+                out.append(d)
+        return sorted(out)
+
+    def verify(self, day: date) -> Dict[str, Any]:
+        """Re-hash the segment and re-read every record; returns the manifest entry or raises."""
+        entry = self.manifest().get(day.isoformat())
+        if not entry:
+            raise ValueError(f"{day}: not in manifest")
+        path = segment_path(self.root, day)
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        if sha.hexdigest() != entry["sha256"]:
+            raise ValueError(f"{path}: sha256 mismatch")
+        with SegmentReader(path) as r:
+            if r.rows != entry["rows"]:
+                raise ValueError(f"{path}: index has {r.rows} rows, manifest {entry['rows']}")
+            for i in range(r.rows):
+                r.read(i)
+        return entry
+
+    def records(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        game_id: Optional[str] = None,
+        sport_key: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream rows across day segments in fetched_at order."""
+        d_lo = since.astimezone(timezone.utc).date() if since else None
+        d_hi = until.astimezone(timezone.utc).date() if until else None
+        for day in self.days(d_lo, None if d_hi is None else date.fromordinal(d_hi.toordinal() + 1)):
+            with SegmentReader(segment_path(self.root, day)) as r:
+                yield from r.records(since, until, game_id, sport_key)
@@ -0,0 +1,450 @@
+# services/backtest/engine.py
+# Replay historical odds snapshots through a pick strategy and grade the picks
+# - Sources stream odds_raw rows in (fetched_at, id) order: Postgres through a named server-side
+#   cursor, or the zstd day segments written by services.archive.export_odds_raw
+# - Each row becomes a Snapshot (one game at one fetch, every book/market/outcome resolved to a side)
+#   and is handed to Strategy.on_snapshot; returned picks are validated as PickIn and time-stamped
+# - Work is split into partitions (one per sport, or per sport and season); each partition runs in its
+#   own process with its own strategy instance, so state never crosses partitions
+# - Picks come back as columns and are graded against final scores with NumPy in one pass
+
+from __future__ import annotations
+
+import importlib
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import ValidationError
+
+from services.common.picks import PickIn
+from services.common.teams import TeamResolver
+
+PG_SQL = """
+SELECT id, sport_key, game_id, fetched_at, payload
+FROM public.odds_raw
+WHERE sport_key = %(sport)s
+  AND (%(since)s::timestamptz IS NULL OR fetched_at >= %(since)s)
+  AND (%(until)s::timestamptz IS NULL OR fetched_at < %(until)s)
+ORDER BY fetched_at, id
+"""
+PG_SPORTS_SQL = "SELECT DISTINCT sport_key FROM public.odds_raw"
+PG_RANGE_SQL = "SELECT min(fetched_at), max(fetched_at) FROM public.odds_raw WHERE sport_key = %s"
+PG_ALIAS_SQL = "SELECT sport_key, alias, canonical FROM odds_norm.team_aliases"
+
+# Month each sport's season starts in, for --split season (others split on calendar years)
+SEASON_START_MONTH: Dict[str, int] = {
+    "americanfootball_nfl": 8,
+    "americanfootball_ncaaf": 8,
+    "basketball_nba": 10,
+    "basketball_ncaab": 11,
+    "icehockey_nhl": 10,
+    "baseball_mlb": 3,
+    "soccer_epl": 8,
+}
+
+PICK_FIELDS = ("game_uid", "league", "market_key", "outcome", "price", "point", "stake", "book", "placed_at")
+
+
+def _ts(v: Any) -> Optional[datetime]:
+    if v is None or isinstance(v, datetime):
+        return v
+    return datetime.fromisoformat(str(v).replace("Z", "+00:00"))
+
+
+# --------------------------------------------------------------------------------------
+# Snapshots
+# --------------------------------------------------------------------------------------
+
+class Line(NamedTuple):
+    book: str
+    market_key: str
+    side: str        # home/away/draw/over/under
+    price: float     # American
+    point: Optional[float]
+
+
+@dataclass
+class Snapshot:
+    sport_key: str
+    game_uid: str
+    fetched_at: datetime
+    home_team: str
+    away_team: str
+    commence_time: Optional[datetime]
+    lines: List[Line] = field(default_factory=list)
+
+    def prices(self, market_key: str, side: str) -> List[Line]:
+        return [ln for ln in self.lines if ln.market_key == market_key and ln.side == side]
+
+
+def to_snapshot(row: Dict[str, Any], resolver: TeamResolver) -> Snapshot:
+    """odds_raw row (payload as dict or JSON text) -> Snapshot; unresolved outcomes are dropped."""
+    payload = row["payload"]
+    if isinstance(payload, (str, bytes)):
+        payload = json.loads(payload)
+    sport = row["sport_key"]
+    game_uid = f"{sport}:{row['game_id']}"
+    home, away = payload.get("home_team") or "", payload.get("away_team") or ""
+    sides = resolver.game(sport, game_uid, home, away)
+    lines: List[Line] = []
+    for bk in (payload.get("bookmakers") or []):
+        book = (bk.get("key") or "").strip()
+        for mk in (bk.get("markets") or []):
+            market_key = (mk.get("key") or "").strip().lower()
+            for oc in (mk.get("outcomes") or []):
+                name = oc.get("name")
+                price = oc.get("price") or oc.get("odds")
+                if price is None:
+                    continue
+                side = sides.side(market_key, name)
+                if side is None:
+                    continue
+                lines.append(Line(book, market_key, side, float(price), oc.get("point")))
+    return Snapshot(sport, game_uid, _ts(row["fetched_at"]), home, away, _ts(payload.get("commence_time")), lines)
+
+
+# --------------------------------------------------------------------------------------
+# Sources (picklable descriptors; rows are read inside the worker)
+# --------------------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Source:
+    kind: str   # "pg" or "archive"
+    where: str  # DSN or archive directory
+    chunk_rows: int = 2000
+
+    def rows(self, sport: str, since: Optional[datetime], until: Optional[datetime]) -> Iterator[Dict[str, Any]]:
+        if self.kind == "archive":
+            from services.archive.segments import Archive
+            yield from Archive(Path(self.where)).records(since, until, sport_key=sport)
+            return
+        import psycopg
+        from psycopg.rows import dict_row
+        with psycopg.connect(self.where) as conn:
+            with conn.cursor(name="backtest_source", row_factory=dict_row) as cur:
+                cur.itersize = self.chunk_rows
+                cur.execute(PG_SQL, {"sport": sport, "since": since, "until": until})
+                yield from cur
+            conn.rollback()
+
+    def sports(self) -> List[str]:
+        if self.kind == "archive":
+            from services.archive.segments import Archive, SegmentReader, segment_path
+            arc, seen = Archive(Path(self.where)), set()
+            for day in arc.days():
+                with SegmentReader(segment_path(arc.root, day)) as r:
+                    seen.update(r.entry(i)["sport_key"] for i in range(r.rows))  # index only
+            return sorted(seen)
+        import psycopg
+        with psycopg.connect(self.where) as conn:
+            return sorted(r[0] for r in conn.execute(PG_SPORTS_SQL))
+
+    def time_range(self, sport: str) -> Tuple[Optional[datetime], Optional[datetime]]:
+        if self.kind == "archive":
+            from services.archive.segments import Archive
+            days = Archive(Path(self.where)).days()
+            if not days:
+                return None, None
+            return (datetime.combine(days[0], datetime.min.time(), tzinfo=timezone.utc),
+                    datetime.combine(days[-1] + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc))
+        import psycopg
+        with psycopg.connect(self.where) as conn:
+            return conn.execute(PG_RANGE_SQL, (sport,)).fetchone()
+
+    def aliases(self) -> List[Tuple[str, str, str]]:
+        if self.kind != "pg":
+            return []
+        import psycopg
+        try:
+            with psycopg.connect(self.where) as conn:
+                return [tuple(r) for r in conn.execute(PG_ALIAS_SQL)]
+        except psycopg.Error:
+            return []  # table not created: built-ins only
+
+
+@dataclass(frozen=True)
+class Partition:
+    sport: str
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+    @property
+    def label(self) -> str:
+        if self.since is None:
+            return self.sport
+        return f"{self.sport}:{self.since.date().isoformat()}"
+
+
+def season_starts(sport: str, lo: datetime, hi: datetime) -> List[datetime]:
+    month = SEASON_START_MONTH.get(sport, 1)
+    out, year = [], lo.year - 1
+    while True:
+        cut = datetime(year, month, 1, tzinfo=timezone.utc)
+        if cut > hi:
+            return out
+        if cut > lo:
+            out.append(cut)
+        year += 1
+
+
+def partitions(
+    source: Source, sports: Sequence[str], since: Optional[datetime], until: Optional[datetime], split: str = "sport"
+) -> List[Partition]:
+    if split == "sport":
+        return [Partition(s, since, until) for s in sports]
+    if split != "season":
+        raise ValueError(f"split must be 'sport' or 'season', not {split!r}")
+    out = []
+    for s in sports:
+        lo, hi = since, until
+        if lo is None or hi is None:
+            r_lo, r_hi = source.time_range(s)
+            if r_lo is None:
+                continue
+            lo, hi = lo or r_lo, hi or r_hi
+        edges = [lo] + season_starts(s, lo, hi) + [hi]
+        out.extend(Partition(s, a, b) for a, b in zip(edges, edges[1:]))
+    return out
+
+
+# --------------------------------------------------------------------------------------
+# Strategies
+# --------------------------------------------------------------------------------------
+
+class Strategy:
+    """Subclass and override on_snapshot; return/yield PickIn or PickIn-shaped dicts.
+
+    Dicts may also carry "book". league defaults to the snapshot's sport and stake to
+    `self.stake`. One instance sees one partition's snapshots in fetched_at order.
+    """
+
+    name = "strategy"
+
+    def __init__(self, stake: float = 1.0, **params: Any) -> None:
+        self.stake = float(stake)
+        self.params = params
+
+    def on_snapshot(self, snap: Snapshot) -> Iterable[Any]:
+        return ()
+
+    def on_end(self) -> Iterable[Tuple[Snapshot, Any]]:
+        """Picks that depend on the end of the stream, as (snapshot, pick) pairs."""
+        return ()
+
+
+def load_strategy(spec: str, params: Dict[str, Any]) -> Strategy:
+    """'package.module:ClassName' -> instance."""
+    mod, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"strategy must look like 'module:Class', not {spec!r}")
+    cls = getattr(importlib.import_module(mod), attr)
+    return cls(**params)
+
+
+# --------------------------------------------------------------------------------------
+# Running
+# --------------------------------------------------------------------------------------
+
+def _record(picks: Dict[str, list], snap: Snapshot, pick: Any, strategy: Strategy) -> Optional[str]:
+    """Append one pick; returns why it was dropped ("late"/"invalid") or None."""
+    if snap.commence_time is not None and snap.fetched_at >= snap.commence_time:
+        return "late"  # no betting after kickoff
+    d = pick.dict() if isinstance(pick, PickIn) else dict(pick)
+    d.setdefault("league", snap.sport_key)
+    if d.get("stake") is None:
+        d["stake"] = strategy.stake
+    try:
+        p = PickIn(**{k: d.get(k) for k in PickIn.__fields__ if d.get(k) is not None})
+    except ValidationError:
+        return "invalid"  # e.g. prices outside the -2000..2000 compliance range
+    for k, v in (("game_uid", snap.game_uid), ("league", p.league), ("market_key", p.market_key),
+                 ("outcome", p.outcome), ("price", p.price), ("point", p.point), ("stake", p.stake),
+                 ("book", d.get("book")), ("placed_at", snap.fetched_at.isoformat())):
+        picks[k].append(v)
+    return None
+
+
+def run_partition(task: Tuple[Source, Partition, str, Dict[str, Any], List[Tuple[str, str, str]]]) -> Dict[str, Any]:
+    """Worker entry point: stream one partition through a fresh strategy; returns columnar picks."""
+    source, part, spec, params, aliases = task
+    t0 = time.perf_counter()
+    resolver = TeamResolver(ttl=float("inf"))
+    resolver.set_aliases(aliases)
+    strategy = load_strategy(spec, params)
+    picks: Dict[str, list] = {k: [] for k in PICK_FIELDS}
+    dropped = {"late": 0, "invalid": 0}
+    snapshots = 0
+    for row in source.rows(part.sport, part.since, part.until):
+        snap = to_snapshot(row, resolver)
+        snapshots += 1
+        for pick in strategy.on_snapshot(snap) or ():
+            why = _record(picks, snap, pick, strategy)
+            if why:
+                dropped[why] += 1
+    for snap, pick in strategy.on_end() or ():
+        why = _record(picks, snap, pick, strategy)
+        if why:
+            dropped[why] += 1
+    return {
+        "partition": part.label,
+        "snapshots": snapshots,
+        "picks": picks,
+        "dropped_picks": dropped,
+        "unresolved_outcomes": sum(u["count"] for u in resolver.unresolved(limit=10 ** 6)),
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+
+
+def run_backtest(
+    source: Source,
+    spec: str,
+    params: Optional[Dict[str, Any]] = None,
+    sports: Optional[Sequence[str]] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    split: str = "sport",
+    workers: int = 0,
+) -> Dict[str, Any]:
+    """Run every partition (in a process pool unless workers <= 1) and merge the pick columns."""
+    params = params or {}
+    load_strategy(spec, params)  # fail fast on a bad spec/params before forking
+    sports = list(sports or source.sports())
+    parts = partitions(source, sports, since, until, split)
+    aliases = source.aliases()
+    tasks = [(source, p, spec, params, aliases) for p in parts]
+    t0 = time.perf_counter()
+    if workers == 1 or len(tasks) <= 1:
+        results = [run_partition(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers or None) as ex:
+            results = list(ex.map(run_partition, tasks))
+    picks: Dict[str, list] = {k: [] for k in PICK_FIELDS}
+    for r in results:
+        for k in PICK_FIELDS:
+            picks[k].extend(r["picks"][k])
+    return {
+        "picks": picks,
+        "partitions": [{k: v for k, v in r.items() if k != "picks"} | {"picks": len(r["picks"]["game_uid"])}
+                       for r in results],
+        "snapshots": sum(r["snapshots"] for r in results),
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+
+
+# --------------------------------------------------------------------------------------
+# Results and grading
+# --------------------------------------------------------------------------------------
+
+def load_results(path: Path) -> Dict[str, Tuple[float, float]]:
+    """Final scores keyed by game_uid ("<sport_key>:<game_id>").
+
+    Accepts CSV with game_uid,home_score,away_score (or sport_key,game_id,...), a JSON list of the
+    same objects, or the Odds API /v4/sports/{sport}/scores response (completed events only).
+    """
+    path = Path(path)
+    text = path.read_text()
+    if path.suffix.lower() == ".csv":
+        import csv
+        items: List[Dict[str, Any]] = list(csv.DictReader(text.splitlines()))
+    else:
+        items = json.loads(text)
+    out: Dict[str, Tuple[float, float]] = {}
+    for it in items:
+        if "scores" in it:  # Odds API scores event
+            if not it.get("completed") or not it.get("scores"):
+                continue
+            by_name = {s["name"]: float(s["score"]) for s in it["scores"]}
+            uid = f"{it['sport_key']}:{it['id']}"
+            try:
+                out[uid] = (by_name[it["home_team"]], by_name[it["away_team"]])
+            except KeyError:
+                continue
+            continue
+        uid = it.get("game_uid") or f"{it['sport_key']}:{it['game_id']}"
+        out[uid] = (float(it["home_score"]), float(it["away_score"]))
+    return out
+
+
+def american_to_profit(price: np.ndarray) -> np.ndarray:
+    """Profit per unit staked on a win."""
+    return np.where(price > 0, price / 100.0, 100.0 / np.abs(price))
+
+
+def grade(picks: Dict[str, list], results: Dict[str, Tuple[float, float]]) -> Dict[str, np.ndarray]:
+    """Vectorized settlement: returns per-pick result (1 win, 0 push, -1 loss, nan unsettled) and profit."""
+    n = len(picks["game_uid"])
+    scores = np.full((n, 2), np.nan)
+    for i, uid in enumerate(picks["game_uid"]):
+        s = results.get(uid)
+        if s is not None:
+            scores[i] = s
+    home, away = scores[:, 0], scores[:, 1]
+    market = np.asarray(picks["market_key"], dtype=object)
+    outcome = np.asarray(picks["outcome"], dtype=object)
+    price = np.asarray(picks["price"], dtype=float)
+    stake = np.asarray(picks["stake"], dtype=float)
+    point = np.array([np.nan if p is None else p for p in picks["point"]], dtype=float)
+    pt = np.nan_to_num(point)
+
+    margin = home - away
+    # signed amount the chosen side wins by; > 0 win, 0 push, < 0 loss
+    edge = np.full(n, np.nan)
+    h2h, spr, tot = market == "h2h", market == "spreads", market == "totals"
+    is_home, is_away = outcome == "home", outcome == "away"
+    # three-way moneyline (soccer, or any game with a draw pick): a draw loses for home and away
+    league = np.asarray(picks.get("league") or [None] * n, dtype=object)
+    draw_games = {uid for uid, o, m in zip(picks["game_uid"], outcome, market) if m == "h2h" and o == "draw"}
+    three_way = h2h & np.array(
+        [str(lg or "").startswith("soccer") or uid in draw_games for lg, uid in zip(league, picks["game_uid"])],
+        dtype=bool,
+    )
+    edge = np.where(h2h & is_home, np.where(three_way & (margin == 0), -1.0, margin), edge)
+    edge = np.where(h2h & is_away, np.where(three_way & (margin == 0), -1.0, -margin), edge)
+    edge = np.where(h2h & (outcome == "draw"), np.where(margin == 0, 1.0, -1.0), edge)
+    edge = np.where(spr & is_home, margin + pt, edge)
+    edge = np.where(spr & is_away, -margin + pt, edge)
+    edge = np.where(tot & (outcome == "over"), home + away - pt, edge)
+    edge = np.where(tot & (outcome == "under"), pt - (home + away), edge)
+    # a two-way moneyline that ends level is a push; a spread/total without a point can't be graded
+    edge = np.where((spr | tot) & np.isnan(point), np.nan, edge)
+
+    result = np.sign(edge)
+    profit = np.select([result > 0, result < 0], [stake * american_to_profit(price), -stake], 0.0)
+    profit = np.where(np.isnan(result), np.nan, profit)
+    return {"result": result, "profit": profit, "stake": stake}
+
+
+def _summary(result: np.ndarray, profit: np.ndarray, stake: np.ndarray) -> Dict[str, Any]:
+    settled = ~np.isnan(result)
+    staked = float(stake[settled].sum())
+    pnl = float(profit[settled].sum())
+    won, lost = int((result == 1).sum()), int((result == -1).sum())
+    return {
+        "picks": int(result.size),
+        "settled": int(settled.sum()),
+        "won": won,
+        "lost": lost,
+        "push": int((result == 0).sum()),
+        "staked": round(staked, 2),
+        "profit": round(pnl, 2),
+        "roi": round(pnl / staked, 4) if staked else None,
+        "hit_rate": round(won / (won + lost), 4) if won + lost else None,
+    }
+
+
+def report(picks: Dict[str, list], results: Dict[str, Tuple[float, float]]) -> Dict[str, Any]:
+    g = grade(picks, results)
+    out: Dict[str, Any] = {"overall": _summary(g["result"], g["profit"], g["stake"])}
+    for key in ("league", "market_key"):
+        col = np.asarray(picks[key], dtype=object)
+        out[f"by_{key}"] = {
+            str(v): _summary(g["result"][col == v], g["profit"][col == v], g["stake"][col == v])
+            for v in sorted(set(picks[key]), key=str)
+        }
+    return out
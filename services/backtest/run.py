@@ -0,0 +1,89 @@
+# services/backtest/run.py
+# Backtest a pick strategy over odds_raw history
+#   python -m services.backtest.run --strategy services.backtest.strategies:ConsensusEdge -p edge=0.03 \
+#       --sports basketball_nba --since 2025-10-01 --until 2026-04-15 --results scores.json
+#   python -m services.backtest.run --archive archive/odds_raw --split season --workers 8 --results scores.csv
+# Reads DATABASE_URL unless --archive is given. Without --results picks are recorded but not graded.
+
+import os, sys, json, argparse
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+from services.backtest.engine import Source, load_results, report, run_backtest
+
+load_dotenv(".env.local", override=True)
+DATABASE_URL = os.getenv("DATABASE_URL")
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive/odds_raw")
+
+
+def _when(s: str) -> datetime:
+    d = datetime.fromisoformat(s)
+    return d if d.tzinfo else d.replace(tzinfo=timezone.utc)
+
+
+def _param(s: str):
+    k, _, v = s.partition("=")
+    try:
+        return k, json.loads(v)
+    except ValueError:
+        return k, v
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay odds snapshots through a strategy and grade its picks.")
+    parser.add_argument("--strategy", default="services.backtest.strategies:ConsensusEdge", help="module:Class")
+    parser.add_argument("-p", "--param", action="append", default=[], type=_param, help="strategy kwarg, key=value")
+    src = parser.add_mutually_exclusive_group()
+    src.add_argument("--dsn", default=None, help="Postgres to stream odds_raw from (default DATABASE_URL)")
+    src.add_argument("--archive", nargs="?", const=ARCHIVE_DIR, default=None, help="segment directory instead of Postgres")
+    parser.add_argument("--sports", default="", help="comma-separated sport keys (default: every sport in the source)")
+    parser.add_argument("--since", type=_when, default=None)
+    parser.add_argument("--until", type=_when, default=None, help="exclusive")
+    parser.add_argument("--split", choices=("sport", "season"), default="sport")
+    parser.add_argument("--workers", type=int, default=0, help="processes (0 = one per CPU, 1 = in-process)")
+    parser.add_argument("--chunk-rows", type=int, default=2000, help="Postgres cursor fetch size")
+    parser.add_argument("--results", default=None, help="final scores: CSV/JSON or an Odds API /scores dump")
+    parser.add_argument("--picks-out", default=None, help="write picks as JSON lines")
+    parser.add_argument("--out", default=None, help="write the report here as well as stdout")
+    args = parser.parse_args()
+
+    if args.archive:
+        source = Source("archive", args.archive)
+    else:
+        dsn = args.dsn or DATABASE_URL
+        if not dsn:
+            print("DATABASE_URL missing (or pass --dsn / --archive)", file=sys.stderr)
+            sys.exit(2)
+        source = Source("pg", dsn, chunk_rows=args.chunk_rows)
+
+    sports = [s.strip() for s in args.sports.split(",") if s.strip()]
+    run = run_backtest(source, args.strategy, dict(args.param), sports, args.since, args.until, args.split, args.workers)
+    picks = run["picks"]
+
+    if args.picks_out:
+        cols = list(picks)
+        with open(args.picks_out, "w") as f:
+            for row in zip(*(picks[c] for c in cols)):
+                f.write(json.dumps(dict(zip(cols, row))) + "\n")
+
+    out = {
+        "strategy": args.strategy,
+        "params": dict(args.param),
+        "source": {"kind": source.kind, "sports": sports or "all", "split": args.split,
+                   "since": args.since and args.since.isoformat(), "until": args.until and args.until.isoformat()},
+        "snapshots": run["snapshots"],
+        "seconds": run["seconds"],
+        "partitions": run["partitions"],
+        "picks": len(picks["game_uid"]),
+    }
+    if args.results:
+        out["results"] = report(picks, load_results(args.results))
+    text = json.dumps(out, indent=2, default=str)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# services/backtest/strategies.py
+# Reference strategies for services.backtest (pass as services.backtest.strategies:<Class>)
+
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Set, Tuple
+
+from services.backtest.engine import Line, Snapshot, Strategy
+
+
+def implied(price: float) -> float:
+    """American price -> implied probability (vig included)."""
+    return 100.0 / (price + 100.0) if price > 0 else -price / (-price + 100.0)
+
+
+def _payout(price: float) -> float:
+    return price / 100.0 if price > 0 else 100.0 / -price
+
+
+class ConsensusEdge(Strategy):
+    """Bet the best available price when it beats the no-vig consensus by `edge`.
+
+    Consensus per side is the mean implied probability across books, normalized so the sides of the
+    market sum to 1. Spreads/totals only compare books quoting the same point as the best price.
+    One pick per (game, market), the first time the edge appears.
+    """
+
+    name = "consensus_edge"
+
+    def __init__(self, edge: float = 0.03, markets: str = "h2h", min_books: int = 3, **kw: Any) -> None:
+        super().__init__(**kw)
+        self.edge = float(edge)
+        self.markets = tuple(m.strip() for m in str(markets).split(",") if m.strip())
+        self.min_books = int(min_books)
+        self._done: Set[Tuple[str, str]] = set()
+
+    def on_snapshot(self, snap: Snapshot) -> Iterable[Dict[str, Any]]:
+        for market in self.markets:
+            if (snap.game_uid, market) in self._done:
+                continue
+            by_side: Dict[str, list] = {}
+            for ln in snap.lines:
+                if ln.market_key == market:
+                    by_side.setdefault(ln.side, []).append(ln)
+            if len(by_side) < 2:
+                continue
+            best = {side: max(lines, key=lambda ln: _payout(ln.price)) for side, lines in by_side.items()}
+            mean_p = {}
+            for side, lines in by_side.items():
+                same = [ln for ln in lines if ln.point == best[side].point]
+                if len(same) < self.min_books:
+                    break
+                mean_p[side] = sum(implied(ln.price) for ln in same) / len(same)
+            else:
+                total = sum(mean_p.values())
+                for side, ln in best.items():
+                    fair = mean_p[side] / total
+                    if fair * (1.0 + _payout(ln.price)) - 1.0 >= self.edge:
+                        self._done.add((snap.game_uid, market))
+                        yield _pick(market, side, ln)
+                        break
+
+
+class Favorite(Strategy):
+    """Baseline: back the consensus moneyline favorite once, `minutes_before` kickoff or later."""
+
+    name = "favorite"
+
+    def __init__(self, minutes_before: float = 60.0, **kw: Any) -> None:
+        super().__init__(**kw)
+        self.window = timedelta(minutes=float(minutes_before))
+        self._done: Set[str] = set()
+
+    def on_snapshot(self, snap: Snapshot) -> Iterable[Dict[str, Any]]:
+        if snap.game_uid in self._done or snap.commence_time is None:
+            return
+        if snap.commence_time - snap.fetched_at > self.window:
+            return
+        home, away = snap.prices("h2h", "home"), snap.prices("h2h", "away")
+        if not home or not away:
+            return
+        p_home = sum(implied(ln.price) for ln in home) / len(home)
+        p_away = sum(implied(ln.price) for ln in away) / len(away)
+        side, lines = ("home", home) if p_home >= p_away else ("away", away)
+        self._done.add(snap.game_uid)
+        yield _pick("h2h", side, max(lines, key=lambda ln: _payout(ln.price)))
+
+
+def _pick(market: str, side: str, ln: Line) -> Dict[str, Any]:
+    return {"market_key": market, "outcome": side, "price": ln.price, "point": ln.point, "book": ln.book}
@@ -0,0 +1,35 @@
+# services/common/auth.py
+# Admin-token dependency for services without their own require_admin (core, gsa_core, gsa_coach)
+# - Same contract as portfolio's require_admin: the 64-char ADMIN_TOKEN (or TOKEN) in
+#   "Authorization: Bearer <TOKEN>" or "x-gsa-token"; unset or malformed token -> 500, so admin routes
+#   are never served open
+
+import hmac
+import os
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+ADMIN_LEN_EXPECTED = 64
+
+
+def _admin_token() -> Optional[str]:
+    # read per call: apps load .env.local after importing this module
+    return os.environ.get("ADMIN_TOKEN") or os.environ.get("TOKEN")
+
+
+async def require_admin_token(
+    authorization: Optional[str] = Header(None, convert_underscores=False),
+    x_gsa_token: Optional[str] = Header(None),
+) -> str:
+    token = _admin_token()
+    if not token or len(token) != ADMIN_LEN_EXPECTED:
+        raise HTTPException(status_code=500, detail="admin token not configured")
+    supplied: Optional[str] = None
+    if authorization and authorization.lower().startswith("bearer "):
+        supplied = authorization.split(" ", 1)[1].strip()
+    if not supplied and x_gsa_token:
+        supplied = x_gsa_token.strip()
+    if supplied and hmac.compare_digest(supplied, token):
+        return supplied
+    raise HTTPException(status_code=401, detail="unauthorized")
@@ -0,0 +1,175 @@
+# services/common/clv.py
+# Closing-line value for picks (portfolio and gsa_portfolio)
+# - odds_norm.closing_odds holds each series' last pre-kickoff quote (services/db/closing_odds.py), so
+#   grading is one set-based query: the picks (a request body unnested into rows, or a user's stored picks)
+#   are joined to the closing rows of their games through the (game_uid, market_key, side, book_key) key
+# - Per pick:
+#   - clv: pick decimal odds / same-book closing decimal odds - 1, when the book closed on the pick's line
+#   - close_prob: de-vigged consensus closing probability of the pick's side (closing_odds.fair_prob,
+#     each book's implied probabilities scaled to 1 when frozen, averaged over books that closed on the
+#     pick's line)
+#   - close_ev: close_prob * pick decimal odds - 1 (expected return if the close was the fair price)
+#   - line_clv: points gained against the same book's closing line (spreads and totals)
+# Picks whose game has not been frozen yet come back with nulls and are left out of the summary.
+
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import APIRouter, FastAPI, Query
+from psycopg.rows import dict_row
+from pydantic import BaseModel, Field
+
+from services.common.picks import PickIn
+from services.common.querylog import pg_execute_async
+from services.common.statements import StatementRegistry
+
+CLV_MAX_PICKS = int(os.getenv("CLV_MAX_PICKS", "50000"))
+
+
+# {picks} yields (id, game_uid, market_key, outcome, book_key, price, point); spliced from PICK_SOURCES only.
+# Both joins are primary-key lookups: the same book's close by the full key, the consensus by its
+# (game_uid, market_key, side) prefix
+CLV_SQL = """
+WITH p AS ({picks})
+SELECT p.id, p.game_uid, p.market_key, p.outcome, p.book_key, p.price, p.point,
+       b.price AS close_price, b.point AS close_point, m.close_prob, m.close_books
+FROM p
+LEFT JOIN odds_norm.closing_odds b
+  ON (b.game_uid, b.market_key, b.side, b.book_key) = (p.game_uid, p.market_key, p.outcome, p.book_key)
+LEFT JOIN LATERAL (
+  SELECT avg(m.fair_prob) AS close_prob, count(*)::int AS close_books
+  FROM odds_norm.closing_odds m
+  WHERE (m.game_uid, m.market_key, m.side) = (p.game_uid, p.market_key, p.outcome)
+    AND m.fair_prob IS NOT NULL
+    AND (p.point IS NULL OR m.point = p.point)
+) m ON true
+ORDER BY p.id
+"""
+
+PICK_SOURCES = {
+    # request body, one array per column; id is the pick's position in the request
+    "body": """
+  SELECT u.ord::bigint AS id, u.game_uid, u.market_key, u.outcome, u.book_key, u.price, u.point
+  FROM unnest(%(game_uids)s::text[], %(market_keys)s::text[], %(outcomes)s::text[], %(book_keys)s::text[],
+              %(prices)s::numeric[], %(points)s::numeric[])
+       WITH ORDINALITY AS u(game_uid, market_key, outcome, book_key, price, point, ord)""",
+    "user": """
+  SELECT k.id, k.game_uid, k.market_key, k.outcome, k.book_key, k.price, k.point
+  FROM picks k
+  WHERE k.user_id = %(user_id)s AND k.game_uid IS NOT NULL
+    AND (%(status)s::text IS NULL OR k.status = %(status)s)""",
+}
+
+
+class ClvPick(PickIn):
+    game_uid: str
+    book_key: Optional[str] = None
+
+
+class ClvRequest(BaseModel):
+    picks: List[ClvPick] = Field(..., min_length=1, max_length=CLV_MAX_PICKS)
+
+
+def _decimal(price: float) -> float:
+    return 1 + price / 100 if price > 0 else 1 + 100 / -price
+
+
+def _line_clv(market_key: str, outcome: str, point: Optional[float], close_point: Optional[float]) -> Optional[float]:
+    """Points gained against the close: a spread pick wants more points, over a lower total, under a higher one."""
+    if point is None or close_point is None or market_key == "h2h":
+        return None
+    if market_key == "totals" and outcome == "over":
+        return close_point - point
+    return point - close_point
+
+
+def grade(r: Dict[str, Any]) -> Dict[str, Any]:
+    price = float(r["price"])
+    point = None if r["point"] is None else float(r["point"])
+    close_price = None if r["close_price"] is None else float(r["close_price"])
+    close_point = None if r["close_point"] is None else float(r["close_point"])
+    close_prob = None if r["close_prob"] is None else float(r["close_prob"])
+    same_line = close_price is not None and (point is None or close_point == point)
+    return {
+        "id": r["id"],
+        "game_uid": r["game_uid"],
+        "market_key": r["market_key"],
+        "outcome": r["outcome"],
+        "book_key": r["book_key"],
+        "price": price,
+        "point": point,
+        "close_price": close_price,
+        "close_point": close_point,
+        "clv": round(_decimal(price) / _decimal(close_price) - 1, 4) if same_line else None,
+        "line_clv": _line_clv(r["market_key"], r["outcome"], point, close_point),
+        "close_prob": round(close_prob, 4) if close_prob is not None else None,
+        "close_books": r["close_books"],
+        "close_ev": round(close_prob * _decimal(price) - 1, 4) if close_prob is not None else None,
+    }
+
+
+def summarize(graded: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    def _avg(key: str) -> Dict[str, Any]:
+        vals = [g[key] for g in graded if g[key] is not None]
+        return {
+            "picks": len(vals),
+            "mean": round(sum(vals) / len(vals), 4) if vals else None,
+            "beat_close": round(sum(v > 0 for v in vals) / len(vals), 4) if vals else None,
+        }
+
+    return {
+        "picks": len(graded),
+        "closed": sum(g["close_price"] is not None or g["close_prob"] is not None for g in graded),
+        "clv": _avg("clv"),
+        "close_ev": _avg("close_ev"),
+        "line_clv": _avg("line_clv"),
+    }
+
+
+def install_clv(
+    app: FastAPI | APIRouter,
+    pool: Any,
+    statements: Optional[StatementRegistry] = None,
+    prefix: str = "/portfolio",
+    dependencies: Sequence[Any] = (),
+) -> None:
+    """Mount bulk CLV grading under `prefix` (psycopg pool)."""
+    prepare = statements.prepare if statements else None
+    sql = {k: CLV_SQL.format(picks=v) for k, v in PICK_SOURCES.items()}
+    if statements:
+        for k, v in sql.items():
+            statements.add(f"clv_{k}", v)
+    deps = list(dependencies)
+
+    async def _grade(source: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if pool.closed:
+            await pool.open()
+        async with pool.connection() as ac, ac.cursor(row_factory=dict_row) as cur:
+            await pg_execute_async(cur, f"clv_{source}", sql[source], params, prepare=prepare)
+            return [grade(r) for r in await cur.fetchall()]
+
+    @app.post(prefix + "/clv", dependencies=deps, tags=["portfolio"])
+    async def clv_bulk(body: ClvRequest, details: bool = Query(True, description="include per-pick rows")) -> Dict[str, Any]:
+        """CLV of up to CLV_MAX_PICKS picks against odds_norm.closing_odds (ids are request positions, from 1)."""
+        params = {
+            "game_uids": [p.game_uid for p in body.picks],
+            "market_keys": [p.market_key for p in body.picks],
+            "outcomes": [p.outcome for p in body.picks],
+            "book_keys": [p.book_key for p in body.picks],
+            "prices": [p.price for p in body.picks],
+            "points": [p.point for p in body.picks],
+        }
+        graded = await _grade("body", params)
+        return {"summary": summarize(graded), **({"picks": graded} if details else {})}
+
+    @app.get(prefix + "/clv", dependencies=deps, tags=["portfolio"])
+    async def clv_user(
+        user_id: str = Query(...),
+        status: Optional[str] = Query(None, description="open or settled (default: both)"),
+        details: bool = Query(False, description="include per-pick rows"),
+    ) -> Dict[str, Any]:
+        """CLV of a user's stored picks (those placed with a game_uid)."""
+        graded = await _grade("user", {"user_id": user_id, "status": status})
+        return {"user_id": user_id, "summary": summarize(graded), **({"picks": graded} if details else {})}
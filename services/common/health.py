@@ -0,0 +1,210 @@
+# services/common/health.py
+# Cached health/readiness for every service
+# - A background task runs each probe (DB, Odds API, ...) on an interval and keeps the last result
+# - /health answers from that cached state: no connection, no I/O on the request path
+# - /ready adds pool saturation (asyncpg or psycopg_pool) on top of the cached probes
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+Probe = Callable[[], Union[Any, Awaitable[Any]]]
+
+
+class HealthProber:
+    """Runs named probes in the background and caches status, latency and timestamps."""
+
+    def __init__(
+        self,
+        service: str,
+        interval: float = 15.0,
+        timeout: float = 5.0,
+        max_age: Optional[float] = None,
+    ) -> None:
+        self.service = service
+        self.interval = interval
+        self.timeout = timeout
+        # results older than this count as failed (probe loop stuck or not started)
+        self.max_age = max_age if max_age is not None else interval * 4
+        self._probes: Dict[str, Dict[str, Any]] = {}
+        self._state: Dict[str, Dict[str, Any]] = {}
+        self._pool_stats: Optional[Callable[[], Dict[str, Any]]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add_probe(self, name: str, fn: Probe, interval: Optional[float] = None, critical: bool = True) -> None:
+        """Sync probes run in a worker thread; a probe fails by raising."""
+        self._probes[name] = {"fn": fn, "interval": interval or self.interval, "critical": critical}
+        self._state[name] = {"status": "unknown", "critical": critical}
+
+    def set_pool_stats(self, fn: Callable[[], Dict[str, Any]]) -> None:
+        self._pool_stats = fn
+
+    # -- lifecycle ---------------------------------------------------------------
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            # first round inline so /health is meaningful as soon as the app serves
+            await asyncio.gather(*(self._probe(n) for n in self._probes))
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        next_at = {name: time.monotonic() + p["interval"] for name, p in self._probes.items()}
+        while True:
+            now = time.monotonic()
+            due = [n for n, at in next_at.items() if at <= now]
+            if due:
+                await asyncio.gather(*(self._probe(n) for n in due))
+                for n in due:
+                    next_at[n] = time.monotonic() + self._probes[n]["interval"]
+            await asyncio.sleep(max(0.5, min(next_at.values()) - time.monotonic()) if next_at else self.interval)
+
+    async def _probe(self, name: str) -> None:
+        fn = self._probes[name]["fn"]
+        t0 = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(fn):
+                detail = await asyncio.wait_for(fn(), self.timeout)
+            else:
+                detail = await asyncio.wait_for(asyncio.to_thread(fn), self.timeout)
+            status, error = "ok", None
+        except Exception as e:
+            detail, status, error = None, "error", f"{type(e).__name__}: {e}"
+        prev = self._state.get(name, {})
+        st: Dict[str, Any] = {
+            "status": status,
+            "critical": self._probes[name]["critical"],
+            "latency_ms": round((time.perf_counter() - t0) * 1000, 1),
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "_checked_mono": time.monotonic(),
+            "last_ok_at": datetime.now(timezone.utc).isoformat() if status == "ok" else prev.get("last_ok_at"),
+        }
+        if error:
+            st["error"] = error
+        if isinstance(detail, dict):
+            st["detail"] = detail
+        self._state[name] = st
+
+    # -- reads -------------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        checks: Dict[str, Any] = {}
+        healthy = True
+        for name, st in self._state.items():
+            st = {k: v for k, v in st.items() if not k.startswith("_")}
+            checked = self._state[name].get("_checked_mono")
+            if st["status"] == "ok" and (checked is None or now - checked > self.max_age):
+                st["status"] = "stale"
+            if st["critical"] and st["status"] != "ok":
+                healthy = False
+            checks[name] = st
+        return {"service": self.service, "status": "ok" if healthy else "degraded", "checks": checks}
+
+    def readiness(self, max_waiting: int = 0) -> Dict[str, Any]:
+        out = self.snapshot()
+        ready = out["status"] == "ok"
+        if self._pool_stats is not None:
+            try:
+                pool = self._pool_stats()
+            except Exception as e:
+                pool = {"error": str(e)}
+                ready = False
+            out["pool"] = pool
+            if pool.get("saturated") and pool.get("waiting", 0) > max_waiting:
+                ready = False
+        out["ready"] = ready
+        return out
+
+    # -- wiring ------------------------------------------------------------------
+
+    def install(self, app: FastAPI, ready_max_waiting: int = 0) -> None:
+        """Start/stop with the app and mount GET /health and GET /ready."""
+        app.add_event_handler("startup", self.start)
+        app.add_event_handler("shutdown", self.stop)
+
+        @app.get("/health", tags=["health"])
+        async def health() -> JSONResponse:
+            snap = self.snapshot()
+            # keep the historic contract: {"service": ..., "db": "ok"} on success
+            if "db" in snap["checks"]:
+                snap["db"] = snap["checks"]["db"]["status"]
+            return JSONResponse(snap, status_code=200 if snap["status"] == "ok" else 503)
+
+        @app.get("/ready", tags=["health"])
+        async def ready() -> JSONResponse:
+            r = self.readiness(ready_max_waiting)
+            return JSONResponse(r, status_code=200 if r["ready"] else 503)
+
+
+# --------------------------------------------------------------------------------------
+# Pool stats adapters
+# --------------------------------------------------------------------------------------
+
+def asyncpg_pool_stats(get_pool: Callable[[], Any], statements: Any = None) -> Callable[[], Dict[str, Any]]:
+    """Saturation for an asyncpg pool (looked up lazily; pools are created at startup).
+
+    `statements` (a services.common.statements.StatementRegistry) adds its prepare stats.
+    """
+
+    def stats() -> Dict[str, Any]:
+        pool = get_pool()
+        if pool is None:
+            return {"open": False, "saturated": True, "waiting": 1}
+        size, idle, max_size = pool.get_size(), pool.get_idle_size(), pool.get_max_size()
+        in_use = size - idle
+        out = {
+            "open": True,
+            "size": size,
+            "idle": idle,
+            "in_use": in_use,
+            "max_size": max_size,
+            "saturated": in_use >= max_size,
+            # asyncpg doesn't expose its waiter queue; full pool == callers are queueing
+            "waiting": 1 if in_use >= max_size else 0,
+        }
+        if statements is not None:
+            out["prepared"] = statements.stats()
+        return out
+
+    return stats
+
+
+def psycopg_pool_stats(pool: Any, statements: Any = None) -> Callable[[], Dict[str, Any]]:
+    """Saturation for a psycopg_pool pool, from its own counters (plus prepare stats, as above)."""
+
+    def stats() -> Dict[str, Any]:
+        if pool.closed:
+            return {"open": False, "saturated": True, "waiting": 1}
+        s = pool.get_stats()
+        size, available = s.get("pool_size", 0), s.get("pool_available", 0)
+        waiting = s.get("requests_waiting", 0)
+        out = {
+            "open": True,
+            "size": size,
+            "idle": available,
+            "in_use": size - available,
+            "max_size": pool.max_size,
+            "waiting": waiting,
+            "saturated": available == 0 and size >= pool.max_size,
+        }
+        if statements is not None:
+            out["prepared"] = statements.stats()
+        return out
+
+    return stats
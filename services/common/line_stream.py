@@ -0,0 +1,197 @@
+# services/common/line_stream.py
+# Push best-line changes to long-lived clients (SSE and WebSocket)
+# - One LineBroadcaster per worker watches the shared board (services/common/shared_board.py):
+#   a header read every STREAM_POLL_SECONDS, no DB. When the version moves and the rows differ,
+#   it diffs the new board against the previous one by (sport_key, game_id)
+# - Changes are grouped per sport and encoded once; each subscriber only gets a queue put of the
+#   pre-encoded message for the sports it asked for, so fan-out cost doesn't depend on payload size
+# - A new subscriber first receives a snapshot of its sports, then only changes
+# - Slow consumers whose queue fills up are dropped (they reconnect and get a fresh snapshot)
+# Ingest sends NOTIFY ODDS_NOTIFY_CHANNEL after writing odds_raw; the board leader LISTENs and
+# refreshes right away, so changes reach clients in well under the board interval.
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+from services.common.shared_board import SharedBoard
+
+log = logging.getLogger(__name__)
+
+ODDS_NOTIFY_CHANNEL = os.getenv("ODDS_NOTIFY_CHANNEL", "odds_changed")
+STREAM_POLL_SECONDS = float(os.getenv("STREAM_POLL_SECONDS", "0.25"))
+STREAM_QUEUE = int(os.getenv("STREAM_QUEUE", "256"))
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+
+Key = Tuple[str, str]
+
+
+def diff_rows(prev: Dict[Key, bytes], rows: Iterable[bytes]) -> Tuple[Dict[Key, bytes], Dict[str, Dict[str, Any]]]:
+    """New key -> row map, plus per-sport {"upserts": [row...], "removed": [game_id...]}."""
+    cur: Dict[Key, bytes] = {}
+    changes: Dict[str, Dict[str, Any]] = {}
+    for raw in rows:
+        row = json.loads(raw)
+        key = (row["sport_key"], row["game_id"])
+        cur[key] = raw
+        if prev.get(key) != raw:
+            changes.setdefault(key[0], {"upserts": [], "removed": []})["upserts"].append(row)
+    for key in prev.keys() - cur.keys():
+        changes.setdefault(key[0], {"upserts": [], "removed": []})["removed"].append(key[1])
+    return cur, changes
+
+
+class Message:
+    """One encoded message shared by every subscriber; the SSE frame is built once, on first use."""
+
+    __slots__ = ("kind", "text", "_sse")
+
+    def __init__(self, kind: str, text: str) -> None:
+        self.kind = kind
+        self.text = text
+        self._sse: Optional[bytes] = None
+
+    @property
+    def sse(self) -> bytes:
+        if self._sse is None:
+            self._sse = f"event: {self.kind}\ndata: {self.text}\n\n".encode()
+        return self._sse
+
+
+class Subscriber:
+    __slots__ = ("sports", "queue", "dropped")
+
+    def __init__(self, sports: Optional[Set[str]]) -> None:
+        self.sports = sports  # None = every sport
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE)
+        self.dropped = False
+
+    def wants(self, sport: str) -> bool:
+        return self.sports is None or sport in self.sports
+
+
+class LineBroadcaster:
+    """Per-worker fan-out of board changes. Each message covers one sport:
+    {"type": "snapshot"|"changes", "version": int, "sport_key": str, "upserts": [row...], "removed": [game_id...]}"""
+
+    def __init__(self, board: SharedBoard, poll: float = STREAM_POLL_SECONDS) -> None:
+        self.board = board
+        self.poll = poll
+        self._subs: Set[Subscriber] = set()
+        self._rows: Dict[Key, bytes] = {}
+        self._digest: Optional[bytes] = None
+        self._loaded = False
+        self.version = 0
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+
+    # -- lifecycle ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for sub in list(self._subs):
+            self._drop(sub)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                log.warning("line stream tick failed: %s", e)
+            await asyncio.sleep(self.poll)
+
+    def tick(self) -> None:
+        h = self.board.header()
+        if h is None or h["version"] == self.version:
+            return
+        snap = self.board.snapshot()
+        if snap is None:
+            return
+        version, rows = snap
+        digest = hashlib.blake2b(b"\n".join(rows), digest_size=16).digest()
+        self.version = version
+        if digest == self._digest:
+            return  # periodic refresh with identical rows: nothing to send
+        self._digest = digest
+        self._rows, changes = diff_rows(self._rows, rows)
+        if not self._loaded:
+            self._loaded = True
+            return  # initial load: subscribers get snapshots, not a flood of upserts
+        for sport, ch in changes.items():
+            msg = self._encode({"type": "changes", "version": version, "sport_key": sport, **ch})
+            for sub in list(self._subs):
+                if sub.wants(sport):
+                    self._put(sub, msg)
+            self.published += 1
+
+    # -- subscribers ----------------------------------------------------------------
+
+    def subscribe(self, sports: Optional[Iterable[str]] = None) -> Subscriber:
+        if not self._loaded:
+            self.tick()
+        sub = Subscriber(set(sports) if sports else None)
+        by_sport: Dict[str, List[Any]] = {s: [] for s in sub.sports or ()}
+        for (sport, _), raw in self._rows.items():
+            if sub.wants(sport):
+                by_sport.setdefault(sport, []).append(json.loads(raw))
+        for sport, rows in sorted(by_sport.items()):
+            self._put(sub, self._encode({"type": "snapshot", "version": self.version, "sport_key": sport,
+                                         "upserts": rows, "removed": []}))
+        self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        self._subs.discard(sub)
+
+    async def listen(self, sub: Subscriber, heartbeat: float = STREAM_HEARTBEAT_SECONDS) -> AsyncIterator[Optional[Message]]:
+        """Messages for `sub` (None every `heartbeat` seconds of silence); ends when it is dropped."""
+        try:
+            while not sub.dropped:
+                try:
+                    msg = await asyncio.wait_for(sub.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if msg is None or sub.dropped:
+                    return
+                yield msg
+        finally:
+            self.unsubscribe(sub)
+
+    def _put(self, sub: Subscriber, msg: Message) -> None:
+        try:
+            sub.queue.put_nowait(msg)
+        except asyncio.QueueFull:
+            self._drop(sub)
+
+    def _drop(self, sub: Subscriber) -> None:
+        sub.dropped = True
+        self._subs.discard(sub)
+        try:
+            sub.queue.put_nowait(None)  # wake the consumer so it closes
+        except asyncio.QueueFull:
+            pass
+
+    @staticmethod
+    def _encode(msg: Dict[str, Any]) -> Message:
+        return Message(msg["type"], json.dumps(msg, separators=(",", ":")))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"subscribers": len(self._subs), "version": self.version, "rows": len(self._rows),
+                "published": self.published}
+
@@ -0,0 +1,256 @@
+# services/common/metrics.py
+# Minimal Prometheus instrumentation shared by every FastAPI app (no client library needed)
+# - ASGI middleware: per-route latency histogram + in-flight gauge (route = path template)
+# - DB helpers: pool acquire-wait and per-statement query-time histograms (asyncpg, psycopg_pool, psycopg)
+# - GET /metrics renders everything in the Prometheus text format
+# Metrics are per process; with several uvicorn workers each worker is scraped separately.
+
+from __future__ import annotations
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+_Key = Tuple[str, ...]
+
+
+def _esc(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_esc(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(v: float) -> str:
+    return "+Inf" if v == float("inf") else repr(float(v))
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()  # sync routes observe from the threadpool
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, Any]) -> _Key:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines (no HELP/TYPE header)."""
+
+    def render(self) -> str:
+        head = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(head + self._samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self._values: Dict[_Key, float] = {}
+        super().__init__(name, help, labelnames)
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        k = self._key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count], sum
+        self._values: Dict[_Key, Tuple[List[int], List[float]]] = {}
+        super().__init__(name, help, labelnames)
+
+    def observe(self, value: float, **labels: Any) -> None:
+        k = self._key(labels)
+        i = 0
+        for i, b in enumerate(self.buckets):
+            if value <= b:
+                break
+        else:
+            i = len(self.buckets)
+        with self._lock:
+            counts, total = self._values.setdefault(k, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[i] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(c), t[0]) for k, (c, t) in self._values.items()]
+        out: List[str] = []
+        for k, counts, total in items:
+            acc = 0
+            for b, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                le = 'le="%s"' % _fmt(b)
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, k, le)} {acc}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, k)} {_fmt(total)}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, k)} {acc}")
+        return out
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status")
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served.", ("route",))
+POOL_WAIT = Histogram(
+    "db_pool_acquire_wait_seconds",
+    "Time spent waiting for a DB connection (pool acquire, or connect for unpooled apps).",
+    ("pool",),
+    buckets=WAIT_BUCKETS,
+)
+DB_QUERY = Histogram("db_query_duration_seconds", "DB statement execution time.", ("pool", "query"))
+
+
+# --------------------------------------------------------------------------------------
+# HTTP middleware
+# --------------------------------------------------------------------------------------
+
+def _route_template(routes: Sequence[Any], scope: Dict[str, Any]) -> str:
+    partial = None
+    for r in routes:
+        match, _ = r.matches(scope)
+        if match == Match.FULL:
+            return getattr(r, "path", "unmatched")
+        if match == Match.PARTIAL and partial is None:
+            partial = getattr(r, "path", None)  # e.g., wrong method
+    return partial or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware overhead, streams untouched)."""
+
+    def __init__(self, app: Any, routes: Sequence[Any]) -> None:
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = _route_template(self.routes, scope)
+        status = 500
+
+        async def _send(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(route=route)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            HTTP_IN_FLIGHT.dec(route=route)
+            HTTP_LATENCY.observe(time.perf_counter() - t0, method=scope["method"], route=route, status=str(status))
+
+
+def install_metrics(app: FastAPI) -> None:
+    """Add the latency middleware and mount GET /metrics."""
+    app.add_middleware(MetricsMiddleware, routes=app.router.routes)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics() -> PlainTextResponse:
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+# --------------------------------------------------------------------------------------
+# DB helpers
+# --------------------------------------------------------------------------------------
+
+@asynccontextmanager
+async def timed_acquire(pool: Any, name: str) -> AsyncIterator[Any]:
+    """asyncpg: `async with timed_acquire(_pool, "core") as conn:`"""
+    t0 = time.perf_counter()
+    async with pool.acquire() as conn:
+        POOL_WAIT.observe(time.perf_counter() - t0, pool=name)
+        yield conn
+
+
+@asynccontextmanager
+async def timed_connection(pool: Any, name: str) -> AsyncIterator[Any]:
+    """psycopg_pool: `async with timed_connection(pool, "portfolio") as ac:`"""
+    t0 = time.perf_counter()
+    async with pool.connection() as conn:
+        POOL_WAIT.observe(time.perf_counter() - t0, pool=name)
+        yield conn
+
+
+def timed_connect(conninfo: Optional[str], name: str = "direct", **kwargs: Any) -> Any:
+    """psycopg without a pool: time the connect as the acquire wait; use as `with timed_connect(...) as conn:`"""
+    import psycopg
+
+    t0 = time.perf_counter()
+    conn = psycopg.connect(conninfo, **kwargs)
+    POOL_WAIT.observe(time.perf_counter() - t0, pool=name)
+    return conn
+
+
+def time_query(name: str, pool: str = "default") -> Any:
+    """`with time_query("latest_lines", "core"): rows = await conn.fetch(...)`"""
+    return DB_QUERY.time(pool=pool, query=name)
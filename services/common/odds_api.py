@@ -0,0 +1,320 @@
+# services/common/odds_api.py
+# One client for every Odds API v4 call (ingest, pings, health probes, catalog sync)
+# - One keep-alive httpx.AsyncClient per process and event loop
+# - Catalog endpoints (/v4/sports, /v4/sports/{sport}/events) are cached on disk for ODDS_API_CATALOG_TTL seconds, shared by
+#   every process on the host, so scripts, probes and services stop re-fetching the same list (reads and
+#   writes of the cache files run in a worker thread, like the ledger's)
+# - 429 / 5xx / transport errors are retried with full-jitter exponential backoff (Retry-After wins
+#   when it is longer); other 4xx fail at once
+# - Quota ledger: x-requests-remaining/used/last from every response are written to a JSON file
+#   (read-modify-write under an exclusive lock on <ledger>.lock: flock on POSIX, msvcrt.locking on
+#   Windows) with per-endpoint call/cost counters. Callers check `ledger.can_spend(cost)` before billed
+#   calls; odds() refuses when it would cut into ODDS_API_QUOTA_RESERVE. The client does the ledger's
+#   blocking lock and file I/O in a worker thread, so a slow disk or contended lock never stalls the loop
+#   python -m services.common.odds_api            # print the ledger for ODDS_API_BASE_URL
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+try:
+    import fcntl
+except ImportError:  # Windows (scripts/gsa.ps1)
+    fcntl = None
+    import msvcrt
+
+load_dotenv(".env.local", override=True)
+
+log = logging.getLogger(__name__)
+
+ODDS_API_KEY = os.getenv("ODDS_API_KEY")
+ODDS_API_BASE_URL = os.getenv("ODDS_API_BASE_URL", "https://api.the-odds-api.com").rstrip("/")
+ODDS_API_CACHE_DIR = os.getenv("ODDS_API_CACHE_DIR", ".cache/odds_api")
+# default: <cache dir>/quota_<host>.json, so a local replay server never touches the real ledger
+ODDS_API_LEDGER = os.getenv("ODDS_API_LEDGER")
+ODDS_API_CATALOG_TTL = float(os.getenv("ODDS_API_CATALOG_TTL", "900"))
+ODDS_API_RETRIES = int(os.getenv("ODDS_API_RETRIES", "3"))
+ODDS_API_BACKOFF = float(os.getenv("ODDS_API_BACKOFF", "0.5"))
+ODDS_API_BACKOFF_MAX = float(os.getenv("ODDS_API_BACKOFF_MAX", "20"))
+ODDS_API_QUOTA_RESERVE = int(os.getenv("ODDS_API_QUOTA_RESERVE", "0"))
+# a ledger older than this no longer blocks calls (the monthly quota may have reset)
+ODDS_API_LEDGER_MAX_AGE = float(os.getenv("ODDS_API_LEDGER_MAX_AGE", "86400"))
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class OddsApiError(RuntimeError):
+    def __init__(self, status: int, text: str) -> None:
+        super().__init__(f"Odds API {status}: {text[:300]}")
+        self.status = status
+
+
+class QuotaExhaustedError(RuntimeError):
+    """Raised before a billed call the ledger says we cannot afford."""
+
+    def __init__(self, cost: int, remaining: int) -> None:
+        super().__init__(f"Odds API quota: call costs {cost}, {remaining} remaining (reserve {ODDS_API_QUOTA_RESERVE})")
+        self.cost = cost
+        self.remaining = remaining
+
+
+@dataclass
+class OddsResponse:
+    data: Any
+    headers: httpx.Headers = field(default_factory=httpx.Headers)  # case-insensitive
+    cached: bool = False
+
+
+def _int(v: Optional[str]) -> Optional[int]:
+    try:
+        return int(float(v)) if v is not None else None
+    except ValueError:
+        return None
+
+
+class QuotaLedger:
+    """Persistent quota state from response headers, shared by every process through one file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(self.path) + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)  # first byte; gives up after ~10 s
+                        break
+                    except OSError:
+                        continue
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    def read(self) -> Dict[str, Any]:
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def record(self, endpoint: str, headers: Optional[httpx.Headers], cached: bool = False) -> Dict[str, Any]:
+        with self._locked():
+            led = self.read()
+            ep = led.setdefault("endpoints", {}).setdefault(endpoint, {"calls": 0, "cached": 0, "cost": 0})
+            if cached:
+                ep["cached"] += 1
+            else:
+                ep["calls"] += 1
+                remaining = _int(headers.get("x-requests-remaining")) if headers is not None else None
+                if remaining is not None:
+                    last = _int(headers.get("x-requests-last")) or 0
+                    ep["cost"] += last
+                    led.update(
+                        remaining=remaining,
+                        used=_int(headers.get("x-requests-used")),
+                        last_cost=last,
+                        updated_at=time.time(),
+                    )
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(led, indent=2, sort_keys=True))
+            os.replace(tmp, self.path)
+        return led
+
+    def remaining(self) -> Optional[int]:
+        """Last known remaining requests; None when unknown or too old to trust."""
+        led = self.read()
+        if led.get("remaining") is None or time.time() - led.get("updated_at", 0) > ODDS_API_LEDGER_MAX_AGE:
+            return None
+        return int(led["remaining"])
+
+    def can_spend(self, cost: int = 1, reserve: int = ODDS_API_QUOTA_RESERVE) -> bool:
+        remaining = self.remaining()
+        return remaining is None or remaining - cost >= reserve
+
+    def status(self) -> Dict[str, Any]:
+        led = self.read()
+        if led.get("updated_at"):
+            led["age_s"] = round(time.time() - led["updated_at"], 1)
+        return led
+
+
+class DiskCache:
+    """JSON responses keyed by base URL + path + params (never the API key), expired by file mtime."""
+
+    def __init__(self, base_url: str, root: str = ODDS_API_CACHE_DIR) -> None:
+        self.base_url = base_url
+        self.root = Path(root)
+
+    def _file(self, path: str, params: Dict[str, Any]) -> Path:
+        key = json.dumps([self.base_url, path, sorted((k, str(v)) for k, v in params.items() if k != "apiKey")])
+        return self.root / (hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+    def get(self, path: str, params: Dict[str, Any], ttl: float) -> Optional[Tuple[Any, Dict[str, str]]]:
+        f = self._file(path, params)
+        try:
+            if time.time() - f.stat().st_mtime > ttl:
+                return None
+            blob = json.loads(f.read_text())
+        except (OSError, ValueError):
+            return None
+        return blob["data"], blob.get("headers", {})
+
+    def put(self, path: str, params: Dict[str, Any], data: Any, headers: Dict[str, str]) -> None:
+        f = self._file(path, params)
+        f.parent.mkdir(parents=True, exist_ok=True)
+        tmp = f.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"path": path, "data": data, "headers": headers}))
+        os.replace(tmp, f)
+
+
+def ledger_path(base_url: str) -> str:
+    host = httpx.URL(base_url).netloc.decode().replace(":", "_") or "default"
+    return os.path.join(ODDS_API_CACHE_DIR, f"quota_{host}.json")
+
+
+def odds_cost(markets: str, regions: str) -> int:
+    """Odds API billing for /odds: markets x regions."""
+    return max(1, len([m for m in markets.split(",") if m])) * max(1, len([r for r in regions.split(",") if r]))
+
+
+class OddsApiClient:
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        *,
+        timeout: float = 30.0,
+        retries: int = ODDS_API_RETRIES,
+        cache: Optional[DiskCache] = None,
+        ledger: Optional[QuotaLedger] = None,
+    ) -> None:
+        self.api_key = api_key or ODDS_API_KEY
+        self.base_url = (base_url or ODDS_API_BASE_URL).rstrip("/")
+        self.timeout = httpx.Timeout(timeout, connect=5.0)
+        self.retries = retries
+        self.cache = cache or DiskCache(self.base_url)
+        self.ledger = ledger or QuotaLedger(ODDS_API_LEDGER or ledger_path(self.base_url))
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.retried = 0
+
+    def _http(self) -> httpx.AsyncClient:
+        # one pooled client per event loop (scripts using asyncio.run get a fresh one)
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_keepalive_connections=10, max_connections=20, keepalive_expiry=60),
+            )
+            self._loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None, *, ttl: float = 0,
+                  endpoint: Optional[str] = None) -> OddsResponse:
+        """GET `path` as JSON; served from the disk cache when `ttl` > 0 and a fresh copy exists."""
+        if not self.api_key:
+            raise RuntimeError("ODDS_API_KEY missing")
+        params = dict(params or {})
+        endpoint = endpoint or path
+        if ttl > 0:
+            hit = await asyncio.to_thread(self.cache.get, path, params, ttl)
+            if hit is not None:
+                await asyncio.to_thread(self.ledger.record, endpoint, None, cached=True)
+                return OddsResponse(hit[0], httpx.Headers(hit[1]), cached=True)
+
+        r = await self._send(path, {**params, "apiKey": self.api_key})
+        await asyncio.to_thread(self.ledger.record, endpoint, r.headers)
+        if r.status_code != 200:
+            raise OddsApiError(r.status_code, r.text)
+        data = r.json()
+        if ttl > 0:
+            await asyncio.to_thread(self.cache.put, path, params, data, dict(r.headers))
+        return OddsResponse(data, r.headers)
+
+    async def _send(self, path: str, params: Dict[str, Any]) -> httpx.Response:
+        for attempt in range(self.retries + 1):
+            try:
+                r = await self._http().get(path, params=params)
+            except httpx.TransportError as e:
+                if attempt == self.retries:
+                    raise
+                log.warning("Odds API %s: %s (retry %d)", path, e, attempt + 1)
+                wait = 0.0
+            else:
+                if r.status_code not in RETRY_STATUS or attempt == self.retries:
+                    return r
+                wait = float(_int(r.headers.get("retry-after")) or 0)
+                log.warning("Odds API %s: %s (retry %d)", path, r.status_code, attempt + 1)
+            self.retried += 1
+            backoff = random.uniform(0, min(ODDS_API_BACKOFF_MAX, ODDS_API_BACKOFF * 2 ** attempt))
+            await asyncio.sleep(max(wait, backoff))
+        raise AssertionError("unreachable")
+
+    # -- endpoints ------------------------------------------------------------------
+
+    async def sports(self, all: bool = False, ttl: float = ODDS_API_CATALOG_TTL) -> OddsResponse:
+        """/v4/sports (free); cached on disk."""
+        return await self.get("/v4/sports", {"all": "true"} if all else None, ttl=ttl, endpoint="sports")
+
+    async def events(self, sport: str, ttl: float = ODDS_API_CATALOG_TTL) -> OddsResponse:
+        """/v4/sports/{sport}/events (free): ids, teams and commence times; cached on disk."""
+        return await self.get(f"/v4/sports/{sport}/events", ttl=ttl, endpoint="events")
+
+    async def odds(self, sport: str, regions: str = "us", markets: str = "h2h,spreads,totals",
+                   odds_format: str = "american", date_format: str = "iso") -> OddsResponse:
+        """/v4/sports/{sport}/odds (billed markets x regions); never cached."""
+        cost = odds_cost(markets, regions)
+        if not await asyncio.to_thread(self.ledger.can_spend, cost):
+            raise QuotaExhaustedError(cost, await asyncio.to_thread(self.ledger.remaining) or 0)
+        params = {"regions": regions, "markets": markets, "oddsFormat": odds_format, "dateFormat": date_format}
+        return await self.get(f"/v4/sports/{sport}/odds", params, endpoint="odds")
+
+    def status(self) -> Dict[str, Any]:
+        return {"base_url": self.base_url, "retried": self.retried, "ledger": self.ledger.status()}
+
+
+_clients: Dict[Tuple[Optional[str], Optional[str]], OddsApiClient] = {}
+
+
+def get_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> OddsApiClient:
+    """Process-wide client per (key, base URL); callers that override either still share one pool."""
+    key = (api_key or ODDS_API_KEY, (base_url or ODDS_API_BASE_URL).rstrip("/"))
+    client = _clients.get(key)
+    if client is None:
+        client = _clients[key] = OddsApiClient(*key)
+    return client
+
+
+if __name__ == "__main__":
+    print(json.dumps(get_client().status(), indent=2))
@@ -0,0 +1,147 @@
+# services/common/odds_changes.py
+# Change-only writes to odds_norm.odds for normalize_from_raw (portfolio and gsa_portfolio)
+# - A row is written only when a (game, market, book, side) quote changes price or point. Each row is an
+#   interval: last_update is valid_from and the next row of the series is where it ends.
+#   odds_norm.v_odds_intervals exposes both as valid_from/valid_to (services/db/create_odds_intervals.py).
+#   valid_to is not stored: closing the previous row with an UPDATE per change doubled normalize time
+#   and left a dead tuple plus index entries behind for every change, so rows stay insert-only
+# - odds_norm.odds_latest holds the last-known quote per series. normalize loads it into a LastKnown cache
+#   once per source chunk (one query for the chunk's games, on the write connection right after the
+#   previous chunk's commit, so no extra pool connection), decides in Python and upserts the series that
+#   changed before each commit: odds_latest is written per change too
+# - Observations not newer than the last change are skipped, so re-running normalize over the same
+#   snapshots writes nothing; the source is read in fetched_at order so changes arrive in time order
+# - Until the migration has run (no odds_latest table) every quote is written, as before.
+# NORMALIZE_CHANGE_ONLY=0 turns it off.
+
+from __future__ import annotations
+
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from services.common.querylog import pg_execute_async
+
+CHANGE_ONLY_DEFAULT = os.getenv("NORMALIZE_CHANGE_ONLY", "1").strip().lower() not in ("0", "false", "no")
+
+LATEST_SELECT_SQL = """
+SELECT game_uid, market_key, book_key, side, price, point, valid_from
+FROM odds_norm.odds_latest
+WHERE game_uid = ANY(%(game_uids)s)
+"""
+
+LATEST_UPSERT_SQL = """
+INSERT INTO odds_norm.odds_latest (game_uid, market_key, book_key, side, price, point, valid_from)
+VALUES (%(game_uid)s, %(market_key)s, %(book_key)s, %(side)s, %(price)s, %(point)s, %(valid_from)s)
+ON CONFLICT (game_uid, market_key, book_key, side) DO UPDATE
+  SET price = EXCLUDED.price,
+      point = EXCLUDED.point,
+      valid_from = EXCLUDED.valid_from
+  WHERE odds_norm.odds_latest.valid_from IS NULL OR odds_norm.odds_latest.valid_from < EXCLUDED.valid_from
+"""
+
+Key = Tuple[str, str, str, str]  # game_uid, market_key, book_key, side
+
+
+def _ts(v: Any) -> Optional[datetime]:
+    if v is None or isinstance(v, datetime):
+        return v
+    try:
+        return datetime.fromisoformat(str(v).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _num(v: Any) -> Optional[float]:
+    # payload ints/floats vs numeric Decimals from the table
+    return None if v is None else float(v)
+
+
+class LastKnown:
+    """Per-run cache of the last-known quote per series; see the module comment."""
+
+    def __init__(self, enabled: bool = CHANGE_ONLY_DEFAULT) -> None:
+        self.enabled = enabled
+        self.error: Optional[str] = None
+        # key -> [price, point, valid_from, last_seen]; last_seen is per run only: between two changes
+        # every observation repeats the stored quote, so valid_from is enough to order later runs
+        self._quotes: Dict[Key, List[Any]] = {}
+        self._loaded: Set[str] = set()
+        self._dirty: Set[Key] = set()
+        self.changed = 0
+        self.unchanged = 0
+        self.stale = 0
+
+    async def load(self, conn: Any, game_uids: Iterable[str]) -> None:
+        """Read the stored quotes of the games not loaded yet in one query; disables tracking if the table is missing.
+
+        Runs in a savepoint on the caller's write connection, so a failure does not abort its pending writes.
+        """
+        if not self.enabled:
+            return
+        todo = [g for g in dict.fromkeys(game_uids) if g not in self._loaded]
+        if not todo:
+            return
+        self._loaded.update(todo)
+        try:
+            async with conn.transaction(), conn.cursor() as cur:
+                await pg_execute_async(cur, "odds_latest", LATEST_SELECT_SQL, {"game_uids": todo})
+                rows = await cur.fetchall()
+        except Exception as e:
+            self.enabled = False  # not migrated yet: write every quote
+            self.error = str(e)
+            return
+        for r in rows:
+            game_uid, market_key, book_key, side, price, point, valid_from = r.values() if isinstance(r, dict) else r
+            self._quotes[(game_uid, market_key, book_key, side)] = [_num(price), _num(point), valid_from, valid_from]
+
+    def observe(self, key: Key, price: Any, point: Any, last_update: Any) -> bool:
+        """True when the quote should be written: first of its series, or a new price/point."""
+        if not self.enabled:
+            return True
+        ts = _ts(last_update)
+        if ts is None:
+            return True  # undated quote: cannot be ordered, written as before
+        q = self._quotes.get(key)
+        p, pt = _num(price), _num(point)
+        if q is None:
+            self._quotes[key] = [p, pt, ts, ts]
+            self._dirty.add(key)
+            self.changed += 1
+            return True
+        if q[3] is not None and ts <= q[3]:
+            self.stale += 1
+            return False
+        q[3] = ts
+        if q[0] == p and q[1] == pt:
+            self.unchanged += 1
+            return False
+        q[0], q[1], q[2] = p, pt, ts
+        self._dirty.add(key)
+        self.changed += 1
+        return True
+
+    async def flush(self, cur: Any) -> int:
+        """Upsert every series that changed since the last flush (call before committing the odds writes)."""
+        if not self.enabled or not self._dirty:
+            self._dirty.clear()
+            return 0
+        rows = []
+        for key in self._dirty:
+            price, point, valid_from, _ = self._quotes[key]
+            rows.append({
+                "game_uid": key[0], "market_key": key[1], "book_key": key[2], "side": key[3],
+                "price": price, "point": point, "valid_from": valid_from,
+            })
+        self._dirty.clear()
+        await cur.executemany(LATEST_UPSERT_SQL, rows)
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "change_only": self.enabled,
+            "changed": self.changed,
+            "unchanged": self.unchanged,
+            "out_of_order": self.stale,
+            **({"error": self.error} if self.error else {}),
+        }
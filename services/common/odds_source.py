@@ -0,0 +1,238 @@
+# services/common/odds_source.py
+# Source queries for normalize_from_raw (portfolio and gsa_portfolio)
+# - SOURCE_SQL returns the full odds_raw.payload for each deduplicated snapshot
+# - PROJECTED_SOURCE_SQL has the same rows and columns, but `payload` is rebuilt on the server with only
+#   the fields normalization reads (no titles or sport metadata, lastUpdate/odds spellings folded in,
+#   outcomes as arrays), so fewer bytes cross the wire and psycopg decodes less JSON. Building it costs
+#   server CPU, so it pays off when the DB link is the bottleneck (remote DB), not over a local socket.
+# Both use %(limit)s, keep the DISTINCT ON (game_id, sport_key, payload_hash) / latest fetched_at dedup
+# and return the oldest `limit` snapshots after the source cursor, in fetched_at order.
+# - SourceCursor keeps the (fetched_at, id) of the last snapshot a run committed in
+#   odds_norm.normalize_cursor (services/db/create_normalize_cursor.py), so each run continues where the
+#   previous one stopped instead of re-reading the same oldest snapshots. Only committed writes move it
+#   (never a dry run). Without the table, normalize reads from the oldest snapshot as before.
+# - The ingestor stamps a whole batch with the time the batch started and commits row by row, so rows
+#   can become visible after newer-stamped ones. The cursor therefore only reads snapshots older than
+#   NORMALIZE_CURSOR_LAG_SECONDS; keep it above the longest ingest batch (and any overlap of two ingests)
+# - NORMALIZE_CURSOR=0, or ?reset_cursor=true for one run, reads everything from the oldest snapshot
+#   without the lag and leaves the stored position alone
+# - open_source() either fetches everything up front or streams through a named server-side cursor
+#   in NORMALIZE_CHUNK_ROWS chunks, so memory stays flat however large `limit` is
+
+from __future__ import annotations
+
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from psycopg.rows import dict_row
+
+from services.common.metrics import timed_connection
+from services.common.querylog import pg_execute_async
+
+# NORMALIZE_PROJECTION=1 turns projection on by default; /admin/normalize?projection= overrides per call
+PROJECTION_DEFAULT = os.getenv("NORMALIZE_PROJECTION", "0").strip().lower() in ("1", "true", "yes")
+# streaming is on unless NORMALIZE_STREAM=0; /admin/normalize?stream=&chunk= override per call
+STREAM_DEFAULT = os.getenv("NORMALIZE_STREAM", "1").strip().lower() not in ("0", "false", "no")
+CHUNK_ROWS = int(os.getenv("NORMALIZE_CHUNK_ROWS", "500"))
+CURSOR_DEFAULT = os.getenv("NORMALIZE_CURSOR", "1").strip().lower() not in ("0", "false", "no")
+CURSOR_LAG_SECONDS = float(os.getenv("NORMALIZE_CURSOR_LAG_SECONDS", "120"))
+
+# Oldest snapshots first: change-only odds writes (services/common/odds_changes.py) need each series in
+# time order. Dedup and ordering run on the narrow columns; payloads are joined for the kept rows only.
+# Rows at or before the cursor (or inside the lag) are filtered before the dedup sort, so a run only
+# sorts new, settled snapshots.
+_DEDUP = """
+    SELECT id, fetched_at FROM (
+        SELECT DISTINCT ON (game_id, sport_key, payload_hash) id, fetched_at
+        FROM public.odds_raw
+        WHERE (fetched_at, id) > (%(after_at)s::timestamptz, %(after_id)s::bigint)
+          AND fetched_at < now() - make_interval(secs => %(lag_s)s::float8)
+        ORDER BY game_id, sport_key, payload_hash, fetched_at DESC
+    ) d
+    ORDER BY fetched_at, id
+    LIMIT %(limit)s
+"""
+
+SOURCE_SQL = f"""
+WITH src AS ({_DEDUP})
+SELECT r.id, r.sport_key, r.game_id, r.fetched_at, r.payload, r.payload_hash
+FROM src s
+JOIN public.odds_raw r ON r.id = s.id
+ORDER BY s.fetched_at, s.id
+"""
+
+# Same rows, then project only the surviving rows' payloads. Built with the text json_* functions
+# (much cheaper than jsonb_build_*); outcomes become [name, price, point, last_update].
+PROJECTED_SOURCE_SQL = f"""
+WITH src AS ({_DEDUP})
+SELECT s.id, r.sport_key, r.game_id, s.fetched_at, r.payload_hash,
+       json_build_object(
+         'id', r.payload->'id',
+         'home_team', r.payload->'home_team',
+         'away_team', r.payload->'away_team',
+         'commence_time', r.payload->'commence_time',
+         'fetched_at', r.payload->'fetched_at',
+         'bookmakers', (
+           SELECT json_agg(json_build_object(
+             'key', b->'key',
+             'last_update', COALESCE(NULLIF(b->'last_update', 'null'), b->'lastUpdate'),
+             'markets', (
+               SELECT json_agg(json_build_object(
+                 'key', m->'key',
+                 'last_update', COALESCE(NULLIF(m->'last_update', 'null'), m->'lastUpdate'),
+                 'outcomes', (
+                   SELECT json_agg(json_build_array(
+                     o->'name',
+                     COALESCE(NULLIF(o->'price', 'null'), o->'odds'),
+                     o->'point',
+                     COALESCE(NULLIF(o->'last_update', 'null'), o->'lastUpdate')
+                   ))
+                   FROM jsonb_array_elements(CASE WHEN jsonb_typeof(m->'outcomes') = 'array' THEN m->'outcomes' ELSE '[]' END) o
+                 )
+               ))
+               FROM jsonb_array_elements(CASE WHEN jsonb_typeof(b->'markets') = 'array' THEN b->'markets' ELSE '[]' END) m
+             )
+           ))
+           FROM jsonb_array_elements(CASE WHEN jsonb_typeof(r.payload->'bookmakers') = 'array' THEN r.payload->'bookmakers' ELSE '[]' END) b
+         )
+       ) AS payload
+FROM src s
+JOIN public.odds_raw r ON r.id = s.id
+ORDER BY s.fetched_at, s.id
+"""
+
+
+CURSOR_SELECT_SQL = "SELECT fetched_at, raw_id FROM odds_norm.normalize_cursor WHERE source = 'odds_raw'"
+
+# never moves backwards: an overlapping run that finishes later keeps the furthest position
+CURSOR_UPSERT_SQL = """
+INSERT INTO odds_norm.normalize_cursor AS c (source, fetched_at, raw_id)
+VALUES ('odds_raw', %(fetched_at)s, %(raw_id)s)
+ON CONFLICT (source) DO UPDATE
+  SET fetched_at = EXCLUDED.fetched_at, raw_id = EXCLUDED.raw_id, updated_at = now()
+  WHERE (c.fetched_at, c.raw_id) < (EXCLUDED.fetched_at, EXCLUDED.raw_id)
+"""
+
+
+class SourceCursor:
+    """Position of the last committed snapshot; see the module comment."""
+
+    def __init__(self, enabled: bool = CURSOR_DEFAULT, lag_s: float = CURSOR_LAG_SECONDS) -> None:
+        self.enabled = enabled
+        self.lag_s = lag_s
+        self.reset = False
+        self.error: Optional[str] = None
+        self.start: Optional[Tuple[datetime, int]] = None  # where this run reads from
+        self.last: Optional[Tuple[datetime, int]] = None  # last snapshot handed to the writes
+
+    async def load(self, conn: Any, reset: bool = False) -> None:
+        """Read the stored position on the write connection; disables the cursor if the table is missing.
+
+        reset=True reads from the oldest snapshot and never saves.
+        """
+        if not self.enabled:
+            return
+        if reset:
+            self.enabled, self.reset = False, True
+            return
+        try:
+            # savepoint: a missing table must not abort the caller's transaction
+            async with conn.transaction(), conn.cursor() as cur:
+                await pg_execute_async(cur, "normalize_cursor", CURSOR_SELECT_SQL)
+                row = await cur.fetchone()
+        except Exception as e:
+            self.enabled = False  # not migrated yet: read from the oldest snapshot
+            self.error = str(e)
+            return
+        if row:
+            self.start = tuple(row.values()) if isinstance(row, dict) else tuple(row)
+
+    def params(self) -> Dict[str, Any]:
+        at, rid = self.start or ("-infinity", 0)
+        return {"after_at": at, "after_id": rid, "lag_s": self.lag_s if self.enabled else 0}
+
+    def advance(self, row: Dict[str, Any]) -> None:
+        self.last = (row["fetched_at"], row["id"])
+
+    async def save(self, cur: Any) -> None:
+        """Store the last snapshot read (call before committing its writes)."""
+        if self.enabled and self.last:
+            await cur.execute(CURSOR_UPSERT_SQL, {"fetched_at": self.last[0], "raw_id": self.last[1]})
+
+    def stats(self) -> Dict[str, Any]:
+        def _pos(p: Optional[Tuple[datetime, int]]) -> Optional[Dict[str, Any]]:
+            return {"fetched_at": p[0].isoformat(), "id": p[1]} if p else None
+
+        return {
+            "enabled": self.enabled,
+            "lag_s": self.lag_s if self.enabled else 0,
+            "from": _pos(self.start),
+            "to": _pos(self.last),
+            **({"reset": True} if self.reset else {}),
+            **({"error": self.error} if self.error else {}),
+        }
+
+
+def source_sql(projection: bool) -> str:
+    return PROJECTED_SOURCE_SQL if projection else SOURCE_SQL
+
+
+async def _list_rows(rows: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    for r in rows:
+        yield r
+
+
+async def _chunked_rows(cur: Any, size: int) -> AsyncIterator[Dict[str, Any]]:
+    while True:
+        rows = await cur.fetchmany(size)
+        if not rows:
+            return
+        for r in rows:
+            yield r
+
+
+async def batches(rows: AsyncIterator[Dict[str, Any]], size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Group source rows into lists of up to `size` (normalize's commit and lookup unit)."""
+    batch: List[Dict[str, Any]] = []
+    async for r in rows:
+        batch.append(r)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@asynccontextmanager
+async def open_source(
+    pool: Any,
+    limit: int,
+    projection: bool,
+    chunk_rows: Optional[int] = None,
+    cursor: Optional[SourceCursor] = None,
+) -> AsyncIterator[AsyncIterator[Dict[str, Any]]]:
+    """`async with open_source(pool, limit, projection, chunk_rows, cursor) as rows: async for r in rows: ...`
+
+    Rows start after `cursor` (loaded beforehand); without one they start at the oldest snapshot.
+
+    chunk_rows=None fetches all rows and releases the connection before yielding (previous
+    behaviour). Otherwise a named cursor holds one connection (and its read transaction) open
+    and rows arrive `chunk_rows` at a time.
+    """
+    name = "normalize_source_projected" if projection else "normalize_source"
+    params = {"limit": limit, **(cursor or SourceCursor(enabled=False)).params()}
+    if not chunk_rows:
+        async with timed_connection(pool, "portfolio") as ac, ac.cursor(row_factory=dict_row) as cur:
+            await pg_execute_async(cur, name, source_sql(projection), params)
+            rows = await cur.fetchall()
+        yield _list_rows(rows)
+        return
+
+    async with timed_connection(pool, "portfolio") as ac:
+        async with ac.cursor(name="normalize_source", row_factory=dict_row) as cur:
+            cur.itersize = chunk_rows
+            await pg_execute_async(cur, name, source_sql(projection), params)
+            yield _chunked_rows(cur, chunk_rows)
+        await ac.rollback()  # read-only; ends the cursor's transaction
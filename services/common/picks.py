@@ -0,0 +1,43 @@
+# services/common/picks.py
+# Pick shape shared by compliance (/compliance/validate-pick) and the backtest engine
+
+from typing import Optional
+
+from pydantic import BaseModel, validator
+
+
+class PickIn(BaseModel):
+    game_id: Optional[int] = None
+    league: Optional[str] = None
+    market_key: str
+    outcome: str
+    price: float
+    point: Optional[float] = None
+    stake: float = 0.0
+
+    @validator("market_key")
+    def check_market(cls, v):
+        allowed = {"h2h","spreads","totals"}
+        if v not in allowed:
+            raise ValueError(f"market_key must be one of {sorted(allowed)}")
+        return v
+
+    @validator("outcome")
+    def check_outcome(cls, v):
+        allowed = {"home","away","draw","over","under"}
+        if v not in allowed:
+            raise ValueError(f"outcome must be one of {sorted(allowed)}")
+        return v
+
+    @validator("stake")
+    def non_negative_stake(cls, v):
+        if v < 0:
+            raise ValueError("stake must be >= 0")
+        return v
+
+    @validator("price")
+    def realistic_price(cls, v):
+        # Allow common American odds range
+        if v == 0 or v < -2000 or v > 2000:
+            raise ValueError("price must be within -2000..2000 and non-zero")
+        return v
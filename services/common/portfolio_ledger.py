@@ -0,0 +1,321 @@
+# services/common/portfolio_ledger.py
+# Running bankroll / exposure / P&L aggregates for public.picks (portfolio and gsa_portfolio)
+# - portfolio_ledger keeps one row per (user, league, market, book): open count/stake/to-win and settled
+#   count, wins/losses/pushes, stake and P&L. Placing or settling a pick is one statement that writes the
+#   pick and applies its delta to that row, so the aggregates never need a pass over picks
+# - /portfolio/summary and /portfolio/exposure read only the user's ledger rows (bounded by how many
+#   leagues x markets x books they bet, not by how many picks exist) plus portfolio_bankroll
+# - Picks written some other way can be folded in with POST /portfolio/ledger/rebuild (or
+#   python -m services.db.create_portfolio_ledger), which recomputes the rows from picks
+# Payouts use American odds: a win returns stake * price/100 (price > 0) or stake * 100/-price.
+
+from __future__ import annotations
+
+from typing import Any, Dict, Literal, Optional, Sequence
+
+from fastapi import APIRouter, FastAPI, HTTPException, Query
+from psycopg.rows import dict_row
+from pydantic import BaseModel
+
+from services.common.picks import PickIn
+from services.common.querylog import pg_execute_async
+from services.common.statements import StatementRegistry
+
+DDL = """
+ALTER TABLE picks ADD COLUMN IF NOT EXISTS user_id TEXT;
+ALTER TABLE picks ADD COLUMN IF NOT EXISTS book_key TEXT;
+ALTER TABLE picks ADD COLUMN IF NOT EXISTS game_uid TEXT;
+ALTER TABLE picks ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'open';
+ALTER TABLE picks ADD COLUMN IF NOT EXISTS result TEXT;
+ALTER TABLE picks ADD COLUMN IF NOT EXISTS pnl NUMERIC;
+ALTER TABLE picks ADD COLUMN IF NOT EXISTS settled_at TIMESTAMPTZ;
+CREATE INDEX IF NOT EXISTS idx_picks_user_status ON picks (user_id, status);
+
+-- '' stands for an unknown league/market/book: key columns cannot be NULL
+CREATE TABLE IF NOT EXISTS portfolio_ledger (
+  user_id        TEXT NOT NULL,
+  league         TEXT NOT NULL,
+  market_key     TEXT NOT NULL,
+  book_key       TEXT NOT NULL,
+  open_count     INT     NOT NULL DEFAULT 0,
+  open_stake     NUMERIC NOT NULL DEFAULT 0,
+  open_to_win    NUMERIC NOT NULL DEFAULT 0,
+  settled_count  INT     NOT NULL DEFAULT 0,
+  wins           INT     NOT NULL DEFAULT 0,
+  losses         INT     NOT NULL DEFAULT 0,
+  pushes         INT     NOT NULL DEFAULT 0,
+  settled_stake  NUMERIC NOT NULL DEFAULT 0,
+  pnl            NUMERIC NOT NULL DEFAULT 0,
+  updated_at     TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (user_id, league, market_key, book_key)
+);
+
+CREATE TABLE IF NOT EXISTS portfolio_bankroll (
+  user_id     TEXT PRIMARY KEY,
+  starting    NUMERIC NOT NULL DEFAULT 0,
+  updated_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+def _to_win(t: str) -> str:
+    """Profit of a winning pick, as SQL over alias `t` (columns price, stake)."""
+    return f"(CASE WHEN {t}.price > 0 THEN {t}.stake * {t}.price / 100 ELSE {t}.stake * 100 / -{t}.price END)"
+
+
+def _key(t: str) -> str:
+    return f"COALESCE({t}.league, ''), COALESCE({t}.market_key, ''), COALESCE({t}.book_key, '')"
+
+
+PLACE_SQL = f"""
+WITH p AS (
+  INSERT INTO picks (user_id, game_id, league, market_key, outcome, price, point, stake, book_key, game_uid, status)
+  VALUES (%(user_id)s, %(game_id)s, %(league)s, %(market_key)s, %(outcome)s, %(price)s, %(point)s, %(stake)s,
+          %(book_key)s, %(game_uid)s, 'open')
+  RETURNING id, user_id, league, market_key, book_key, price, stake, created_at
+), l AS (
+  INSERT INTO portfolio_ledger AS l (user_id, league, market_key, book_key, open_count, open_stake, open_to_win)
+  SELECT p.user_id, {_key("p")}, 1, p.stake, {_to_win("p")} FROM p
+  ON CONFLICT (user_id, league, market_key, book_key) DO UPDATE
+    SET open_count = l.open_count + 1,
+        open_stake = l.open_stake + EXCLUDED.open_stake,
+        open_to_win = l.open_to_win + EXCLUDED.open_to_win,
+        updated_at = now()
+)
+SELECT p.id, p.created_at, {_to_win("p")} AS to_win FROM p
+"""
+
+# only open picks settle, so a repeated call cannot count a pick twice
+SETTLE_SQL = f"""
+WITH s AS (
+  UPDATE picks AS k
+  SET status = 'settled',
+      result = %(result)s,
+      pnl = CASE %(result)s WHEN 'win' THEN {_to_win("k")} WHEN 'loss' THEN -k.stake ELSE 0 END,
+      settled_at = now()
+  WHERE k.id = %(pick_id)s AND k.status = 'open'
+  RETURNING k.id, k.user_id, k.league, k.market_key, k.book_key, k.price, k.stake, k.result, k.pnl, k.settled_at
+), l AS (
+  UPDATE portfolio_ledger AS l
+  SET open_count = l.open_count - 1,
+      open_stake = l.open_stake - s.stake,
+      open_to_win = l.open_to_win - {_to_win("s")},
+      settled_count = l.settled_count + 1,
+      wins = l.wins + (s.result = 'win')::int,
+      losses = l.losses + (s.result = 'loss')::int,
+      pushes = l.pushes + (s.result IN ('push', 'void'))::int,
+      settled_stake = l.settled_stake + CASE WHEN s.result IN ('win', 'loss') THEN s.stake ELSE 0 END,
+      pnl = l.pnl + s.pnl,
+      updated_at = now()
+  FROM s
+  WHERE (l.user_id, l.league, l.market_key, l.book_key) = (s.user_id, {_key("s")})
+)
+SELECT id, result, pnl, settled_at FROM s
+"""
+
+TOTALS_SQL = """
+SELECT COALESCE(sum(open_count), 0)::int AS open_count,
+       COALESCE(sum(open_stake), 0) AS open_stake,
+       COALESCE(sum(open_to_win), 0) AS open_to_win,
+       COALESCE(sum(settled_count), 0)::int AS settled_count,
+       COALESCE(sum(wins), 0)::int AS wins,
+       COALESCE(sum(losses), 0)::int AS losses,
+       COALESCE(sum(pushes), 0)::int AS pushes,
+       COALESCE(sum(settled_stake), 0) AS settled_stake,
+       COALESCE(sum(pnl), 0) AS pnl,
+       max(updated_at) AS updated_at,
+       (SELECT starting FROM portfolio_bankroll WHERE user_id = %(user_id)s) AS starting
+FROM portfolio_ledger
+WHERE user_id = %(user_id)s
+"""
+
+# `by` is spliced from BY_COLUMNS only
+BREAKDOWN_SQL = """
+SELECT {col} AS key,
+       sum(open_count)::int AS open_count, sum(open_stake) AS open_stake, sum(open_to_win) AS open_to_win,
+       sum(settled_count)::int AS settled_count, sum(wins)::int AS wins, sum(losses)::int AS losses,
+       sum(pushes)::int AS pushes, sum(settled_stake) AS settled_stake, sum(pnl) AS pnl
+FROM portfolio_ledger
+WHERE user_id = %(user_id)s {where}
+GROUP BY 1
+ORDER BY {order} DESC, 1
+"""
+BY_COLUMNS = {"league": "league", "market": "market_key", "book": "book_key"}
+
+BANKROLL_SQL = """
+INSERT INTO portfolio_bankroll (user_id, starting) VALUES (%(user_id)s, %(starting)s)
+ON CONFLICT (user_id) DO UPDATE SET starting = EXCLUDED.starting, updated_at = now()
+"""
+
+# recompute from picks (one user, or all when user_id is NULL); picks without a user_id are left out
+REBUILD_DELETE_SQL = "DELETE FROM portfolio_ledger WHERE %(user_id)s::text IS NULL OR user_id = %(user_id)s"
+REBUILD_SQL = f"""
+INSERT INTO portfolio_ledger
+  (user_id, league, market_key, book_key, open_count, open_stake, open_to_win,
+   settled_count, wins, losses, pushes, settled_stake, pnl)
+SELECT k.user_id, {_key("k")},
+       count(*) FILTER (WHERE k.status = 'open'),
+       COALESCE(sum(k.stake) FILTER (WHERE k.status = 'open'), 0),
+       COALESCE(sum({_to_win("k")}) FILTER (WHERE k.status = 'open'), 0),
+       count(*) FILTER (WHERE k.status = 'settled'),
+       count(*) FILTER (WHERE k.status = 'settled' AND k.result = 'win'),
+       count(*) FILTER (WHERE k.status = 'settled' AND k.result = 'loss'),
+       count(*) FILTER (WHERE k.status = 'settled' AND k.result IN ('push', 'void')),
+       COALESCE(sum(k.stake) FILTER (WHERE k.status = 'settled' AND k.result IN ('win', 'loss')), 0),
+       COALESCE(sum(k.pnl) FILTER (WHERE k.status = 'settled'), 0)
+FROM picks k
+WHERE k.user_id IS NOT NULL AND (%(user_id)s::text IS NULL OR k.user_id = %(user_id)s)
+GROUP BY 1, 2, 3, 4
+"""
+
+
+class PlacedPick(PickIn):
+    user_id: str
+    book_key: Optional[str] = None
+    game_uid: Optional[str] = None  # odds_norm game ("<sport_key>:<game_id>"), needed for CLV grading
+
+
+class Settlement(BaseModel):
+    result: Literal["win", "loss", "push", "void"]
+
+
+class Bankroll(BaseModel):
+    starting: float
+
+
+def _num(v: Any) -> Optional[float]:
+    return None if v is None else round(float(v), 4)
+
+
+def _settled(r: Dict[str, Any]) -> Dict[str, Any]:
+    graded = r["wins"] + r["losses"]
+    stake = _num(r["settled_stake"]) or 0.0
+    return {
+        "count": r["settled_count"],
+        "wins": r["wins"],
+        "losses": r["losses"],
+        "pushes": r["pushes"],
+        "stake": stake,
+        "pnl": _num(r["pnl"]),
+        "win_rate": round(r["wins"] / graded, 4) if graded else None,
+        "roi": round(float(r["pnl"]) / stake, 4) if stake else None,
+    }
+
+
+def _open(r: Dict[str, Any]) -> Dict[str, Any]:
+    return {"count": r["open_count"], "stake": _num(r["open_stake"]), "to_win": _num(r["open_to_win"])}
+
+
+def install_portfolio_ledger(
+    app: FastAPI | APIRouter,
+    pool: Any,
+    statements: Optional[StatementRegistry] = None,
+    prefix: str = "/portfolio",
+    dependencies: Sequence[Any] = (),
+) -> None:
+    """Mount pick placement/settlement and the ledger reads under `prefix` (psycopg pool)."""
+    prepare = statements.prepare if statements else None
+    if statements:
+        statements.add("ledger_place", PLACE_SQL)
+        statements.add("ledger_settle", SETTLE_SQL)
+        statements.add("ledger_totals", TOTALS_SQL)
+    deps = list(dependencies)
+
+    async def _fetch(name: str, sql: str, params: Dict[str, Any], commit: bool = False) -> list:
+        if pool.closed:
+            await pool.open()
+        async with pool.connection() as ac, ac.cursor(row_factory=dict_row) as cur:
+            await pg_execute_async(cur, name, sql, params, prepare=prepare)
+            rows = await cur.fetchall()
+            if commit:
+                await ac.commit()
+        return rows
+
+    async def _totals(user_id: str) -> Dict[str, Any]:
+        (r,) = await _fetch("ledger_totals", TOTALS_SQL, {"user_id": user_id})
+        return r
+
+    @app.post(prefix + "/picks", dependencies=deps, tags=["portfolio"])
+    async def place_pick(pick: PlacedPick) -> Dict[str, Any]:
+        (r,) = await _fetch("ledger_place", PLACE_SQL, pick.dict(), commit=True)
+        return {"id": r["id"], "created_at": r["created_at"].isoformat(), "to_win": _num(r["to_win"])}
+
+    @app.post(prefix + "/picks/{pick_id}/settle", dependencies=deps, tags=["portfolio"])
+    async def settle_pick(pick_id: int, body: Settlement) -> Dict[str, Any]:
+        rows = await _fetch("ledger_settle", SETTLE_SQL, {"pick_id": pick_id, "result": body.result}, commit=True)
+        if not rows:
+            raise HTTPException(status_code=409, detail="pick not found or already settled")
+        r = rows[0]
+        return {"id": r["id"], "result": r["result"], "pnl": _num(r["pnl"]), "settled_at": r["settled_at"].isoformat()}
+
+    @app.put(prefix + "/bankroll/{user_id}", dependencies=deps, tags=["portfolio"])
+    async def set_bankroll(user_id: str, body: Bankroll) -> Dict[str, Any]:
+        if pool.closed:
+            await pool.open()
+        async with pool.connection() as ac:
+            await ac.execute(BANKROLL_SQL, {"user_id": user_id, "starting": body.starting})
+        return {"user_id": user_id, "starting": body.starting}
+
+    @app.get(prefix + "/summary", dependencies=deps, tags=["portfolio"])
+    async def portfolio_summary(
+        user_id: str = Query(...),
+        by: Optional[Literal["league", "market", "book"]] = Query(None, description="add a breakdown"),
+    ) -> Dict[str, Any]:
+        """Bankroll, open exposure and settled P&L from the precomputed ledger rows."""
+        t = await _totals(user_id)
+        starting = _num(t["starting"]) or 0.0
+        bankroll = starting + (_num(t["pnl"]) or 0.0)
+        out: Dict[str, Any] = {
+            "user_id": user_id,
+            "bankroll": {"starting": starting, "current": round(bankroll, 4),
+                         "available": round(bankroll - (_num(t["open_stake"]) or 0.0), 4)},
+            "open": _open(t),
+            "settled": _settled(t),
+            "updated_at": t["updated_at"].isoformat() if t["updated_at"] else None,
+        }
+        if by:
+            sql = BREAKDOWN_SQL.format(col=BY_COLUMNS[by], where="", order="sum(settled_count + open_count)")
+            out["by_" + by] = [
+                {"key": r["key"] or None, "open": _open(r), "settled": _settled(r)}
+                for r in await _fetch("ledger_breakdown", sql, {"user_id": user_id})
+            ]
+        return out
+
+    @app.get(prefix + "/exposure", dependencies=deps, tags=["portfolio"])
+    async def portfolio_exposure(
+        user_id: str = Query(...),
+        by: Literal["league", "market", "book"] = Query("league"),
+    ) -> Dict[str, Any]:
+        """Open stake and potential profit per league, market or book, with each one's share of bankroll."""
+        t = await _totals(user_id)
+        bankroll = (_num(t["starting"]) or 0.0) + (_num(t["pnl"]) or 0.0)
+        sql = BREAKDOWN_SQL.format(col=BY_COLUMNS[by], where="AND open_count > 0", order="sum(open_stake)")
+        rows = await _fetch("ledger_exposure", sql, {"user_id": user_id})
+        return {
+            "user_id": user_id,
+            "bankroll": round(bankroll, 4),
+            "open": _open(t),
+            "share_of_bankroll": round(float(t["open_stake"]) / bankroll, 4) if bankroll > 0 else None,
+            "by": by,
+            "exposure": [
+                {
+                    "key": r["key"] or None,
+                    **_open(r),
+                    "share_of_bankroll": round(float(r["open_stake"]) / bankroll, 4) if bankroll > 0 else None,
+                }
+                for r in rows
+            ],
+        }
+
+    @app.post(prefix + "/ledger/rebuild", dependencies=deps, tags=["portfolio"])
+    async def rebuild_ledger(user_id: Optional[str] = Query(None, description="one user (default: all)")) -> Dict[str, Any]:
+        """Recompute ledger rows from picks (for picks written outside /picks)."""
+        if pool.closed:
+            await pool.open()
+        async with pool.connection() as ac:
+            async with ac.transaction():
+                await ac.execute("LOCK TABLE picks IN SHARE MODE")  # no placements/settlements mid-rebuild
+                cur = ac.cursor()
+                await pg_execute_async(cur, "ledger_rebuild_delete", REBUILD_DELETE_SQL, {"user_id": user_id})
+                await pg_execute_async(cur, "ledger_rebuild", REBUILD_SQL, {"user_id": user_id})
+                rows = cur.rowcount
+        return {"ok": True, "user_id": user_id, "ledger_rows": rows}
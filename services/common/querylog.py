@@ -0,0 +1,210 @@
+# services/common/querylog.py
+# Slow-query log with sampled EXPLAIN capture
+# - Wrappers for asyncpg, psycopg (async) and psycopg (sync) time every statement
+#   and feed the db_query_duration_seconds histogram from services.common.metrics
+# - Statements over SLOW_QUERY_MS land in a per-process ring buffer with their parameters
+# - A sample (SLOW_QUERY_EXPLAIN_SAMPLE) of slow read-only statements is re-run under
+#   EXPLAIN (ANALYZE, BUFFERS) inside a savepoint and the plan is stored with the entry
+# - GET /admin/slow-queries lists the slowest entries
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import APIRouter, FastAPI, Query
+
+from services.common.metrics import DB_QUERY
+
+EXPLAIN_PREFIX = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) "
+_WRITE_RE = re.compile(r"\b(insert|update|delete|merge|truncate|create|alter|drop)\b", re.IGNORECASE)
+_WS_RE = re.compile(r"\s+")
+
+
+def _read_only(sql: str) -> bool:
+    head = sql.lstrip().lower()
+    return head.startswith(("select", "with")) and not _WRITE_RE.search(sql)
+
+
+def _short(v: Any, n: int = 200) -> str:
+    s = repr(v)
+    return s if len(s) <= n else s[:n] + "..."
+
+
+class SlowQueryLog:
+    """Bounded, thread-safe buffer of slow statements (most recent `size` kept)."""
+
+    def __init__(
+        self,
+        threshold_ms: Optional[float] = None,
+        explain_sample: Optional[float] = None,
+        size: Optional[int] = None,
+    ) -> None:
+        self.threshold_ms = threshold_ms if threshold_ms is not None else float(os.getenv("SLOW_QUERY_MS", "250"))
+        self.explain_sample = (
+            explain_sample if explain_sample is not None else float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE", "0.1"))
+        )
+        self._entries: deque = deque(maxlen=size or int(os.getenv("SLOW_QUERY_LOG_SIZE", "100")))
+        self._lock = threading.Lock()
+
+    def is_slow(self, ms: float) -> bool:
+        return ms >= self.threshold_ms
+
+    def should_explain(self, sql: str) -> bool:
+        return self.explain_sample > 0 and random.random() < self.explain_sample and _read_only(sql)
+
+    def record(
+        self, pool: str, name: str, sql: str, params: Any, ms: float, plan: Any = None, plan_error: Optional[str] = None
+    ) -> None:
+        entry: Dict[str, Any] = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "pool": pool,
+            "name": name,
+            "ms": round(ms, 1),
+            "sql": _WS_RE.sub(" ", sql).strip(),
+            "params": _short(params),
+        }
+        if plan is not None:
+            top = plan[0] if isinstance(plan, list) and plan else {}
+            entry["plan_ms"] = top.get("Execution Time")
+            entry["plan"] = plan
+        if plan_error:
+            entry["plan_error"] = plan_error
+        with self._lock:
+            self._entries.append(entry)
+
+    def slowest(self, limit: int = 20, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = list(self._entries)
+        if name:
+            entries = [e for e in entries if e["name"] == name]
+        return sorted(entries, key=lambda e: e["ms"], reverse=True)[:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+SLOW_QUERIES = SlowQueryLog()
+
+
+def _plan_json(raw: Any) -> Any:
+    return json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+
+
+# --------------------------------------------------------------------------------------
+# asyncpg
+# --------------------------------------------------------------------------------------
+
+async def pg_fetch(conn: Any, name: str, sql: str, *args: Any, pool: str = "core", method: str = "fetch") -> Any:
+    """`rows = await pg_fetch(conn, "latest_lines", sql, sport, limit)`; method: fetch|fetchrow|fetchval|execute."""
+    t0 = time.perf_counter()
+    result = await getattr(conn, method)(sql, *args)
+    elapsed = time.perf_counter() - t0
+    DB_QUERY.observe(elapsed, pool=pool, query=name)
+
+    ms = elapsed * 1000
+    if SLOW_QUERIES.is_slow(ms):
+        plan, err = None, None
+        if SLOW_QUERIES.should_explain(sql):
+            try:
+                async with conn.transaction():  # savepoint when already in a transaction
+                    plan = _plan_json(await conn.fetchval(EXPLAIN_PREFIX + sql, *args))
+            except Exception as e:
+                err = str(e)
+        SLOW_QUERIES.record(pool, name, sql, args, ms, plan, err)
+    return result
+
+
+# --------------------------------------------------------------------------------------
+# psycopg
+# --------------------------------------------------------------------------------------
+
+async def pg_execute_async(
+    cur: Any, name: str, sql: str, params: Any = None, pool: str = "portfolio", prepare: Optional[bool] = None
+) -> None:
+    """psycopg AsyncCursor: `await pg_execute_async(cur, "normalize_source", sql, {...})`, then fetch from `cur`.
+
+    `prepare` is passed to cur.execute (named/server-side cursors don't take it).
+    """
+    t0 = time.perf_counter()
+    if prepare is None:
+        await cur.execute(sql, params)
+    else:
+        await cur.execute(sql, params, prepare=prepare)
+    elapsed = time.perf_counter() - t0
+    DB_QUERY.observe(elapsed, pool=pool, query=name)
+
+    ms = elapsed * 1000
+    if SLOW_QUERIES.is_slow(ms):
+        plan, err = None, None
+        if SLOW_QUERIES.should_explain(sql):
+            conn = cur.connection
+            try:
+                # separate cursor so the caller's result set is untouched
+                async with conn.transaction(), conn.cursor() as ecur:
+                    await ecur.execute(EXPLAIN_PREFIX + sql, params)
+                    (raw,) = await ecur.fetchone()
+                    plan = _plan_json(raw)
+            except Exception as e:
+                err = str(e)
+        SLOW_QUERIES.record(pool, name, sql, params, ms, plan, err)
+
+
+def pg_execute(cur: Any, name: str, sql: str, params: Any = None, pool: str = "direct") -> None:
+    """psycopg (sync) Cursor counterpart of pg_execute_async."""
+    t0 = time.perf_counter()
+    cur.execute(sql, params)
+    elapsed = time.perf_counter() - t0
+    DB_QUERY.observe(elapsed, pool=pool, query=name)
+
+    ms = elapsed * 1000
+    if SLOW_QUERIES.is_slow(ms):
+        plan, err = None, None
+        if SLOW_QUERIES.should_explain(sql):
+            conn = cur.connection
+            try:
+                with conn.transaction(), conn.cursor() as ecur:
+                    ecur.execute(EXPLAIN_PREFIX + sql, params)
+                    (raw,) = ecur.fetchone()
+                    plan = _plan_json(raw)
+            except Exception as e:
+                err = str(e)
+        SLOW_QUERIES.record(pool, name, sql, params, ms, plan, err)
+
+
+# --------------------------------------------------------------------------------------
+# Admin endpoint
+# --------------------------------------------------------------------------------------
+
+def install_slow_query_log(
+    app: FastAPI | APIRouter, path: str = "/admin/slow-queries", dependencies: Sequence[Any] = ()
+) -> None:
+    """Mount GET `path` (slowest statements first) and DELETE `path` (reset)."""
+
+    @app.get(path, dependencies=list(dependencies), tags=["admin"])
+    async def slow_queries(
+        limit: int = Query(20, ge=1, le=500),
+        name: Optional[str] = Query(None, description="filter by statement name"),
+        plans: bool = Query(True, description="include captured EXPLAIN plans"),
+    ) -> Dict[str, Any]:
+        rows = SLOW_QUERIES.slowest(limit, name)
+        if not plans:
+            rows = [{k: v for k, v in r.items() if k != "plan"} for r in rows]
+        return {
+            "threshold_ms": SLOW_QUERIES.threshold_ms,
+            "explain_sample": SLOW_QUERIES.explain_sample,
+            "entries": rows,
+        }
+
+    @app.delete(path, dependencies=list(dependencies), tags=["admin"])
+    async def reset_slow_queries() -> Dict[str, Any]:
+        SLOW_QUERIES.clear()
+        return {"ok": True}
@@ -0,0 +1,449 @@
+# services/common/risk_sim.py
+# Monte Carlo bankroll simulation for a slate of open picks (portfolio and gsa_portfolio)
+# - Each pick gets a fair win probability: `prob` if given, else the de-vigged consensus of the latest
+#   quotes in odds_norm.odds_latest (per book, implied probabilities of all sides scaled to 1, averaged
+#   over books quoting the pick's point), else the pick's own implied probability
+# - Outcomes are correlated within a game: every (game, market) is one draw per trial and a pick wins when
+#   the draw falls in its side's interval, so home/away (over/under) of one market are mutually exclusive
+#   and picks on the same side at several books or lines move together. h2h and spreads of a game are a
+#   pair of normals with correlation RISK_SIM_SIDE_RHO (uniform draws otherwise, which are cheaper);
+#   totals and different games are independent
+# - Trials are generated in chunks of RISK_SIM_CHUNK as float32 matrices (markets x trials) and settled
+#   with array ops; chunks run on a process pool of RISK_SIM_WORKERS. Workers are spawned, not forked
+#   (the app process runs DB pool and probe threads), and the apps stop them with shutdown_pool(). Chunk
+#   seeds are spawned from one SeedSequence, so a seed reproduces the same result whatever the worker count
+# - Games settle in commence_time order: drawdown and ruin are measured along that path
+# Pushes on integer lines are not modelled (a spread/total pick either wins or loses).
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from fastapi import APIRouter, FastAPI, HTTPException
+from psycopg.rows import dict_row
+from pydantic import BaseModel, Field, validator
+
+from services.common.picks import PickIn
+from services.common.portfolio_ledger import TOTALS_SQL
+from services.common.querylog import pg_execute_async
+from services.common.statements import StatementRegistry
+
+RISK_SIM_TRIALS = int(os.getenv("RISK_SIM_TRIALS", "1000000"))
+RISK_SIM_MAX_TRIALS = int(os.getenv("RISK_SIM_MAX_TRIALS", "10000000"))
+RISK_SIM_CHUNK = int(os.getenv("RISK_SIM_CHUNK", "250000"))
+RISK_SIM_WORKERS = int(os.getenv("RISK_SIM_WORKERS", "0"))  # 0 = os.cpu_count(); 1 = no pool
+RISK_SIM_SIDE_RHO = float(os.getenv("RISK_SIM_SIDE_RHO", "0.9"))
+RISK_SIM_RUIN_LEVEL = float(os.getenv("RISK_SIM_RUIN_LEVEL", "0.5"))
+
+# latest quote per series for the slate's games, and their kickoff times
+SLATE_QUOTES_SQL = """
+SELECT game_uid, market_key, book_key, side, price, point
+FROM odds_norm.odds_latest
+WHERE game_uid = ANY(%(game_uids)s) AND price IS NOT NULL
+"""
+SLATE_GAMES_SQL = """
+SELECT game_uid, commence_time FROM odds_norm.games WHERE game_uid = ANY(%(game_uids)s)
+"""
+
+PNL_PERCENTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+DRAWDOWN_PERCENTILES = (50, 75, 90, 95, 99)
+
+_NORMAL = NormalDist()
+_POOL: Optional[ProcessPoolExecutor] = None
+
+
+class SimPick(PickIn):
+    game_uid: Optional[str] = None  # "<sport_key>:<game_id>" as in odds_norm.games; None = independent event
+    book_key: Optional[str] = None
+    prob: Optional[float] = None  # fair win probability; looked up from odds_latest when omitted
+
+    @validator("prob")
+    def check_prob(cls, v):
+        if v is not None and not 0.0 < v < 1.0:
+            raise ValueError("prob must be within (0, 1)")
+        return v
+
+
+class SimRequest(BaseModel):
+    picks: List[SimPick] = Field(..., min_length=1)
+    bankroll: Optional[float] = None  # default: the user's ledger bankroll (starting + settled P&L)
+    user_id: Optional[str] = None
+    trials: int = RISK_SIM_TRIALS
+    seed: Optional[int] = None
+    ruin_level: float = RISK_SIM_RUIN_LEVEL  # ruin = bankroll falls to this fraction of its start
+    side_rho: float = RISK_SIM_SIDE_RHO
+
+    @validator("trials")
+    def check_trials(cls, v):
+        if not 1000 <= v <= RISK_SIM_MAX_TRIALS:
+            raise ValueError(f"trials must be within 1000..{RISK_SIM_MAX_TRIALS}")
+        return v
+
+    @validator("ruin_level", "side_rho")
+    def check_fraction(cls, v):
+        if not 0.0 <= v < 1.0:
+            raise ValueError("must be within [0, 1)")
+        return v
+
+
+# --------------------------------------------------------------------------------------
+# Fair probabilities
+# --------------------------------------------------------------------------------------
+
+def implied_prob(price: float) -> float:
+    """Break-even win probability of American odds."""
+    return 100.0 / (price + 100.0) if price > 0 else -price / (-price + 100.0)
+
+
+def _same_line(market_key: str, point: Optional[float], quote_point: Optional[float]) -> bool:
+    if market_key == "h2h" or point is None:
+        return True
+    return quote_point is not None and abs(float(quote_point) - point) < 1e-9
+
+
+def fair_probs(picks: Sequence[SimPick], quotes: Sequence[Dict[str, Any]]) -> List[Tuple[float, str]]:
+    """(probability, source) per pick; source is given, devig, devig_other_line or price."""
+    books: Dict[Tuple[str, str, str], Dict[str, Tuple[float, Optional[float]]]] = {}
+    for q in quotes:
+        books.setdefault((q["game_uid"], q["market_key"], q["book_key"]), {})[q["side"]] = (
+            float(q["price"]), None if q["point"] is None else float(q["point"]))
+    by_market: Dict[Tuple[str, str], List[Dict[str, Tuple[float, Optional[float]]]]] = {}
+    for (game_uid, market_key, _), sides in books.items():
+        if len(sides) >= 2:  # one-sided books cannot be de-vigged
+            by_market.setdefault((game_uid, market_key), []).append(sides)
+
+    out: List[Tuple[float, str]] = []
+    for p in picks:
+        if p.prob is not None:
+            out.append((p.prob, "given"))
+            continue
+        quoted = [s for s in by_market.get((p.game_uid or "", p.market_key), []) if p.outcome in s]
+        matched = [s for s in quoted if _same_line(p.market_key, p.point, s[p.outcome][1])]
+        use, source = (matched, "devig") if matched else (quoted, "devig_other_line")
+        if use:
+            est = [implied_prob(s[p.outcome][0]) / sum(implied_prob(v[0]) for v in s.values()) for s in use]
+            out.append((float(np.mean(est)), source))
+        else:
+            out.append((implied_prob(p.price), "price"))
+    return out
+
+
+# --------------------------------------------------------------------------------------
+# Simulation
+# --------------------------------------------------------------------------------------
+
+def build_spec(
+    picks: Sequence[SimPick],
+    probs: Sequence[float],
+    kickoff: Dict[str, Any],
+    bankroll: float,
+    ruin_level: float,
+    side_rho: float,
+) -> Dict[str, Any]:
+    """Arrays the workers need: draw row and win interval per pick, game order and the correlated pairs."""
+    games: List[str] = []
+    for i, p in enumerate(picks):
+        g = p.game_uid or f"pick:{i}"
+        if g not in games:
+            games.append(g)
+    never = datetime.max.replace(tzinfo=timezone.utc)  # no kickoff known: settles last
+    games.sort(key=lambda g: (kickoff.get(g) or never, g))
+    game_idx = {g: j for j, g in enumerate(games)}
+
+    # each pick wins when its market's draw lands in [lo, hi) of the unit interval: home/over take the
+    # low end, away/under the high end, draw the middle (after the home probability)
+    home_prob: Dict[str, float] = {}
+    for p, prob in zip(picks, probs):
+        if p.game_uid and p.market_key == "h2h" and p.outcome == "home":
+            home_prob.setdefault(p.game_uid, prob)
+    cols: List[Tuple[str, str]] = []
+    col_of, lo, hi = [], [], []
+    for i, (p, prob) in enumerate(zip(picks, probs)):
+        g = p.game_uid or f"pick:{i}"
+        key = (g, p.market_key)
+        if p.outcome == "draw":
+            if g in home_prob:
+                lo_i, hi_i = home_prob[g], min(home_prob[g] + prob, 1.0)
+            else:
+                key = (g, f"draw:{i}")  # no home price to anchor it: its own draw
+                lo_i, hi_i = 0.0, prob
+        elif p.outcome in ("home", "over"):
+            lo_i, hi_i = 0.0, prob
+        else:
+            lo_i, hi_i = 1.0 - prob, 1.0
+        if key not in cols:
+            cols.append(key)
+        col_of.append(cols.index(key))
+        lo.append(lo_i)
+        hi.append(hi_i)
+
+    # h2h and spreads of one game are a correlated normal pair; every other market is a plain uniform draw
+    side_cols: Dict[str, List[int]] = {}
+    for c, (g, m) in enumerate(cols):
+        if m in ("h2h", "spreads"):
+            side_cols.setdefault(g, []).append(c)
+    pairs = [cs for cs in side_cols.values() if len(cs) == 2]
+    correlated = np.zeros(len(cols), dtype=bool)
+    for cs in pairs:
+        correlated[cs] = True
+    n_pairs = len(pairs)
+    # rows: first of each pair, second of each pair, then the uniform markets
+    order = np.array([cs[0] for cs in pairs] + [cs[1] for cs in pairs] + list(np.flatnonzero(~correlated)),
+                     dtype=np.int64)
+    row = np.empty(len(cols), dtype=np.int64)
+    row[order] = np.arange(len(cols))
+    col_idx = row[np.array(col_of, dtype=np.int64)]
+
+    def _z(u: float) -> float:
+        return -np.inf if u <= 0.0 else np.inf if u >= 1.0 else _NORMAL.inv_cdf(u)
+
+    def _bound(c: int, u: float) -> float:
+        # uniform draws are < 1, so an upper bound of 1 is open-ended either way
+        return _z(u) if correlated[c] else (np.inf if u >= 1.0 else u)
+
+    lo_a = np.array([_bound(c, v) for c, v in zip(col_of, lo)], dtype=np.float32)
+    hi_a = np.array([_bound(c, v) for c, v in zip(col_of, hi)], dtype=np.float32)
+
+    price = np.array([p.price for p in picks], dtype=np.float64)
+    stake = np.array([p.stake for p in picks], dtype=np.float64)
+    to_win = stake * np.where(price > 0, price / 100.0, 100.0 / np.abs(price))
+    settle = np.zeros((len(games), len(picks)), dtype=np.float32)  # game x pick it settles with
+    for i, p in enumerate(picks):
+        settle[game_idx[p.game_uid or f"pick:{i}"], i] = 1.0
+    return {
+        "games": games,
+        "row": col_idx,
+        "lo": lo_a[:, None],
+        "hi": hi_a[:, None],
+        "stake": stake.astype(np.float32),
+        "to_win": to_win.astype(np.float32),
+        "settle": settle,
+        # a win swings a pick from -stake to +to_win: game P&L = payout @ wins - staked
+        "payout": settle * (to_win + stake).astype(np.float32),
+        "staked": (settle @ stake.astype(np.float32))[:, None],
+        "n_pairs": n_pairs,
+        "n_uniform": len(cols) - 2 * n_pairs,
+        "rho": np.float32(side_rho),
+        "rho_c": np.float32(np.sqrt(1.0 - side_rho ** 2)),
+        "bankroll": float(bankroll),
+        "ruin_loss": float(bankroll) * (1.0 - ruin_level),
+    }
+
+
+def simulate_chunk(task: Tuple[Dict[str, Any], int, np.random.SeedSequence]) -> Dict[str, Any]:
+    """Run `trials` trials; returns per-trial P&L and max drawdown plus per-game sums for the merge."""
+    spec, trials, seed = task
+    rng = np.random.default_rng(seed)
+    # one row per market (rows are contiguous per market, so the per-pick gather copies whole rows)
+    n_pairs = spec["n_pairs"]
+    draws = np.empty((2 * n_pairs + spec["n_uniform"], trials), dtype=np.float32)
+    if n_pairs:
+        x, y = draws[:n_pairs], draws[n_pairs: 2 * n_pairs]
+        rng.standard_normal(out=draws[: 2 * n_pairs], dtype=np.float32)
+        y *= spec["rho_c"]
+        y += x * spec["rho"]
+    if spec["n_uniform"]:
+        rng.random(out=draws[2 * n_pairs:], dtype=np.float32)
+    d = draws[spec["row"]]
+    win = (d >= spec["lo"]) & (d < spec["hi"])
+    game_pnl = spec["payout"] @ win.astype(np.float32)  # games x trials, rows in kickoff order
+    game_pnl -= spec["staked"]
+
+    # walk the games in kickoff order: running P&L, its peak (from 0, the current bankroll) and low
+    path = np.zeros(trials, dtype=np.float32)
+    peak = np.zeros(trials, dtype=np.float32)
+    low = np.zeros(trials, dtype=np.float32)
+    drawdown = np.zeros(trials, dtype=np.float32)
+    gap = np.empty(trials, dtype=np.float32)
+    for g in game_pnl:
+        path += g
+        np.maximum(peak, path, out=peak)
+        np.minimum(low, path, out=low)
+        np.subtract(peak, path, out=gap)
+        np.maximum(drawdown, gap, out=drawdown)
+    total = path
+    ruined = int((low <= -spec["ruin_loss"]).sum()) if spec["ruin_loss"] > 0 else 0
+    return {
+        "total": total,
+        "drawdown": drawdown,
+        "ruined": ruined,
+        "trials": trials,
+        "game_sum": game_pnl.sum(axis=1, dtype=np.float64),
+        "game_cross": game_pnl.astype(np.float64) @ total.astype(np.float64),
+        "game_min": game_pnl.min(axis=1),
+        "game_loss": (game_pnl < 0).sum(axis=1),
+    }
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _POOL
+
+
+def shutdown_pool() -> None:
+    """Stop the worker processes (app shutdown); the next simulation starts a new pool."""
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL = None
+
+
+def _tasks(spec: Dict[str, Any], trials: int, seed: Optional[int]) -> List[Tuple[Dict[str, Any], int, Any]]:
+    sizes = [RISK_SIM_CHUNK] * (trials // RISK_SIM_CHUNK)
+    if trials % RISK_SIM_CHUNK:
+        sizes.append(trials % RISK_SIM_CHUNK)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    return [(spec, n, s) for n, s in zip(sizes, seeds)]
+
+
+def run_chunks(spec: Dict[str, Any], trials: int, seed: Optional[int] = None, workers: int = RISK_SIM_WORKERS) -> List[Dict[str, Any]]:
+    """Simulate synchronously (CLI/bench); the endpoint uses run_chunks_async."""
+    tasks = _tasks(spec, trials, seed)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        return [simulate_chunk(t) for t in tasks]
+    return list(_pool(workers).map(simulate_chunk, tasks))
+
+
+async def run_chunks_async(spec: Dict[str, Any], trials: int, seed: Optional[int] = None, workers: int = RISK_SIM_WORKERS) -> List[Dict[str, Any]]:
+    tasks = _tasks(spec, trials, seed)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        return await asyncio.to_thread(lambda: [simulate_chunk(t) for t in tasks])
+    loop = asyncio.get_running_loop()
+    ex = _pool(workers)
+    return list(await asyncio.gather(*(loop.run_in_executor(ex, simulate_chunk, t) for t in tasks)))
+
+
+def _pct(values: np.ndarray, qs: Sequence[int]) -> Dict[str, float]:
+    return {f"p{q}": round(float(v), 2) for q, v in zip(qs, np.percentile(values, qs))}
+
+
+def summarize(spec: Dict[str, Any], chunks: Sequence[Dict[str, Any]], leagues: Sequence[Optional[str]]) -> Dict[str, Any]:
+    """Merge chunk results into percentiles, ruin probability and per-game/per-league risk."""
+    total = np.concatenate([c["total"] for c in chunks]).astype(np.float64)
+    drawdown = np.concatenate([c["drawdown"] for c in chunks]).astype(np.float64)
+    n = total.size
+    bankroll = spec["bankroll"]
+    mean, var = float(total.mean()), float(total.var())
+    game_mean = sum(c["game_sum"] for c in chunks) / n
+    # covariance of each game's P&L with the slate's: the game's share of the slate variance
+    contrib = sum(c["game_cross"] for c in chunks) / n - game_mean * mean
+    game_min = np.min([c["game_min"] for c in chunks], axis=0)
+    game_loss = sum(c["game_loss"] for c in chunks) / n
+
+    stake_by_game = spec["staked"][:, 0]
+    games = []
+    for j, g in enumerate(spec["games"]):
+        games.append({
+            "game_uid": None if g.startswith("pick:") else g,
+            "league": leagues[j],
+            "picks": int(spec["settle"][j].sum()),
+            "stake": round(float(stake_by_game[j]), 2),
+            "expected_pnl": round(float(game_mean[j]), 2),
+            "worst_pnl": round(float(game_min[j]), 2),
+            "prob_loss": round(float(game_loss[j]), 4),
+            "risk_share": round(float(contrib[j]) / var, 4) if var > 0 else None,
+        })
+    by_league: Dict[str, Dict[str, Any]] = {}
+    for it in games:
+        lg = by_league.setdefault(it["league"] or "", {"league": it["league"], "games": 0, "stake": 0.0,
+                                                      "expected_pnl": 0.0, "risk_share": 0.0})
+        lg["games"] += 1
+        lg["stake"] = round(lg["stake"] + it["stake"], 2)
+        lg["expected_pnl"] = round(lg["expected_pnl"] + it["expected_pnl"], 2)
+        lg["risk_share"] = round(lg["risk_share"] + (it["risk_share"] or 0.0), 4)
+
+    out: Dict[str, Any] = {
+        "trials": n,
+        "bankroll": round(bankroll, 2),
+        "stake": round(float(spec["stake"].sum()), 2),
+        "pnl": {"mean": round(mean, 2), "std": round(var ** 0.5, 2),
+                "prob_profit": round(float((total > 0).mean()), 4), **_pct(total, PNL_PERCENTILES)},
+        "drawdown": _pct(drawdown, DRAWDOWN_PERCENTILES),
+        "prob_ruin": round(sum(c["ruined"] for c in chunks) / n, 6) if spec["ruin_loss"] > 0 else None,
+        "ruin_level": round(1.0 - spec["ruin_loss"] / bankroll, 4) if bankroll > 0 else None,
+        "exposure": {"by_game": sorted(games, key=lambda it: -(it["risk_share"] or 0.0)),
+                     "by_league": sorted(by_league.values(), key=lambda it: -it["risk_share"])},
+    }
+    if bankroll > 0:
+        out["drawdown_pct"] = {k: round(v / bankroll, 4) for k, v in out["drawdown"].items()}
+    return out
+
+
+# --------------------------------------------------------------------------------------
+# Endpoint
+# --------------------------------------------------------------------------------------
+
+def install_risk_sim(
+    app: FastAPI | APIRouter,
+    pool: Any,
+    statements: Optional[StatementRegistry] = None,
+    prefix: str = "/portfolio",
+    dependencies: Sequence[Any] = (),
+) -> None:
+    """Mount POST {prefix}/risk/simulate (psycopg pool)."""
+    prepare = statements.prepare if statements else None
+    if statements:
+        statements.add("risk_slate_quotes", SLATE_QUOTES_SQL)
+        statements.add("risk_slate_games", SLATE_GAMES_SQL)
+
+    async def _slate(game_uids: List[str], need_odds: List[str], user_id: Optional[str]) -> Tuple[list, list, Optional[Dict[str, Any]]]:
+        if pool.closed:
+            await pool.open()
+        async with pool.connection() as ac, ac.cursor(row_factory=dict_row) as cur:
+            quotes, games, totals = [], [], None
+            if need_odds:
+                await pg_execute_async(cur, "risk_slate_quotes", SLATE_QUOTES_SQL, {"game_uids": need_odds}, prepare=prepare)
+                quotes = await cur.fetchall()
+            if game_uids:
+                await pg_execute_async(cur, "risk_slate_games", SLATE_GAMES_SQL, {"game_uids": game_uids}, prepare=prepare)
+                games = await cur.fetchall()
+            if user_id is not None:
+                await pg_execute_async(cur, "ledger_totals", TOTALS_SQL, {"user_id": user_id}, prepare=prepare)
+                totals = await cur.fetchone()
+        return quotes, games, totals
+
+    @app.post(prefix + "/risk/simulate", dependencies=list(dependencies), tags=["portfolio"])
+    async def risk_simulate(body: SimRequest) -> Dict[str, Any]:
+        """Bankroll distribution of a slate of open picks: P&L and drawdown percentiles, ruin, risk by game."""
+        t0 = time.perf_counter()
+        game_uids = sorted({p.game_uid for p in body.picks if p.game_uid})
+        need_odds = sorted({p.game_uid for p in body.picks if p.game_uid and p.prob is None})
+        quotes, games, totals = await _slate(game_uids, need_odds, body.user_id if body.bankroll is None else None)
+        kickoff = {r["game_uid"]: r["commence_time"] for r in games}
+        if body.bankroll is not None:
+            bankroll = body.bankroll
+        elif totals is not None and totals["starting"] is not None:
+            bankroll = float(totals["starting"]) + float(totals["pnl"])
+        else:
+            raise HTTPException(status_code=422, detail="bankroll is required (or a user_id with a ledger bankroll)")
+        if bankroll <= 0:
+            raise HTTPException(status_code=422, detail="bankroll must be > 0")
+
+        probs = fair_probs(body.picks, quotes)
+        spec = build_spec(body.picks, [p for p, _ in probs], kickoff, bankroll, body.ruin_level, body.side_rho)
+        t1 = time.perf_counter()
+        chunks = await run_chunks_async(spec, body.trials, body.seed)
+        t2 = time.perf_counter()
+        league_of = {p.game_uid or f"pick:{i}": p.league for i, p in enumerate(body.picks)}
+        out = summarize(spec, chunks, [league_of[g] for g in spec["games"]])
+        out["picks"] = [
+            {"game_uid": p.game_uid, "market_key": p.market_key, "outcome": p.outcome, "price": p.price,
+             "stake": p.stake, "prob": round(prob, 4), "prob_source": source,
+             "ev": round(prob * float(spec["to_win"][i]) - (1 - prob) * p.stake, 2)}
+            for i, (p, (prob, source)) in enumerate(zip(body.picks, probs))
+        ]
+        out["seconds"] = {"setup": round(t1 - t0, 4), "simulate": round(t2 - t1, 4),
+                          "total": round(time.perf_counter() - t0, 4)}
+        return out
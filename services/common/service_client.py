@@ -0,0 +1,173 @@
+# services/common/service_client.py
+# Async client for service-to-service calls (e.g., coach -> core)
+# - One keep-alive httpx.AsyncClient per target service
+# - Short TTL response cache; stale entries are served while the target is failing
+# - Concurrent identical calls share one in-flight request
+# - Circuit breaker: after N consecutive failures, fail fast until a cool-down passes
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a target whose breaker is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half_open (one trial) -> closed/open."""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"  # let exactly one trial through
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def abandon_trial(self) -> None:
+        """A call ended without an outcome (e.g. cancelled): reopen so the next call can be the trial."""
+        if self.state == "half_open":
+            self.state = "open"  # opened_at unchanged: the reset timeout has already passed
+
+    def retry_in(self) -> float:
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+
+@dataclass
+class ServiceResult:
+    data: Any
+    cached: bool = False
+    stale: bool = False
+
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class ServiceClient:
+    """GET-JSON client for one upstream service with caching, call collapsing and a breaker."""
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        timeout: float = 5.0,
+        connect_timeout: float = 2.0,
+        cache_ttl: float = 5.0,
+        max_cache_entries: int = 256,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.cache_ttl = cache_ttl
+        self.max_cache_entries = max_cache_entries
+        self.breaker = breaker or CircuitBreaker()
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._cache: Dict[_Key, Tuple[float, Any]] = {}
+        self._inflight: Dict[_Key, asyncio.Future] = {}
+
+    def _http(self) -> httpx.AsyncClient:
+        # created lazily so it binds to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_keepalive_connections=5, max_connections=10, keepalive_expiry=60),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get_json(
+        self, path: str, params: Optional[Dict[str, Any]] = None, ttl: Optional[float] = None
+    ) -> ServiceResult:
+        key: _Key = (path, tuple(sorted((k, str(v)) for k, v in (params or {}).items())))
+        hit = self._cache.get(key)
+        if hit and hit[0] > time.monotonic():
+            return ServiceResult(hit[1], cached=True)
+
+        if key not in self._inflight and not self.breaker.allow():
+            if hit:
+                return ServiceResult(hit[1], cached=True, stale=True)
+            raise CircuitOpenError(f"{self.base_url} unavailable; retry in {self.breaker.retry_in():.0f}s")
+
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(self._fetch(key, path, params, self.cache_ttl if ttl is None else ttl))
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda _f, k=key: self._inflight.pop(k, None))
+
+        try:
+            # shield: one caller disconnecting must not cancel the shared request
+            data = await asyncio.shield(fut)
+        except Exception:
+            if hit:
+                return ServiceResult(hit[1], cached=True, stale=True)
+            raise
+        return ServiceResult(data)
+
+    async def _fetch(self, key: _Key, path: str, params: Optional[Dict[str, Any]], ttl: float) -> Any:
+        try:
+            r = await self._http().get(path, params=params)
+        except httpx.HTTPError:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # cancelled (or failed outside httpx) before an outcome: free a half-open trial slot
+            self.breaker.abandon_trial()
+            raise
+        if r.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            # a 4xx still proves the upstream is up
+            self.breaker.record_success()
+        r.raise_for_status()
+        data = r.json()
+
+        if ttl > 0:
+            if key not in self._cache and len(self._cache) >= self.max_cache_entries:
+                now = time.monotonic()
+                self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+                # all still fresh: drop the ones that expire soonest so the cache stays within its bound
+                while self._cache and len(self._cache) >= self.max_cache_entries:
+                    del self._cache[min(self._cache, key=lambda k: self._cache[k][0])]
+            self._cache[key] = (time.monotonic() + ttl, data)
+        return data
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "breaker": self.breaker.state,
+            "failures": self.breaker.failures,
+            "retry_in_s": round(self.breaker.retry_in(), 1),
+            "cached": len(self._cache),
+            "inflight": len(self._inflight),
+        }
@@ -0,0 +1,306 @@
+# services/common/shared_board.py
+# Cross-worker snapshot of a pre-serialized row board in a shared mmap file
+# - One file (LINES_CACHE_PATH, /dev/shm when available) holds a header and two data slots
+# - Exactly one process per host is the refresher: whoever holds an exclusive lock on <path>.lock
+#   (flock on POSIX, msvcrt.locking on Windows).
+#   It rebuilds the board every interval into the inactive slot, then flips the header.
+#   The other workers retry the lock each interval, so the role moves on if the refresher exits
+# - The header carries a seqlock version (odd while being written). Readers note the version,
+#   slice rows out of the mmap and re-check it: no locks, no DB round trip, no per-worker copy
+# - Rows are stored as ready JSON; a response is b"[" + b",".join(rows) + b"]" sliced from the map
+# - wake() (e.g. from a LISTEN callback) makes the leader refresh now instead of at the next interval
+#
+# Header: magic, version, active slot, slot length, rows, updated_at (unix), extra (int64), writer pid
+# Slot:   n_rows u32 | n_groups u32 | row index (offset u32, length u32) * n_rows
+#         | groups (key 48s, ids offset u32, count u32) * n_groups | group row ids u32... | row bytes...
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"GSABRD01"
+HEADER = struct.Struct("<8sQIIIdqI")
+HEADER_BYTES = 64
+COUNTS = struct.Struct("<II")
+ROW = struct.Struct("<II")
+GROUP = struct.Struct("<48sII")
+U32 = struct.Struct("<I")
+
+Fetch = Callable[[], Awaitable[Tuple[Sequence[Tuple[Optional[str], bytes]], int]]]
+
+
+def default_path(name: str) -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, name)
+
+
+def _pack_slot(rows: Sequence[Tuple[Optional[str], bytes]]) -> bytes:
+    """rows: (group key, JSON bytes) in board order."""
+    groups: Dict[str, List[int]] = {}
+    for i, (key, _) in enumerate(rows):
+        if key:
+            groups.setdefault(key, []).append(i)
+    head = COUNTS.size + ROW.size * len(rows) + GROUP.size * len(groups)
+    ids_at = head
+    group_recs, id_blobs = [], []
+    for key, ids in groups.items():
+        group_recs.append(GROUP.pack(key.encode()[:48], ids_at, len(ids)))
+        id_blobs.append(struct.pack(f"<{len(ids)}I", *ids))
+        ids_at += U32.size * len(ids)
+    at = ids_at
+    index = []
+    for _, data in rows:
+        index.append(ROW.pack(at, len(data)))
+        at += len(data)
+    return b"".join([COUNTS.pack(len(rows), len(groups)), *index, *group_recs, *id_blobs, *(d for _, d in rows)])
+
+
+class SharedBoard:
+    """Reader/writer for the board file. All workers open the same path."""
+
+    def __init__(self, path: str, slot_bytes: int = 8 << 20) -> None:
+        self.path = path
+        self.slot_bytes = slot_bytes
+        size = HEADER_BYTES + 2 * slot_bytes
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)  # every worker asks for the same size, so racing is harmless
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self._view = memoryview(self._map)
+        self.fallbacks = 0
+        self.hits = 0
+
+    def close(self) -> None:
+        self._view.release()
+        self._map.close()
+
+    # -- writer ---------------------------------------------------------------------
+
+    def publish(self, rows: Sequence[Tuple[Optional[str], bytes]], extra: int = 0) -> int:
+        """Write into the inactive slot, then flip the header. Returns the new version."""
+        blob = _pack_slot(rows)
+        if len(blob) > self.slot_bytes:
+            raise ValueError(f"board is {len(blob)} bytes; raise LINES_CACHE_SLOT_BYTES (now {self.slot_bytes})")
+        magic, version, active, *_ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            version, active = 0, 1
+        slot = 1 - active
+        start = HEADER_BYTES + slot * self.slot_bytes
+        self._map[start: start + len(blob)] = blob
+        # odd version while the header fields change; readers that saw the old even version re-check it
+        HEADER.pack_into(self._map, 0, MAGIC, version + 1, slot, len(blob), len(rows), time.time(), extra, os.getpid())
+        version += 2
+        struct.pack_into("<Q", self._map, 8, version)
+        return version
+
+    # -- readers --------------------------------------------------------------------
+
+    def header(self) -> Optional[Dict[str, Any]]:
+        magic, version, active, length, rows, updated_at, extra, pid = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            return None
+        return {"version": version, "slot": active, "bytes": length, "rows": rows,
+                "updated_at": updated_at, "extra": extra, "writer_pid": pid}
+
+    def read(self, key: Optional[str], limit: int, max_age: float) -> Optional[Tuple[bytes, Dict[str, Any]]]:
+        """JSON array of the first `limit` rows (all groups, or one) or None when missing/stale."""
+        for _ in range(5):
+            h = self.header()
+            if h is None or h["version"] % 2 or time.time() - h["updated_at"] > max_age:
+                break
+            base = HEADER_BYTES + h["slot"] * self.slot_bytes
+            v = self._view[base: base + h["bytes"]]
+            try:
+                body = _slice(v, key, limit)
+            except (struct.error, ValueError):
+                body = None  # slot rewritten under us (two flips during the read): retry
+            if body is not None and struct.unpack_from("<Q", self._map, 8)[0] == h["version"]:
+                self.hits += 1
+                return body, h
+        self.fallbacks += 1
+        return None
+
+    def snapshot(self) -> Optional[Tuple[int, List[bytes]]]:
+        """(version, every row's JSON) for diffing; None while missing or mid-write."""
+        for _ in range(5):
+            h = self.header()
+            if h is None or h["version"] % 2:
+                return None
+            base = HEADER_BYTES + h["slot"] * self.slot_bytes
+            v = self._view[base: base + h["bytes"]]
+            try:
+                n_rows, _ = COUNTS.unpack_from(v, 0)
+                rows = []
+                for i in range(n_rows):
+                    off, ln = ROW.unpack_from(v, COUNTS.size + i * ROW.size)
+                    rows.append(bytes(v[off: off + ln]))
+            except (struct.error, ValueError):
+                continue
+            if struct.unpack_from("<Q", self._map, 8)[0] == h["version"]:
+                return h["version"], rows
+        return None
+
+
+def _slice(v: memoryview, key: Optional[str], limit: int) -> bytes:
+    n_rows, n_groups = COUNTS.unpack_from(v, 0)
+    if key is None:
+        ids: Sequence[int] = range(min(limit, n_rows))
+    else:
+        ids = ()
+        g_at = COUNTS.size + ROW.size * n_rows
+        want = key.encode()[:48]
+        for g in range(n_groups):
+            name, ids_at, count = GROUP.unpack_from(v, g_at + g * GROUP.size)
+            if name.rstrip(b"\0") == want:
+                ids = struct.unpack_from(f"<{min(limit, count)}I", v, ids_at)
+                break
+    parts = []
+    for i in ids:
+        off, ln = ROW.unpack_from(v, COUNTS.size + i * ROW.size)
+        if off + ln > len(v):
+            raise ValueError("row outside slot")
+        parts.append(v[off: off + ln])
+    return b"[" + b",".join(parts) + b"]"  # the one copy: the response body
+
+
+class BoardRefresher:
+    """Elects one refresher per board file and runs `fetch` every `interval` seconds in it."""
+
+    def __init__(
+        self,
+        board: SharedBoard,
+        fetch: Fetch,
+        interval: float = 5.0,
+        on_lead: Optional[Callable[[], Awaitable[Any]]] = None,
+        on_resign: Optional[Callable[[], Awaitable[Any]]] = None,
+        min_gap: float = 0.5,
+    ) -> None:
+        self.board = board
+        self.fetch = fetch
+        self.interval = interval
+        self.on_lead = on_lead  # e.g. open a LISTEN connection; only the leader needs one
+        self.on_resign = on_resign
+        self.min_gap = min_gap  # debounce for wake(): bursts of NOTIFYs cost one refresh
+        self._lock_fd: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self.last_error: Optional[str] = None
+        self.refreshes = 0
+
+    @property
+    def leader(self) -> bool:
+        return self._lock_fd is not None
+
+    def _try_lead(self) -> bool:
+        if self._lock_fd is not None:
+            return True
+        fd = os.open(self.board.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)  # first byte of the lock file
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd  # released by the OS if this process dies
+        return True
+
+    async def _lead(self) -> bool:
+        if self._lock_fd is not None:
+            return True
+        if not self._try_lead():
+            return False
+        if self.on_lead:
+            try:
+                await self.on_lead()
+            except Exception as e:
+                self.last_error = f"on_lead: {e}"  # still refresh on the interval
+        return True
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    async def refresh(self) -> None:
+        rows, extra = await self.fetch()
+        self.board.publish(rows, extra)
+        self.refreshes += 1
+        self.last_error = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+                await asyncio.sleep(self.min_gap)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if await self._lead():
+                try:
+                    await self.refresh()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.last_error = str(e)
+                    log.warning("board refresh failed: %s", e)
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            if await self._lead():
+                try:
+                    await self.refresh()  # first board before the leader serves
+                except Exception as e:
+                    self.last_error = str(e)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._lock_fd is not None:
+            if self.on_resign:
+                try:
+                    await self.on_resign()
+                except Exception:
+                    pass
+            if fcntl is not None:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._lock_fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._lock_fd, msvcrt.LK_UNLCK, 1)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def stats(self) -> Dict[str, Any]:
+        h = self.board.header()
+        return {
+            "leader": self.leader,
+            "pid": os.getpid(),
+            "refreshes": self.refreshes,
+            "last_error": self.last_error,
+            "hits": self.board.hits,
+            "fallbacks": self.board.fallbacks,
+            "board": h and {**h, "age_s": round(time.time() - h["updated_at"], 3)},
+        }
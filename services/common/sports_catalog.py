@@ -0,0 +1,188 @@
+# services/common/sports_catalog.py
+# Persisted Odds API sports catalog (public.sports_catalog) and active-sport discovery
+# - sync_catalog() stores /v4/sports?all=true and diffs it against the table:
+#   new, removed (no longer listed), activated, deactivated, outrights_changed
+# - discover() returns the sports worth an /odds call: active, not outrights-only, and with at least
+#   one event starting within DISCOVER_HORIZON_HOURS. Event lists come from /v4/sports/{sport}/events,
+#   which costs no quota and is disk-cached by the shared client; counts are stored on the catalog row
+# Used by `ingest_odds --discover` and gsa_ingestor /ingest/sports.
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import asyncpg
+
+from services.common.odds_api import OddsApiClient, OddsApiError
+
+DISCOVER_HORIZON_HOURS = float(os.getenv("DISCOVER_HORIZON_HOURS", "168"))
+DISCOVER_EVENTS_TTL = float(os.getenv("DISCOVER_EVENTS_TTL", "900"))
+DISCOVER_CONCURRENCY = int(os.getenv("DISCOVER_CONCURRENCY", "4"))
+
+DDL = """
+CREATE TABLE IF NOT EXISTS sports_catalog (
+  sport_key          TEXT PRIMARY KEY,
+  group_name         TEXT,
+  title              TEXT,
+  description        TEXT,
+  active             BOOLEAN NOT NULL,
+  has_outrights      BOOLEAN NOT NULL DEFAULT false,
+  listed             BOOLEAN NOT NULL DEFAULT true,
+  first_seen         TIMESTAMPTZ NOT NULL DEFAULT now(),
+  last_seen          TIMESTAMPTZ NOT NULL DEFAULT now(),
+  active_changed_at  TIMESTAMPTZ,
+  upcoming_events    INT,
+  next_commence      TIMESTAMPTZ,
+  events_checked_at  TIMESTAMPTZ
+);
+"""
+
+# one statement per sync: the fetched list arrives as a JSON array
+UPSERT_SQL = """
+INSERT INTO sports_catalog AS c (sport_key, group_name, title, description, active, has_outrights, listed, last_seen)
+SELECT s.key, s."group", s.title, s.description, s.active, COALESCE(s.has_outrights, false), true, now()
+FROM jsonb_to_recordset($1::jsonb)
+     AS s(key text, "group" text, title text, description text, active boolean, has_outrights boolean)
+ON CONFLICT (sport_key) DO UPDATE SET
+  group_name = EXCLUDED.group_name,
+  title = EXCLUDED.title,
+  description = EXCLUDED.description,
+  active = EXCLUDED.active,
+  has_outrights = EXCLUDED.has_outrights,
+  listed = true,
+  last_seen = now(),
+  active_changed_at = CASE WHEN c.active IS DISTINCT FROM EXCLUDED.active THEN now() ELSE c.active_changed_at END
+"""
+
+UNLIST_SQL = "UPDATE sports_catalog SET listed = false, active = false WHERE NOT (sport_key = ANY($1::text[])) AND listed"
+
+EVENTS_SQL = """
+UPDATE sports_catalog AS c
+SET upcoming_events = e.n, next_commence = e.next_commence, events_checked_at = now()
+FROM jsonb_to_recordset($1::jsonb) AS e(sport_key text, n int, next_commence timestamptz)
+WHERE c.sport_key = e.sport_key
+"""
+
+
+async def ensure_schema(conn: asyncpg.Connection) -> None:
+    await conn.execute(DDL)
+
+
+def diff_catalog(prev: Dict[str, Dict[str, Any]], sports: Iterable[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """prev: sport_key -> stored row (active, has_outrights, listed); sports: /v4/sports?all=true."""
+    out: Dict[str, List[str]] = {k: [] for k in ("new", "removed", "activated", "deactivated", "outrights_changed")}
+    seen = set()
+    for s in sports:
+        key = s["key"]
+        seen.add(key)
+        old = prev.get(key)
+        if old is None or not old["listed"]:
+            out["new"].append(key)
+            continue
+        if bool(s.get("active")) != old["active"]:
+            out["activated" if s.get("active") else "deactivated"].append(key)
+        if bool(s.get("has_outrights")) != old["has_outrights"]:
+            out["outrights_changed"].append(key)
+    out["removed"] = sorted(k for k, r in prev.items() if r["listed"] and k not in seen)
+    return out
+
+
+async def _store(conn: asyncpg.Connection, sports: List[Dict[str, Any]], store: bool) -> Dict[str, List[str]]:
+    tr = conn.transaction()
+    await tr.start()
+    try:
+        prev = {
+            r["sport_key"]: dict(r)
+            for r in await conn.fetch("SELECT sport_key, active, has_outrights, listed FROM sports_catalog FOR UPDATE")
+        }
+        diff = diff_catalog(prev, sports)
+        if store:
+            await conn.execute(UPSERT_SQL, json.dumps(sports))
+            await conn.execute(UNLIST_SQL, [s["key"] for s in sports])
+    except BaseException:
+        await tr.rollback()
+        raise
+    await tr.commit()
+    return diff
+
+
+async def sync_catalog(conn: asyncpg.Connection, client: OddsApiClient, store: bool = True) -> Dict[str, Any]:
+    """Fetch the full catalog (disk-cached) and diff it against the table; store it unless `store` is False."""
+    res = await client.sports(all=True)
+    sports = [s for s in res.data if s.get("key")]
+    return {
+        "fetched": len(sports),
+        "active": sum(1 for s in sports if s.get("active")),
+        "cached": res.cached,
+        "changes": await _store(conn, sports, store),
+        "sports": sports,
+    }
+
+
+def upcoming(events: Iterable[Dict[str, Any]], now: datetime, horizon: timedelta) -> List[datetime]:
+    """Commence times in [now, now + horizon)."""
+    out = []
+    for ev in events:
+        try:
+            t = datetime.fromisoformat(str(ev.get("commence_time")).replace("Z", "+00:00"))
+        except ValueError:
+            continue
+        if now <= t < now + horizon:
+            out.append(t)
+    return sorted(out)
+
+
+async def discover(
+    conn: asyncpg.Connection,
+    client: OddsApiClient,
+    *,
+    groups: Optional[Iterable[str]] = None,
+    include_outrights: bool = False,
+    horizon_hours: float = DISCOVER_HORIZON_HOURS,
+    store: bool = True,
+) -> Dict[str, Any]:
+    """Sync the catalog, then check each active candidate for upcoming events.
+    Returns {"sports": [keys to ingest], "skipped": {key: reason}, "catalog": sync summary}."""
+    catalog = await sync_catalog(conn, client, store)
+    wanted_groups = {g.lower() for g in groups} if groups else None
+    skipped: Dict[str, str] = {}
+    candidates = []
+    for s in sorted(catalog.pop("sports"), key=lambda s: s["key"]):
+        if not s.get("active"):
+            continue
+        if wanted_groups is not None and (s.get("group") or "").lower() not in wanted_groups:
+            continue
+        if s.get("has_outrights") and not include_outrights:
+            skipped[s["key"]] = "outrights"
+            continue
+        candidates.append(s["key"])
+
+    now = datetime.now(timezone.utc)
+    horizon = timedelta(hours=horizon_hours)
+    sem = asyncio.Semaphore(DISCOVER_CONCURRENCY)
+    checked: List[Dict[str, Any]] = []
+
+    async def check(sport: str) -> None:
+        async with sem:
+            try:
+                res = await client.events(sport, ttl=DISCOVER_EVENTS_TTL)
+            except OddsApiError as e:
+                skipped[sport] = f"events: {e.status}"
+                return
+        times = upcoming(res.data, now, horizon)
+        checked.append({"sport_key": sport, "n": len(times), "next_commence": times[0].isoformat() if times else None})
+        if not times:
+            skipped[sport] = "no upcoming events"
+
+    await asyncio.gather(*(check(s) for s in candidates))
+    if checked and store:
+        await conn.execute(EVENTS_SQL, json.dumps(checked))
+    return {
+        "sports": sorted(c["sport_key"] for c in checked if c["n"]),
+        "skipped": dict(sorted(skipped.items())),
+        "catalog": catalog,
+    }
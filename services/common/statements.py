@@ -0,0 +1,119 @@
+# services/common/statements.py
+# Named hot statements, prepared on every new pool connection
+# - Apps register their hot SQL once at import: `LATEST_LINES = STATEMENTS.add("latest_lines", "...")`
+#   and call sites pass that same text, so it hits the per-connection prepared statement
+# - asyncpg: pass `init=STATEMENTS.asyncpg_init` to create_pool. Only the public API is used: statements
+#   registered with `warm=` params are fetched with them, which leaves them in the connection's statement
+#   cache under the exact text call sites send; the rest are EXPLAINed like on psycopg
+# - psycopg: pass `configure=STATEMENTS.psycopg_configure` to the pool and `prepare=STATEMENTS.prepare`
+#   to execute(). psycopg can only prepare by executing, so configure runs the statements registered
+#   with `warm=` params (cheap reads) and EXPLAINs the rest (plans without executing, loading the
+#   backend's catalog caches); those are then prepared on their first execute instead of the 5th
+# - Pools open with DB_POOL_WARM_SIZE connections so a fresh deploy starts with warmed connections
+# PREPARE_STATEMENTS=0 turns it all off (e.g. behind pgbouncer in transaction mode).
+
+from __future__ import annotations
+
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+PREPARE_DEFAULT = os.getenv("PREPARE_STATEMENTS", "1").strip().lower() not in ("0", "false", "no")
+POOL_WARM_SIZE = int(os.getenv("DB_POOL_WARM_SIZE", "2"))
+POOL_WARM_TIMEOUT = float(os.getenv("DB_POOL_WARM_TIMEOUT", "10"))
+
+_NAMED_RE = re.compile(r"%\((\w+)\)s")
+_DOLLAR_RE = re.compile(r"\$(\d+)")
+
+
+def _null_params(sql: str) -> Any:
+    """All-NULL params for a psycopg statement, enough to EXPLAIN it."""
+    names = _NAMED_RE.findall(sql)
+    if names:
+        return dict.fromkeys(names)
+    n = sql.count("%s")
+    return [None] * n if n else None
+
+
+def _null_args(sql: str) -> List[None]:
+    """All-NULL positional args for an asyncpg ($n) statement."""
+    return [None] * max((int(n) for n in _DOLLAR_RE.findall(sql)), default=0)
+
+
+@dataclass(frozen=True)
+class Statement:
+    name: str
+    sql: str
+    warm: Any = None  # params to run it with while warming a new connection (None = EXPLAIN only)
+
+
+class StatementRegistry:
+    """Per-app set of hot statements; also counts what each new connection prepared."""
+
+    def __init__(self, enabled: Optional[bool] = None) -> None:
+        self.enabled = PREPARE_DEFAULT if enabled is None else enabled
+        self._stmts: Dict[str, Statement] = {}
+        self.connections = 0
+        self.errors: Dict[str, str] = {}
+        self.last_init_ms: Optional[float] = None
+
+    def add(self, name: str, sql: str, warm: Any = None) -> str:
+        """Register and return `sql` unchanged (call sites must send exactly this text)."""
+        self._stmts[name] = Statement(name, sql, warm)
+        return sql
+
+    @property
+    def prepare(self) -> Optional[bool]:
+        """Value for psycopg's execute(prepare=...): True when enabled, else psycopg's default."""
+        return True if self.enabled else None
+
+    def statements(self) -> List[Statement]:
+        return list(self._stmts.values())
+
+    async def asyncpg_init(self, conn: Any) -> None:
+        if not self.enabled:
+            return
+        t0 = time.perf_counter()
+        for st in self._stmts.values():
+            try:
+                if st.warm is None:
+                    await conn.fetch("EXPLAIN " + st.sql, *_null_args(st.sql))
+                else:
+                    await conn.fetch(st.sql, *st.warm)
+                self.errors.pop(st.name, None)
+            except Exception as e:
+                # e.g. a view not created yet: the query prepares on first use instead
+                self.errors[st.name] = str(e)
+        self._done(t0)
+
+    async def psycopg_configure(self, conn: Any) -> None:
+        if not self.enabled:
+            return
+        t0 = time.perf_counter()
+        for st in self._stmts.values():
+            try:
+                async with conn.cursor() as cur:
+                    if st.warm is None:
+                        await cur.execute("EXPLAIN " + st.sql, _null_params(st.sql))
+                    else:
+                        await cur.execute(st.sql, st.warm, prepare=True)
+                self.errors.pop(st.name, None)
+            except Exception as e:
+                self.errors[st.name] = str(e)
+            await conn.rollback()  # the pool wants the connection back idle
+        self._done(t0)
+
+    def _done(self, t0: float) -> None:
+        self.connections += 1
+        self.last_init_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "statements": sorted(self._stmts),
+            "connections_prepared": self.connections,
+            "last_init_ms": self.last_init_ms,
+            "errors": dict(self.errors),
+        }
@@ -0,0 +1,203 @@
+# services/common/teams.py
+# Canonical team/outcome resolution for normalization
+# - Team names are folded once (lowercase, punctuation and extra spaces removed; LRU-memoized)
+# - Aliases ("LA Clippers" -> "los angeles clippers") come from odds_norm.team_aliases,
+#   reloaded at most every TEAM_ALIAS_TTL_SECONDS, on top of a small built-in set
+# - Each game builds its outcome-name -> side map once; every outcome is then a dict lookup
+# - Names that still don't resolve are counted per (sport, market, name) for curation
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import APIRouter, FastAPI, Query
+
+from services.common.querylog import pg_execute_async
+
+TEAM_MARKETS = frozenset(("h2h", "spreads", "spread", "line"))
+TOTAL_MARKETS = frozenset(("totals", "total", "over_under"))
+
+# Spellings some books use; also seeded into odds_norm.team_aliases by services/db/create_team_aliases.py
+BUILTIN_ALIASES: Dict[str, Dict[str, str]] = {
+    "basketball_nba": {
+        "LA Clippers": "Los Angeles Clippers",
+        "LA Lakers": "Los Angeles Lakers",
+        "GS Warriors": "Golden State Warriors",
+        "NY Knicks": "New York Knicks",
+        "OKC Thunder": "Oklahoma City Thunder",
+        "Philadelphia Sixers": "Philadelphia 76ers",
+    },
+    "americanfootball_nfl": {
+        "LA Rams": "Los Angeles Rams",
+        "LA Chargers": "Los Angeles Chargers",
+        "NY Giants": "New York Giants",
+        "NY Jets": "New York Jets",
+        "Washington Football Team": "Washington Commanders",
+        "Oakland Raiders": "Las Vegas Raiders",
+    },
+}
+
+ALIAS_SQL = "SELECT sport_key, alias, canonical FROM odds_norm.team_aliases"
+
+_PUNCT_RE = re.compile(r"[.'’]")
+_SPACE_RE = re.compile(r"[\s_\-]+")
+
+
+@lru_cache(maxsize=8192)
+def fold(name: str) -> str:
+    """'  L.A. Clippers ' -> 'la clippers'"""
+    return _SPACE_RE.sub(" ", _PUNCT_RE.sub("", name or "")).strip().lower()
+
+
+class GameSides:
+    """Outcome-name -> side map for one game; built once per game, probed once per outcome."""
+
+    __slots__ = ("resolver", "sport", "game_uid", "_team")
+
+    def __init__(self, resolver: "TeamResolver", sport: str, game_uid: str, home: str, away: str) -> None:
+        self.resolver = resolver
+        self.sport = sport
+        self.game_uid = game_uid
+        team = {"home": "home", "away": "away"}
+        for side, name in (("away", away), ("home", home)):
+            f = fold(name)
+            if f:
+                team[f] = side
+                team[resolver.canonical(sport, f)] = side
+        self._team = team
+
+    def side(self, market_key: str, outcome_name: str) -> Optional[str]:
+        """home/away for team markets (draw for a three-way h2h), over/under for totals, None when the name doesn't resolve."""
+        if market_key in TEAM_MARKETS:
+            f = fold(outcome_name)
+            if f == "draw" and market_key == "h2h":
+                return "draw"
+            hit = self._team.get(f)
+            if hit is None:
+                hit = self._team.get(self.resolver.canonical(self.sport, f))
+            if hit is None:
+                self.resolver.miss(self.sport, market_key, outcome_name, self.game_uid)
+            return hit
+        if market_key in TOTAL_MARKETS:
+            f = fold(outcome_name)
+            if f.startswith("over"):
+                return "over"
+            if f.startswith("under"):
+                return "under"
+            self.resolver.miss(self.sport, market_key, outcome_name, self.game_uid)
+        return None
+
+
+class TeamResolver:
+    """Alias index shared by every normalize run in the process."""
+
+    def __init__(self, ttl: Optional[float] = None, max_unresolved: int = 1000) -> None:
+        self.ttl = ttl if ttl is not None else float(os.getenv("TEAM_ALIAS_TTL_SECONDS", "300"))
+        self.max_unresolved = max_unresolved
+        self._aliases: Dict[Tuple[str, str], str] = {}
+        self._loaded_at = 0.0
+        self.load_error: Optional[str] = None
+        self._unresolved: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.set_aliases(())
+        self._loaded_at = 0.0  # built-ins only: first normalize run loads the table
+
+    # -- alias index ---------------------------------------------------------------
+
+    def set_aliases(self, rows: Iterable[Sequence[str]]) -> None:
+        """Replace the index with built-ins plus `(sport_key, alias, canonical)` rows."""
+        idx: Dict[Tuple[str, str], str] = {}
+        for sport, mapping in BUILTIN_ALIASES.items():
+            for alias, canonical in mapping.items():
+                idx[(sport, fold(alias))] = fold(canonical)
+        for sport, alias, canonical in rows:
+            idx[(sport, fold(alias))] = fold(canonical)
+        self._aliases = idx
+        self._loaded_at = time.monotonic()
+
+    def stale(self) -> bool:
+        return time.monotonic() - self._loaded_at >= self.ttl
+
+    async def refresh_async(self, conn: Any, force: bool = False) -> None:
+        """Reload from odds_norm.team_aliases through a psycopg AsyncConnection; keeps the old index on error."""
+        if not force and not self.stale():
+            return
+        try:
+            async with conn.cursor() as cur:
+                await pg_execute_async(cur, "team_aliases", ALIAS_SQL)
+                rows = await cur.fetchall()
+            self.set_aliases(tuple(r.values()) if isinstance(r, dict) else r for r in rows)
+            self.load_error = None
+        except Exception as e:
+            # table not created yet: run on built-ins, retry after the next TTL
+            self._loaded_at = time.monotonic()
+            self.load_error = str(e)
+
+    def canonical(self, sport: str, folded: str) -> str:
+        return self._aliases.get((sport, folded), folded)
+
+    def alias_count(self) -> int:
+        return len(self._aliases)
+
+    # -- per game --------------------------------------------------------------------
+
+    def game(self, sport: str, game_uid: str, home: str, away: str) -> GameSides:
+        return GameSides(self, sport, game_uid, home, away)
+
+    # -- unresolved report -----------------------------------------------------------
+
+    def miss(self, sport: str, market_key: str, name: str, game_uid: str) -> None:
+        key = (sport, market_key, name)
+        with self._lock:
+            entry = self._unresolved.get(key)
+            if entry is None:
+                if len(self._unresolved) >= self.max_unresolved:
+                    return
+                entry = self._unresolved[key] = {
+                    "sport_key": sport, "market_key": market_key, "name": name, "count": 0, "sample_game_uid": game_uid,
+                }
+            entry["count"] += 1
+
+    def unresolved(self, limit: int = 100, sport: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = [dict(e) for e in self._unresolved.values() if not sport or e["sport_key"] == sport]
+        return sorted(rows, key=lambda e: e["count"], reverse=True)[:limit]
+
+    def clear_unresolved(self) -> None:
+        with self._lock:
+            self._unresolved.clear()
+
+
+def install_team_alias_admin(
+    app: FastAPI | APIRouter, resolver: TeamResolver, pool: Any, path: str = "/team-aliases", dependencies: Sequence[Any] = ()
+) -> None:
+    """Mount GET `path`/unresolved (names to curate), DELETE it (reset) and POST `path`/reload."""
+
+    @app.get(path + "/unresolved", dependencies=list(dependencies), tags=["admin"])
+    async def unresolved_team_names(
+        limit: int = Query(100, ge=1, le=1000),
+        sport: Optional[str] = Query(None, description="e.g., basketball_nba"),
+    ) -> Dict[str, Any]:
+        return {
+            "aliases": resolver.alias_count(),
+            "alias_load_error": resolver.load_error,
+            "unresolved": resolver.unresolved(limit, sport),
+        }
+
+    @app.delete(path + "/unresolved", dependencies=list(dependencies), tags=["admin"])
+    async def reset_unresolved_team_names() -> Dict[str, Any]:
+        resolver.clear_unresolved()
+        return {"ok": True}
+
+    @app.post(path + "/reload", dependencies=list(dependencies), tags=["admin"])
+    async def reload_team_aliases() -> Dict[str, Any]:
+        if pool.closed:
+            await pool.open()
+        async with pool.connection() as ac:
+            await resolver.refresh_async(ac, force=True)
+        return {"ok": resolver.load_error is None, "aliases": resolver.alias_count(), "error": resolver.load_error}
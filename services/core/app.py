@@ -1,15 +1,35 @@
-import os, json, asyncpg
+import os, json, time, hashlib, asyncpg
 from typing import Optional, List
 from datetime import datetime
 
-from fastapi import FastAPI, Query
+from fastapi import Depends, FastAPI, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+from services.common.auth import require_admin_token
+from services.common.health import HealthProber, asyncpg_pool_stats
+from services.common.line_stream import ODDS_NOTIFY_CHANNEL, STREAM_HEARTBEAT_SECONDS, LineBroadcaster
+from services.common.metrics import install_metrics, timed_acquire
+from services.common.querylog import install_slow_query_log, pg_fetch
+from services.common.shared_board import BoardRefresher, SharedBoard, default_path
+from services.common.statements import POOL_WARM_SIZE, StatementRegistry
+
 load_dotenv(".env.local", override=True)
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Shared latest-lines board (services/common/shared_board.py): one worker per host refreshes it every
+# LINES_CACHE_SECONDS; every worker answers /core/latest-lines and /core/metrics from it while it is fresh
+LINES_CACHE = os.getenv("LINES_CACHE", "1").strip().lower() not in ("0", "false", "no")
+LINES_CACHE_SECONDS = float(os.getenv("LINES_CACHE_SECONDS", "5"))
+LINES_CACHE_MAX_AGE = float(os.getenv("LINES_CACHE_MAX_AGE", str(LINES_CACHE_SECONDS * 3)))
+LINES_CACHE_SLOT_BYTES = int(os.getenv("LINES_CACHE_SLOT_BYTES", str(8 << 20)))
+# one file per database, shared by every worker on the host
+LINES_CACHE_PATH = os.getenv("LINES_CACHE_PATH") or default_path(
+    f"gsa_core_lines_{hashlib.sha256((DATABASE_URL or '').encode()).hexdigest()[:8]}.bin"
+)
+
 app = FastAPI(title="GSA Core", version="0.1.0")
 
 # CORS (open for now)
@@ -18,22 +38,140 @@ app.add_middleware(
     allow_origins=["*"], allow_credentials=True,
     allow_methods=["*"], allow_headers=["*"]
 )
+install_metrics(app)
+# SQL text, parameters and plans: admin token only (services/common/auth.py)
+install_slow_query_log(app, dependencies=[Depends(require_admin_token)])
 
 _pool: Optional[asyncpg.pool.Pool] = None
 
+# Hot statements: prepared on every new pool connection (services/common/statements.py); `warm` params
+# return no rows (LIMIT 0, an unknown game) so warming only prepares them
+STATEMENTS = StatementRegistry()
+
+MONEYLINE_COUNT_SQL = STATEMENTS.add("moneyline_count", "select count(*) as n from v_moneyline_latest")
+
+LATEST_LINES_SQL = STATEMENTS.add("latest_lines", """
+  SELECT sport_key, game_id, away_team, home_team, commence_time_utc,
+         away_best_price, away_book, home_best_price, home_book
+  FROM v_moneyline_game_best
+  WHERE ($1::text IS NULL OR sport_key = $1)
+  ORDER BY commence_time_utc NULLS LAST, game_id
+  LIMIT $2
+""", warm=(None, 0))
+
+# /core/line-history downsamples in Postgres: split the game's time range into `points` buckets and
+# keep the last quote per (book, side, bucket), so only chart-sized series cross the wire.
+# Pinning commence_time to the game's lets Postgres prune odds_norm.odds to that month's partition (plus
+# odds_default). A game without a commence_time has its rows in odds_default with a NULL one; the OR
+# keeps those too, where IS NOT DISTINCT FROM would not prune at all. Needs the partitioned table
+# (python -m services.db.odds_partitions --migrate); until then the endpoint answers 503.
+LINE_HISTORY_SQL = STATEMENTS.add("line_history", """
+  WITH s AS (
+    SELECT book_key, side, price, point, last_update
+    FROM odds_norm.odds
+    WHERE game_uid = $1 AND market_key = $2
+      AND (commence_time = (SELECT commence_time FROM odds_norm.games WHERE game_uid = $1)
+           OR (commence_time IS NULL AND (SELECT commence_time FROM odds_norm.games WHERE game_uid = $1) IS NULL))
+      AND ($3::text IS NULL OR book_key = $3)
+      AND ($4::text IS NULL OR side = $4)
+  ),
+  r AS (
+    SELECT extract(epoch FROM min(last_update)) AS lo,
+           extract(epoch FROM max(last_update)) + 1 AS hi
+    FROM s
+  ),
+  b AS (
+    SELECT DISTINCT ON (s.book_key, s.side, bucket)
+           s.book_key, s.side, s.price, s.point, s.last_update,
+           width_bucket(extract(epoch FROM s.last_update), r.lo, r.hi, $5) AS bucket
+    FROM s CROSS JOIN r
+    ORDER BY s.book_key, s.side, bucket, s.last_update DESC
+  )
+  SELECT book_key, side, price, point, last_update
+  FROM b
+  ORDER BY book_key, side, last_update
+""", warm=("", "h2h", None, None, 1))
+
+_board: Optional[SharedBoard] = None
+_board_refresher: Optional[BoardRefresher] = None
+_broadcaster: Optional[LineBroadcaster] = None
+# the board leader LISTENs on ODDS_NOTIFY_CHANNEL (sent by ingest) and refreshes right away
+_listen_conn: Optional[asyncpg.Connection] = None
+
+async def _board_rows():
+    """Whole latest-lines board, serialized the way the endpoint would, plus the moneyline count."""
+    async with timed_acquire(_pool, "core") as conn:
+        rows = await pg_fetch(conn, "latest_lines_board", LATEST_LINES_SQL, None, None)
+        n = await pg_fetch(conn, "moneyline_count", MONEYLINE_COUNT_SQL, method="fetchval")
+    board = [(r["sport_key"], MoneylineRow(**dict(r)).model_dump_json().encode()) for r in rows]
+    return board, int(n or 0)
+
+async def _listen_start():
+    global _listen_conn
+    _listen_conn = await asyncpg.connect(DATABASE_URL)
+    await _listen_conn.add_listener(ODDS_NOTIFY_CHANNEL, lambda *_: _board_refresher and _board_refresher.wake())
+
+async def _listen_stop():
+    global _listen_conn
+    if _listen_conn is not None:
+        await _listen_conn.close()
+        _listen_conn = None
+
 @app.on_event("startup")
 async def startup():
-    global _pool
+    global _pool, _board, _board_refresher, _broadcaster
     if not DATABASE_URL:
         raise RuntimeError("DATABASE_URL not set")
-    _pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=5)
+    # min_size connections are opened (and their statements prepared) before the app serves
+    _pool = await asyncpg.create_pool(
+        DATABASE_URL, min_size=min(POOL_WARM_SIZE, 5), max_size=5, init=STATEMENTS.asyncpg_init
+    )
+    if LINES_CACHE:
+        _board = SharedBoard(LINES_CACHE_PATH, LINES_CACHE_SLOT_BYTES)
+        _board_refresher = BoardRefresher(
+            _board, _board_rows, LINES_CACHE_SECONDS, on_lead=_listen_start, on_resign=_listen_stop
+        )
+        await _board_refresher.start()
+        _broadcaster = LineBroadcaster(_board)
+        await _broadcaster.start()
 
 @app.on_event("shutdown")
 async def shutdown():
-    global _pool
+    global _pool, _board, _board_refresher, _broadcaster
+    if _broadcaster:
+        await _broadcaster.stop()
+        _broadcaster = None
+    if _board_refresher:
+        await _board_refresher.stop()
+        _board_refresher = None
+    if _board:
+        _board.close()
+        _board = None
     if _pool:
         await _pool.close()
 
+async def _probe_db():
+    async with _pool.acquire() as conn:
+        await conn.fetchval("select 1")
+
+# /health and /ready answer from cached probe results (registered after startup so the pool exists)
+health = HealthProber("core", interval=float(os.getenv("HEALTH_INTERVAL_SECONDS", "15")))
+health.add_probe("db", _probe_db)
+health.set_pool_stats(asyncpg_pool_stats(lambda: _pool, STATEMENTS))
+
+def _probe_board():
+    if _board_refresher is None:
+        return {"enabled": False}
+    st = _board_refresher.stats()
+    if not st["board"] or st["board"]["age_s"] > LINES_CACHE_MAX_AGE:
+        raise RuntimeError(f"latest-lines board stale or missing (serving from the DB): {st['last_error']}")
+    st["listening"] = _listen_conn is not None and not _listen_conn.is_closed()
+    st["stream"] = _broadcaster.stats() if _broadcaster else None
+    return st
+
+health.add_probe("lines_board", _probe_board, critical=False)
+health.install(app)
+
 class MoneylineRow(BaseModel):
     sport_key: str
     game_id: str
@@ -45,15 +183,14 @@ class MoneylineRow(BaseModel):
     home_best_price: Optional[int] = None
     home_book: Optional[str] = None
 
-@app.get("/health")
-async def health():
-    return {"db": "ok"}
-
 @app.get("/core/metrics")
 async def metrics():
-    sql = "select count(*) as n from v_moneyline_latest"
-    async with _pool.acquire() as conn:
-        n = await conn.fetchval(sql)
+    if _board is not None:
+        h = _board.header()
+        if h and time.time() - h["updated_at"] <= LINES_CACHE_MAX_AGE:
+            return {"moneyline_rows": h["extra"]}
+    async with timed_acquire(_pool, "core") as conn:
+        n = await pg_fetch(conn, "moneyline_count", MONEYLINE_COUNT_SQL, method="fetchval")
     return {"moneyline_rows": n}
 
 @app.get("/core/latest-lines", response_model=List[MoneylineRow])
@@ -61,15 +198,77 @@ async def latest_lines(
     sport: Optional[str] = Query(None, description="e.g., americanfootball_nfl"),
     limit: int = Query(50, ge=1, le=500)
 ):
-    sql = """
-      SELECT sport_key, game_id, away_team, home_team, commence_time_utc,
-             away_best_price, away_book, home_best_price, home_book
-      FROM v_moneyline_game_best
-      WHERE ($1::text IS NULL OR sport_key = $1)
-      ORDER BY commence_time_utc NULLS LAST, game_id
-      LIMIT $2
-    """
-    async with _pool.acquire() as conn:
-        rows = await conn.fetch(sql, sport, limit)
+    if _board is not None:
+        hit = _board.read(sport, limit, LINES_CACHE_MAX_AGE)
+        if hit is not None:
+            body, h = hit
+            return Response(body, media_type="application/json", headers={"x-board-version": str(h["version"])})
+    async with timed_acquire(_pool, "core") as conn:
+        rows = await pg_fetch(conn, "latest_lines", LATEST_LINES_SQL, sport, limit)
     # FastAPI + Pydantic will serialize datetime automatically
     return [dict(r) for r in rows]
+
+class LinePoint(BaseModel):
+    book_key: str
+    side: str
+    price: Optional[float] = None
+    point: Optional[float] = None
+    last_update: datetime
+
+@app.get("/core/line-history", response_model=List[LinePoint])
+async def line_history(
+    game_uid: str = Query(..., description="e.g., americanfootball_nfl:<odds api game id>"),
+    market: str = Query("h2h", description="h2h, spreads or totals"),
+    book: Optional[str] = Query(None, description="e.g., draftkings; all books when omitted"),
+    side: Optional[str] = Query(None, description="home, away, over or under; all sides when omitted"),
+    points: int = Query(200, ge=2, le=2000, description="max points per book/side series")
+):
+    async with timed_acquire(_pool, "core") as conn:
+        try:
+            rows = await pg_fetch(conn, "line_history", LINE_HISTORY_SQL, game_uid, market.strip().lower(), book, side, points)
+        except asyncpg.UndefinedColumnError:
+            raise HTTPException(503, "odds_norm.odds has no commence_time yet: run python -m services.db.odds_partitions --migrate")
+    return [dict(r) for r in rows]
+
+# /core/stream pushes best-line changes: a snapshot of the requested sports first, then per-sport
+# {"type": "changes", "upserts": [...], "removed": [game_id...]} as the board changes. Every connection
+# is fed by the one per-worker broadcaster (services/common/line_stream.py), never by its own query.
+def _stream_sports(sports: Optional[str]) -> Optional[List[str]]:
+    if _broadcaster is None:
+        raise HTTPException(503, "line stream needs the latest-lines board (LINES_CACHE=1)")
+    return [s.strip() for s in sports.split(",") if s.strip()] if sports else None
+
+@app.get("/core/stream")
+async def stream(sports: Optional[str] = Query(None, description="comma-separated sport keys; all when omitted")):
+    """Server-Sent Events; the events are `snapshot` and `changes`."""
+    wanted = _stream_sports(sports)  # 503 when the board is off
+    sub = _broadcaster.subscribe(wanted)
+
+    async def events():
+        try:
+            async for msg in _broadcaster.listen(sub, STREAM_HEARTBEAT_SECONDS):
+                yield b": ping\n\n" if msg is None else msg.sse
+        finally:
+            _broadcaster.unsubscribe(sub)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"cache-control": "no-cache", "x-accel-buffering": "no"})
+
+@app.websocket("/core/stream/ws")
+async def stream_ws(ws: WebSocket, sports: Optional[str] = None):
+    """Same messages as /core/stream, one JSON text frame each."""
+    if _broadcaster is None:
+        await ws.close(code=1013)
+        return
+    await ws.accept()
+    sub = _broadcaster.subscribe(_stream_sports(sports))
+    try:
+        async for msg in _broadcaster.listen(sub, STREAM_HEARTBEAT_SECONDS):
+            if msg is None:
+                await ws.send_text('{"type":"ping"}')
+            else:
+                await ws.send_text(msg.text)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        _broadcaster.unsubscribe(sub)
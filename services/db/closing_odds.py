@@ -0,0 +1,143 @@
+# services/db/closing_odds.py
+# odds_norm.closing_odds: the last pre-kickoff quote per (game, market, book, side), frozen once the
+# game's commence_time has passed. CLV grading (/portfolio/clv, services/common/clv.py) joins picks
+# against it instead of searching odds_norm.odds for the latest row before kickoff pick by pick.
+#   python -m services.db.closing_odds                      # run every few minutes: freeze games that just started
+#   python -m services.db.closing_odds --since 2025-09-01   # backfill every game kicked off since a date
+# - Each run reads games whose commence_time lies in (now - CLOSING_LOOKBACK_HOURS, now - CLOSING_DELAY_MINUTES].
+#   The range is also applied to odds_norm.odds.commence_time, the partition key, so only the current
+#   month's partition (two around a month boundary) is planned, and each game's rows are read through the
+#   (game_uid, ...) series index rather than by scanning the partition
+# - The delay lets the last polls before kickoff land; re-running over the lookback window picks up
+#   quotes that arrived late (a row is only replaced by a later pre-kickoff quote), so runs are idempotent
+# - Quotes stamped after commence_time (live odds) never count as closing.
+
+import os, sys, json, asyncio, argparse
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import asyncpg
+from dotenv import load_dotenv
+
+from services.db.odds_partitions import add_months
+from services.ingestor.audit_compat import log_audit_compat
+
+load_dotenv(".env.local", override=True)
+DATABASE_URL = os.getenv("DATABASE_URL")
+LOOKBACK_HOURS = float(os.getenv("CLOSING_LOOKBACK_HOURS", "24"))
+DELAY_MINUTES = float(os.getenv("CLOSING_DELAY_MINUTES", "10"))
+
+SQL = """
+CREATE TABLE IF NOT EXISTS odds_norm.closing_odds (
+  game_uid       TEXT NOT NULL,
+  market_key     TEXT NOT NULL,
+  side           TEXT NOT NULL,
+  book_key       TEXT NOT NULL,
+  price          NUMERIC,
+  point          NUMERIC,
+  fair_prob      NUMERIC,
+  last_update    TIMESTAMPTZ NOT NULL,
+  commence_time  TIMESTAMPTZ NOT NULL,
+  frozen_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+  -- CLV joins on (game_uid, market_key, side) for the consensus close and adds book_key for the same book
+  PRIMARY KEY (game_uid, market_key, side, book_key)
+);
+CREATE INDEX IF NOT EXISTS idx_closing_odds_commence ON odds_norm.closing_odds (commence_time);
+"""
+
+# fair_prob: the book's closing implied probability for the side, scaled so the book's sides sum to 1.
+# Sides are only scaled together when they close on the same line (spreads: opposite-signed points of the
+# same size, totals: the same point); a side whose closing point has no counterpart gets no fair_prob.
+FREEZE_SQL = """
+INSERT INTO odds_norm.closing_odds AS c
+  (game_uid, market_key, side, book_key, price, point, fair_prob, last_update, commence_time)
+SELECT l.game_uid, l.market_key, l.side, l.book_key, l.price, l.point,
+       CASE WHEN count(l.implied) OVER w >= 2 THEN l.implied / sum(l.implied) OVER w END,
+       l.last_update, l.commence_time
+FROM (
+  SELECT DISTINCT ON (o.game_uid, o.market_key, o.book_key, o.side)
+         o.game_uid, o.market_key, o.side, o.book_key, o.price, o.point, o.last_update, o.commence_time,
+         CASE WHEN o.price > 0 THEN 100 / (o.price + 100) ELSE -o.price / (100 - o.price) END AS implied
+  FROM odds_norm.games g
+  JOIN odds_norm.odds o ON o.game_uid = g.game_uid AND o.commence_time = g.commence_time
+  WHERE g.commence_time > $1 AND g.commence_time <= $2
+    AND o.commence_time > $1 AND o.commence_time <= $2
+    AND o.last_update <= o.commence_time
+  ORDER BY o.game_uid, o.market_key, o.book_key, o.side, o.last_update DESC
+) l
+WINDOW w AS (
+  PARTITION BY l.game_uid, l.market_key, l.book_key,
+               CASE WHEN l.market_key IN ('spreads', 'spread', 'line') THEN abs(l.point)
+                    WHEN l.market_key IN ('totals', 'total', 'over_under') THEN l.point END
+)
+ON CONFLICT (game_uid, market_key, side, book_key) DO UPDATE
+  SET price = EXCLUDED.price,
+      point = EXCLUDED.point,
+      fair_prob = EXCLUDED.fair_prob,
+      last_update = EXCLUDED.last_update,
+      commence_time = EXCLUDED.commence_time,
+      frozen_at = now()
+  -- a late quote on one side also re-scales the book's other sides
+  WHERE c.last_update < EXCLUDED.last_update OR c.fair_prob IS DISTINCT FROM EXCLUDED.fair_prob
+"""
+
+GAMES_SQL = """
+SELECT count(DISTINCT game_uid) FROM odds_norm.closing_odds WHERE commence_time > $1 AND commence_time <= $2
+"""
+
+
+async def freeze(
+    conn: asyncpg.Connection,
+    since: Optional[datetime] = None,
+    lookback_hours: float = LOOKBACK_HOURS,
+    delay_minutes: float = DELAY_MINUTES,
+    now: Optional[datetime] = None,
+) -> dict:
+    """Freeze closing quotes for games that kicked off in (since, now - delay]; `since` defaults to the lookback."""
+    hi = (now or datetime.now(timezone.utc)) - timedelta(minutes=delay_minutes)
+    lo = since or hi - timedelta(hours=lookback_hours)
+    await conn.execute(SQL)
+    # one statement per commence month, so a backfill sorts one partition's rows at a time
+    written, start = 0, lo
+    while start < hi:
+        m = add_months(start.astimezone(timezone.utc).date().replace(day=1), 1)
+        end = min(hi, datetime(m.year, m.month, 1, tzinfo=timezone.utc))
+        written += int((await conn.execute(FREEZE_SQL, start, end)).split()[-1])
+        start = end
+    out = {
+        "from": lo.isoformat(),
+        "to": hi.isoformat(),
+        "rows_written": written,
+        "games": await conn.fetchval(GAMES_SQL, lo, hi),
+    }
+    if out["rows_written"]:
+        await log_audit_compat(conn, "closing_odds_freeze", out)
+    return out
+
+
+def _since(s: str) -> datetime:
+    d = datetime.fromisoformat(s.replace("Z", "+00:00"))
+    return d if d.tzinfo else d.replace(tzinfo=timezone.utc)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Freeze the last pre-kickoff quote of started games into odds_norm.closing_odds.")
+    parser.add_argument("--since", type=_since, help="backfill games kicked off after this time (UTC if no offset)")
+    parser.add_argument("--lookback-hours", type=float, default=LOOKBACK_HOURS, help="window re-checked on each run")
+    parser.add_argument("--delay-minutes", type=float, default=DELAY_MINUTES, help="wait after kickoff before freezing")
+    args = parser.parse_args()
+
+    if not DATABASE_URL:
+        print("DATABASE_URL missing", file=sys.stderr)
+        sys.exit(2)
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        out = await freeze(conn, args.since, args.lookback_hours, args.delay_minutes)
+    finally:
+        await conn.close()
+    print(json.dumps(out, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,43 @@
+import os, asyncio, asyncpg
+from dotenv import load_dotenv
+
+load_dotenv(".env.local", override=True)
+
+# /core/line-history reads one (game, market, book, side) series ordered by last_update.
+# The ON CONFLICT key of odds_norm.odds normally provides exactly this index; only
+# create our own when no index already leads with these columns.
+SQL = """
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1
+    FROM pg_index i
+    JOIN pg_class t ON t.oid = i.indrelid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    WHERE n.nspname = 'odds_norm' AND t.relname = 'odds'
+      AND (
+        SELECT array_agg(a.attname::text ORDER BY k.ord)
+        FROM unnest(i.indkey) WITH ORDINALITY AS k(attnum, ord)
+        JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+        WHERE k.ord <= 5
+      ) = ARRAY['game_uid', 'market_key', 'book_key', 'side', 'last_update']
+  ) THEN
+    CREATE INDEX idx_odds_norm_odds_series
+      ON odds_norm.odds (game_uid, market_key, book_key, side, last_update);
+  END IF;
+END $$;
+"""
+
+async def main():
+    db = os.getenv("DATABASE_URL")
+    if not db:
+        raise SystemExit("DATABASE_URL missing")
+    conn = await asyncpg.connect(db)
+    try:
+        await conn.execute(SQL)
+        print("odds_norm.odds: series index present (game_uid, market_key, book_key, side, last_update)")
+    finally:
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
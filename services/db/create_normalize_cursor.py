@@ -0,0 +1,33 @@
+import os, asyncio, asyncpg
+from dotenv import load_dotenv
+
+load_dotenv(".env.local", override=True)
+
+# Position of /admin/normalize in public.odds_raw (services/common/odds_source.py SourceCursor): the
+# (fetched_at, id) of the last snapshot a run committed. Until this table exists normalize reads from the
+# oldest snapshot on every run.
+#   python -m services.db.create_normalize_cursor
+SQL = """
+CREATE SCHEMA IF NOT EXISTS odds_norm;
+CREATE TABLE IF NOT EXISTS odds_norm.normalize_cursor (
+  source      TEXT PRIMARY KEY,
+  fetched_at  TIMESTAMPTZ NOT NULL,
+  raw_id      BIGINT NOT NULL,
+  updated_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+async def main():
+    db = os.getenv("DATABASE_URL")
+    if not db:
+        raise SystemExit("DATABASE_URL missing")
+    conn = await asyncpg.connect(db)
+    try:
+        await conn.execute(SQL)
+        row = await conn.fetchrow("SELECT fetched_at, raw_id FROM odds_norm.normalize_cursor WHERE source = 'odds_raw'")
+        print("odds_norm.normalize_cursor ready" + (f" (at {row['fetched_at']}, id {row['raw_id']})" if row else ""))
+    finally:
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
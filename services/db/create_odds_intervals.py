@@ -0,0 +1,76 @@
+import os, sys, asyncio, asyncpg
+from dotenv import load_dotenv
+
+load_dotenv(".env.local", override=True)
+
+# Change-only odds (services/common/odds_changes.py): each odds_norm.odds row is an interval that starts at
+# last_update and ends at the next row of its series (v_odds_intervals.valid_to, NULL while current).
+# odds_norm.odds_latest keeps the last-known quote per series so normalize can skip unchanged quotes.
+#   python -m services.db.create_odds_intervals             # add odds_latest and the view, seed odds_latest
+#   python -m services.db.create_odds_intervals --compact   # also delete rows that repeat the previous quote
+SQL = """
+CREATE TABLE IF NOT EXISTS odds_norm.odds_latest (
+  game_uid    TEXT NOT NULL,
+  market_key  TEXT NOT NULL,
+  book_key    TEXT NOT NULL,
+  side        TEXT NOT NULL,
+  price       NUMERIC,
+  point       NUMERIC,
+  valid_from  TIMESTAMPTZ,
+  PRIMARY KEY (game_uid, market_key, book_key, side)
+);
+"""
+
+# also re-created by services/db/odds_partitions.py --migrate, which replaces the table underneath
+VIEW_SQL = """
+-- filter on game_uid (and market/book/side): the window then reads one series range of the unique index
+CREATE OR REPLACE VIEW odds_norm.v_odds_intervals AS
+SELECT id, game_uid, market_key, book_key, side, price, point,
+       last_update AS valid_from,
+       lead(last_update) OVER (PARTITION BY game_uid, market_key, book_key, side ORDER BY last_update) AS valid_to
+FROM odds_norm.odds;
+"""
+
+# rows whose price and point equal the previous row of the same series (polling, not movement)
+COMPACT_SQL = """
+DELETE FROM odds_norm.odds o
+USING (
+  SELECT id,
+         price IS NOT DISTINCT FROM lag(price) OVER w
+           AND point IS NOT DISTINCT FROM lag(point) OVER w
+           AND lag(id) OVER w IS NOT NULL AS repeat
+  FROM odds_norm.odds
+  WINDOW w AS (PARTITION BY game_uid, market_key, book_key, side ORDER BY last_update)
+) d
+WHERE o.id = d.id AND d.repeat
+"""
+
+SEED_LATEST_SQL = """
+INSERT INTO odds_norm.odds_latest (game_uid, market_key, book_key, side, price, point, valid_from)
+SELECT DISTINCT ON (game_uid, market_key, book_key, side)
+       game_uid, market_key, book_key, side, price, point, last_update
+FROM odds_norm.odds
+WHERE last_update IS NOT NULL
+ORDER BY game_uid, market_key, book_key, side, last_update DESC
+ON CONFLICT (game_uid, market_key, book_key, side) DO NOTHING
+"""
+
+async def main():
+    db = os.getenv("DATABASE_URL")
+    if not db:
+        raise SystemExit("DATABASE_URL missing")
+    compact = "--compact" in sys.argv[1:]
+    conn = await asyncpg.connect(db)
+    try:
+        async with conn.transaction():
+            await conn.execute(SQL)
+            await conn.execute(VIEW_SQL)
+            deleted = await conn.execute(COMPACT_SQL) if compact else "DELETE 0"
+            seeded = await conn.execute(SEED_LATEST_SQL)
+        print(f"odds_norm.odds intervals ready: {deleted.split()[-1]} repeated rows deleted, "
+              f"{seeded.split()[-1]} series seeded into odds_latest")
+    finally:
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
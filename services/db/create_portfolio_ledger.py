@@ -0,0 +1,25 @@
+import os
+import psycopg
+from dotenv import load_dotenv
+
+from services.common.portfolio_ledger import DDL, REBUILD_DELETE_SQL, REBUILD_SQL
+
+load_dotenv(".env.local", override=True)
+
+# Pick status/result/user/book/game_uid columns on picks, plus the running aggregates behind /portfolio/summary
+# and /portfolio/exposure (services/common/portfolio_ledger.py). Rebuilds every ledger row from picks,
+# so it can also be re-run to reconcile picks written outside POST /portfolio/picks.
+
+def main():
+    db = os.getenv("DATABASE_URL")
+    if not db:
+        raise SystemExit("DATABASE_URL missing")
+    with psycopg.connect(db) as conn:
+        conn.execute(DDL)
+        conn.execute("LOCK TABLE picks IN SHARE MODE")
+        conn.execute(REBUILD_DELETE_SQL, {"user_id": None})
+        n = conn.execute(REBUILD_SQL, {"user_id": None}).rowcount
+    print(f"portfolio_ledger ready ({n} rows rebuilt from picks)")
+
+if __name__ == "__main__":
+    main()
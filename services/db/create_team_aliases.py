@@ -0,0 +1,43 @@
+import os, asyncio, asyncpg
+from dotenv import load_dotenv
+
+from services.common.teams import BUILTIN_ALIASES
+
+load_dotenv(".env.local", override=True)
+
+# Alternate team spellings used by some books -> the canonical name in odds payloads.
+# Normalization reloads this table every TEAM_ALIAS_TTL_SECONDS (or POST /admin/team-aliases/reload);
+# curate new rows from GET /admin/team-aliases/unresolved.
+SQL = """
+CREATE SCHEMA IF NOT EXISTS odds_norm;
+CREATE TABLE IF NOT EXISTS odds_norm.team_aliases (
+  sport_key  TEXT NOT NULL,
+  alias      TEXT NOT NULL,
+  canonical  TEXT NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (sport_key, alias)
+);
+"""
+
+SEED = """
+INSERT INTO odds_norm.team_aliases (sport_key, alias, canonical)
+VALUES ($1, $2, $3)
+ON CONFLICT (sport_key, alias) DO NOTHING
+"""
+
+async def main():
+    db = os.getenv("DATABASE_URL")
+    if not db:
+        raise SystemExit("DATABASE_URL missing")
+    conn = await asyncpg.connect(db)
+    try:
+        await conn.execute(SQL)
+        rows = [(s, a, c) for s, m in BUILTIN_ALIASES.items() for a, c in m.items()]
+        await conn.executemany(SEED, rows)
+        n = await conn.fetchval("SELECT count(*) FROM odds_norm.team_aliases")
+        print(f"odds_norm.team_aliases ready ({n} aliases)")
+    finally:
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,312 @@
+# services/db/odds_partitions.py
+# odds_norm.odds range-partitioned by the game's commence_time, one partition per UTC month
+#   python -m services.db.odds_partitions --migrate     # one-off: rebuild odds_norm.odds as a partitioned table
+#   python -m services.db.odds_partitions               # maintenance (run daily): create, fill and retire partitions
+#   python -m services.db.odds_partitions --drop        # retire by dropping instead of moving to odds_archive
+#   python -m services.db.odds_partitions --list
+# - Every row carries its game's commence_time (normalize writes it; a trigger on odds_norm.games moves a
+#   game's rows when it is rescheduled), so a game's whole history sits in one partition. Reads that pin
+#   commence_time (line history, closing odds) touch one partition; upcoming games are in the current
+#   and next months' partitions, and finished months are never written again
+# - Maintenance keeps ODDS_PARTITIONS_AHEAD months past the current one created. Rows for a month
+#   without a partition (or without a commence_time) land in odds_default; the next run moves them into
+#   their month's new partition
+# - The series key includes commence_time, and NULLs never conflict, so odds_default also carries a
+#   unique (game_uid, market_key, book_key, side, last_update) key over its NULL-commence_time rows;
+#   normalize's untargeted ON CONFLICT DO NOTHING uses it. Maintenance adds it to tables migrated
+#   before it existed (dropping duplicate rows first)
+# - Deploy order: run --migrate before the apps that write commence_time (portfolio normalize, core
+#   line history); until then normalize and line history answer 503
+# - Months older than ODDS_PARTITIONS_KEEP_MONTHS are detached and moved to schema odds_archive (still
+#   queryable, out of every odds_norm.odds plan), or dropped with --drop. Their odds_latest rows go too.
+
+import os, sys, json, asyncio, argparse
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+import asyncpg
+from dotenv import load_dotenv
+
+from services.db.create_odds_intervals import VIEW_SQL
+from services.ingestor.audit_compat import log_audit_compat
+
+load_dotenv(".env.local", override=True)
+DATABASE_URL = os.getenv("DATABASE_URL")
+AHEAD_MONTHS = int(os.getenv("ODDS_PARTITIONS_AHEAD", "3"))
+KEEP_MONTHS = int(os.getenv("ODDS_PARTITIONS_KEEP_MONTHS", "12"))
+LOCK_TIMEOUT = os.getenv("ODDS_PARTITIONS_LOCK_TIMEOUT", "5s")  # never queue normalize behind maintenance
+
+ARCHIVE_SCHEMA = "odds_archive"
+DEFAULT_PARTITION = "odds_default"
+
+IS_PARTITIONED_SQL = "SELECT relkind = 'p' FROM pg_class WHERE oid = 'odds_norm.odds'::regclass"
+
+PARTITIONS_SQL = """
+SELECT c.relname AS name, c.reltuples::int8 AS rows_estimate, pg_total_relation_size(c.oid) AS bytes
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'odds_norm.odds'::regclass
+ORDER BY c.relname
+"""
+
+# --migrate: the old heap becomes odds_unpartitioned, its rows are copied in with their game's
+# commence_time, then it is dropped (the id sequence is handed over first)
+MIGRATE_SQL = """
+DROP VIEW IF EXISTS odds_norm.v_odds_intervals;
+ALTER TABLE odds_norm.odds RENAME TO odds_unpartitioned;
+
+CREATE TABLE odds_norm.odds (
+  LIKE odds_norm.odds_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+  commence_time TIMESTAMPTZ
+) PARTITION BY RANGE (commence_time);
+
+-- unique keys of a partitioned table must contain the partition key
+ALTER TABLE odds_norm.odds
+  ADD CONSTRAINT odds_series_key UNIQUE (game_uid, market_key, book_key, side, last_update, commence_time);
+CREATE INDEX odds_id_idx ON odds_norm.odds (id);
+
+CREATE TABLE odds_norm.odds_default PARTITION OF odds_norm.odds DEFAULT;
+"""
+
+NULL_KEY_INDEX = "odds_default_null_commence_key"
+
+NULL_KEY_SQL = f"""
+CREATE UNIQUE INDEX IF NOT EXISTS {NULL_KEY_INDEX} ON odds_norm.{DEFAULT_PARTITION}
+  (game_uid, market_key, book_key, side, last_update) WHERE commence_time IS NULL
+"""
+
+# duplicates written while NULL commence_times could not conflict; keeps the first row of each
+NULL_DEDUP_SQL = f"""
+DELETE FROM odds_norm.{DEFAULT_PARTITION} d
+USING odds_norm.{DEFAULT_PARTITION} k
+WHERE d.commence_time IS NULL AND k.commence_time IS NULL
+  AND (d.game_uid, d.market_key, d.book_key, d.side, d.last_update)
+    = (k.game_uid, k.market_key, k.book_key, k.side, k.last_update)
+  AND d.id > k.id
+"""
+
+COPY_SQL = """
+INSERT INTO odds_norm.odds
+SELECT o.*, g.commence_time
+FROM odds_norm.odds_unpartitioned o
+LEFT JOIN odds_norm.games g ON g.game_uid = o.game_uid
+"""
+
+MIGRATE_DONE_SQL = """
+ALTER SEQUENCE odds_norm.odds_id_seq OWNED BY odds_norm.odds.id;
+DROP TABLE odds_norm.odds_unpartitioned;
+"""
+
+# a rescheduled game takes its odds rows along (into another partition when the month changes)
+TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION odds_norm.odds_follow_commence() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF OLD.commence_time IS NULL THEN
+    UPDATE odds_norm.odds SET commence_time = NEW.commence_time
+    WHERE game_uid = NEW.game_uid AND commence_time IS NULL;
+  ELSE
+    UPDATE odds_norm.odds SET commence_time = NEW.commence_time
+    WHERE game_uid = NEW.game_uid AND commence_time = OLD.commence_time;
+  END IF;
+  RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS odds_follow_commence ON odds_norm.games;
+CREATE TRIGGER odds_follow_commence
+  AFTER UPDATE OF commence_time ON odds_norm.games
+  FOR EACH ROW WHEN (OLD.commence_time IS DISTINCT FROM NEW.commence_time)
+  EXECUTE FUNCTION odds_norm.odds_follow_commence();
+"""
+
+DEFAULT_MONTHS_SQL = f"""
+SELECT DISTINCT date_trunc('month', commence_time AT TIME ZONE 'UTC')::date AS month
+FROM odds_norm.{DEFAULT_PARTITION}
+WHERE commence_time IS NOT NULL
+ORDER BY 1
+"""
+
+MIGRATE_MONTHS_SQL = """
+SELECT DISTINCT date_trunc('month', commence_time AT TIME ZONE 'UTC')::date AS month
+FROM odds_norm.games
+WHERE commence_time IS NOT NULL
+ORDER BY 1
+"""
+
+RETIRE_LATEST_SQL = """
+DELETE FROM odds_norm.odds_latest l
+USING odds_norm.games g
+WHERE l.game_uid = g.game_uid AND g.commence_time >= $1 AND g.commence_time < $2
+"""
+
+
+def add_months(m: date, n: int) -> date:
+    k = m.year * 12 + m.month - 1 + n
+    return date(k // 12, k % 12 + 1, 1)
+
+
+def partition_name(m: date) -> str:
+    return f"odds_y{m.year}m{m.month:02d}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """Month of a partition named by partition_name(); None for the default (or foreign) partitions."""
+    try:
+        return date(int(name[6:10]), int(name[11:13]), 1) if name.startswith("odds_y") and name[10] == "m" else None
+    except (ValueError, IndexError):
+        return None
+
+
+def _bounds(m: date):
+    lo = datetime(m.year, m.month, 1, tzinfo=timezone.utc)
+    nxt = add_months(m, 1)
+    return lo, datetime(nxt.year, nxt.month, 1, tzinfo=timezone.utc)
+
+
+async def is_partitioned(conn: asyncpg.Connection) -> bool:
+    return bool(await conn.fetchval(IS_PARTITIONED_SQL))
+
+
+async def partitions(conn: asyncpg.Connection) -> List[dict]:
+    return [dict(r) for r in await conn.fetch(PARTITIONS_SQL)]
+
+
+async def create_partition(conn: asyncpg.Connection, m: date) -> dict:
+    """Create one month's partition; rows already parked in odds_default for that month are moved in."""
+    name = partition_name(m)
+    lo, hi = _bounds(m)
+    bound = f"FROM ('{lo.isoformat()}') TO ('{hi.isoformat()}')"
+    async with conn.transaction():
+        parked = await conn.fetchval(
+            f"SELECT count(*) FROM odds_norm.{DEFAULT_PARTITION} WHERE commence_time >= $1 AND commence_time < $2", lo, hi
+        )
+        if not parked:
+            await conn.execute(f"CREATE TABLE odds_norm.{name} PARTITION OF odds_norm.odds FOR VALUES {bound}")
+        else:
+            # ATTACH validates that odds_default holds nothing in the range, so empty it first
+            await conn.execute(
+                f"CREATE TABLE odds_norm.{name} (LIKE odds_norm.odds INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+            )
+            await conn.execute(
+                f"""WITH moved AS (
+                      DELETE FROM odds_norm.{DEFAULT_PARTITION}
+                      WHERE commence_time >= $1 AND commence_time < $2
+                      RETURNING *
+                    )
+                    INSERT INTO odds_norm.{name} SELECT * FROM moved""",
+                lo, hi,
+            )
+            await conn.execute(f"ALTER TABLE odds_norm.odds ATTACH PARTITION odds_norm.{name} FOR VALUES {bound}")
+    return {"partition": name, "created": True, "moved_from_default": int(parked)}
+
+
+async def retire_partition(conn: asyncpg.Connection, m: date, drop: bool) -> dict:
+    name = partition_name(m)
+    lo, hi = _bounds(m)
+    async with conn.transaction():
+        rows = await conn.fetchval(f"SELECT count(*) FROM odds_norm.{name}")
+        await conn.execute(f"ALTER TABLE odds_norm.odds DETACH PARTITION odds_norm.{name}")
+        latest = await conn.execute(RETIRE_LATEST_SQL, lo, hi)
+        if drop:
+            await conn.execute(f"DROP TABLE odds_norm.{name}")
+        else:
+            await conn.execute(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}")
+            await conn.execute(f"ALTER TABLE odds_norm.{name} SET SCHEMA {ARCHIVE_SCHEMA}")
+        await log_audit_compat(conn, "odds_partition_retire", {
+            "partition": name, "rows": rows, "dropped": drop, "odds_latest_deleted": int(latest.split()[-1]),
+        })
+    return {"partition": name, "retired": "dropped" if drop else f"{ARCHIVE_SCHEMA}.{name}", "rows": rows}
+
+
+async def ensure_null_key(conn: asyncpg.Connection) -> int:
+    """Add odds_default's NULL-commence_time key if missing; returns the duplicate rows it dropped."""
+    if await conn.fetchval("SELECT to_regclass($1)", f"odds_norm.{NULL_KEY_INDEX}"):
+        return 0
+    async with conn.transaction():
+        deleted = await conn.execute(NULL_DEDUP_SQL)
+        await conn.execute(NULL_KEY_SQL)
+    return int(deleted.split()[-1])
+
+
+async def maintain(
+    conn: asyncpg.Connection,
+    ahead: int = AHEAD_MONTHS,
+    keep: int = KEEP_MONTHS,
+    drop: bool = False,
+    today: Optional[date] = None,
+) -> dict:
+    """Create partitions through `ahead` months past the current one (and for any month parked in
+    odds_default), then retire those that ended more than `keep` months ago. Idempotent."""
+    current = (today or datetime.now(timezone.utc).date()).replace(day=1)
+    cutoff = add_months(current, -keep)
+    await conn.execute(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+    have = {partition_month(p["name"]) for p in await partitions(conn)}
+    wanted = {add_months(current, i) for i in range(ahead + 1)}
+    wanted |= {r["month"] for r in await conn.fetch(DEFAULT_MONTHS_SQL) if r["month"] >= cutoff}
+    null_dupes = await ensure_null_key(conn)
+    created = [await create_partition(conn, m) for m in sorted(wanted - have)]
+    retired = [await retire_partition(conn, m, drop) for m in sorted(m for m in have if m and m < cutoff)]
+    return {
+        "created": created,
+        "retired": retired,
+        "null_commence_duplicates_deleted": null_dupes,
+        "partitions": await partitions(conn),
+    }
+
+
+async def migrate(conn: asyncpg.Connection, ahead: int = AHEAD_MONTHS) -> dict:
+    """Rebuild the plain odds_norm.odds heap as a partitioned table (one transaction; blocks writers)."""
+    if await is_partitioned(conn):
+        return {"migrated": False, "reason": "odds_norm.odds is already partitioned"}
+    current = datetime.now(timezone.utc).date().replace(day=1)
+    async with conn.transaction():
+        await conn.execute("LOCK TABLE odds_norm.odds IN ACCESS EXCLUSIVE MODE")
+        await conn.execute(MIGRATE_SQL)
+        await conn.execute(NULL_KEY_SQL)
+        months = {r["month"] for r in await conn.fetch(MIGRATE_MONTHS_SQL)}
+        months |= {add_months(current, i) for i in range(ahead + 1)}
+        for m in sorted(months):
+            lo, hi = _bounds(m)
+            await conn.execute(
+                f"CREATE TABLE odds_norm.{partition_name(m)} PARTITION OF odds_norm.odds "
+                f"FOR VALUES FROM ('{lo.isoformat()}') TO ('{hi.isoformat()}')"
+            )
+        copied = await conn.execute(COPY_SQL)
+        await conn.execute(MIGRATE_DONE_SQL)
+        await conn.execute(TRIGGER_SQL)
+        await conn.execute(VIEW_SQL)  # v_odds_intervals depended on the old table
+    await conn.execute("ANALYZE odds_norm.odds")
+    return {"migrated": True, "rows": int(copied.split()[-1]), "partitions": await partitions(conn)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Partition odds_norm.odds by commence month and maintain the partitions.")
+    parser.add_argument("--migrate", action="store_true", help="convert the plain table (once), then exit")
+    parser.add_argument("--ahead", type=int, default=AHEAD_MONTHS, help="months past the current one to create")
+    parser.add_argument("--keep", type=int, default=KEEP_MONTHS, help="months of finished partitions to keep attached")
+    parser.add_argument("--drop", action="store_true", help=f"drop retired partitions instead of moving them to {ARCHIVE_SCHEMA}")
+    parser.add_argument("--list", action="store_true", help="only list partitions")
+    args = parser.parse_args()
+
+    if not DATABASE_URL:
+        print("DATABASE_URL missing", file=sys.stderr)
+        sys.exit(2)
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        if args.migrate:
+            out = await migrate(conn, args.ahead)
+        elif not await is_partitioned(conn):
+            print("odds_norm.odds is not partitioned yet; run with --migrate first", file=sys.stderr)
+            sys.exit(2)
+        elif args.list:
+            out = {"partitions": await partitions(conn)}
+        else:
+            out = await maintain(conn, args.ahead, args.keep, args.drop)
+    finally:
+        await conn.close()
+    print(json.dumps(out, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,53 +1,90 @@
+import asyncio
 import os
-from fastapi import FastAPI, HTTPException
-import psycopg, httpx
+from typing import Optional
+from fastapi import Depends, FastAPI, HTTPException, Query
+import psycopg
+
+from services.common.auth import require_admin_token
+from services.common.health import HealthProber
+from services.common.metrics import install_metrics
+from services.common.querylog import install_slow_query_log
+from services.common.service_client import CircuitBreaker, CircuitOpenError, ServiceClient
+from services.gsa_coach.summary import SummaryBuilder
 
 APP_NAME = "gsa_coach"
 DB_URL   = os.getenv("DATABASE_URL")
 CORE_URL = os.getenv("CORE_URL")  # e.g., https://gsa-core.onrender.com
 
 app = FastAPI(title="GoSignals Coach", version="0.1.0")
+install_metrics(app)
+# SQL text, parameters and plans: admin token only (services/common/auth.py)
+install_slow_query_log(app, dependencies=[Depends(require_admin_token)])
+
+summaries = SummaryBuilder(
+    DB_URL,
+    poll_seconds=float(os.getenv("COACH_SUMMARY_POLL_SECONDS", "30")),
+    max_age_seconds=float(os.getenv("COACH_SUMMARY_MAX_AGE_SECONDS", "300")),
+)
+
+# One keep-alive client for core; short TTL cache + breaker so a cold/slow core can't stall coach
+core = ServiceClient(
+    CORE_URL,
+    timeout=float(os.getenv("CORE_TIMEOUT_SECONDS", "5")),
+    cache_ttl=float(os.getenv("CORE_CACHE_TTL_SECONDS", "10")),
+    breaker=CircuitBreaker(failure_threshold=3, reset_timeout=float(os.getenv("CORE_BREAKER_RESET_SECONDS", "30"))),
+) if CORE_URL else None
+
+@app.on_event("startup")
+def _startup():
+    summaries.start()
+
+@app.on_event("shutdown")
+async def _shutdown():
+    await asyncio.to_thread(summaries.stop)  # joins the builder thread (up to 5 s)
+    if core:
+        await core.aclose()
 
 @app.get("/")
 def root():
     return {"service": APP_NAME, "status": "ready"}
 
-@app.get("/health")
-def health():
-    try:
-        with psycopg.connect(DB_URL, connect_timeout=3) as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT 1")
-                cur.fetchone()
-        return {"service": APP_NAME, "db": "ok"}
-    except Exception as e:
-        raise HTTPException(500, f"DB error: {e}")
+def _probe_db():
+    with psycopg.connect(DB_URL, connect_timeout=3) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            cur.fetchone()
+
+# /health and /ready answer from the cached result of a background probe (one connection per interval)
+health = HealthProber(APP_NAME, interval=float(os.getenv("HEALTH_INTERVAL_SECONDS", "15")))
+health.add_probe("db", _probe_db)
+health.install(app)
 
 @app.get("/coach/summary")
-def summary():
-    try:
-        with psycopg.connect(DB_URL) as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT
-                      (SELECT COUNT(*) FROM games)   AS games,
-                      (SELECT COUNT(*) FROM markets) AS markets,
-                      (SELECT COUNT(*) FROM odds)    AS odds,
-                      (SELECT COUNT(*) FROM picks)   AS picks
-                """)
-                g, m, o, p = cur.fetchone()
-        note = "System initialized. Ingest data to see recommendations." if (o == 0 and p == 0) else "Data present."
-        return {"games": int(g), "markets": int(m), "odds": int(o), "picks": int(p), "note": note}
-    except Exception as e:
-        raise HTTPException(500, f"summary error: {e}")
+def summary(
+    league: Optional[str] = Query(None, description="e.g., americanfootball_nfl; all leagues when omitted"),
+    limit: int = Query(20, ge=1, le=50),
+):
+    # Served from the precomputed snapshot; only a cold start (no snapshot yet) builds inline
+    if not summaries.ready:
+        try:
+            summaries.refresh()
+        except Exception as e:
+            raise HTTPException(500, f"summary error: {e}")
+    out = summaries.get(league, limit)
+    t = out["totals"]
+    out["note"] = "System initialized. Ingest data to see recommendations." if (t.get("odds") == 0 and t.get("picks") == 0) else "Data present."
+    if summaries.last_error:
+        out["stale"] = summaries.last_error
+    return out
 
 @app.get("/coach/ping-core")
-def ping_core():
-    if not CORE_URL:
+async def ping_core():
+    if not core:
         return {"core": "not_configured"}
     try:
-        r = httpx.get(CORE_URL.rstrip('/') + "/core/metrics", timeout=15)
-        r.raise_for_status()
-        return {"core": "ok", "metrics": r.json()}
+        res = await core.get_json("/core/metrics")
+    except CircuitOpenError as e:
+        raise HTTPException(503, f"core unavailable: {e}")
     except Exception as e:
         raise HTTPException(502, f"core call failed: {e}")
+    return {"core": "stale" if res.stale else "ok", "cached": res.cached, "metrics": res.data}
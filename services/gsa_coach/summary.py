@@ -0,0 +1,224 @@
+# services/gsa_coach/summary.py
+# Precomputed /coach/summary snapshots.
+# - One background thread polls a cheap watermark (table write stats) and rebuilds only when new data lands
+# - Snapshots are kept per league in memory; the endpoint never touches the DB on the hot path
+# - A max age forces a rebuild so "upcoming" stays correct even when ingestion is idle
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import psycopg
+
+from services.common.metrics import time_query, timed_connect
+from services.common.querylog import pg_execute
+
+ALL_LEAGUES = "*"
+
+# Cumulative write counters from the stats collector: no table access, changes whenever
+# ingest, normalize or pick writes land in the tables the summary reads.
+WATERMARK_SQL = """
+    SELECT COALESCE(SUM(n_tup_ins + n_tup_upd + n_tup_del), 0)
+    FROM pg_stat_user_tables
+    WHERE (schemaname, relname) IN (('public', 'odds_raw'), ('odds_norm', 'games'), ('public', 'picks'))
+"""
+
+TOTALS_SQL = """
+    SELECT
+      (SELECT COUNT(*) FROM games)   AS games,
+      (SELECT COUNT(*) FROM markets) AS markets,
+      (SELECT COUNT(*) FROM odds)    AS odds,
+      (SELECT COUNT(*) FROM picks)   AS picks
+"""
+
+GAMES_SQL = """
+    SELECT sport_key,
+           COUNT(*) AS games,
+           COUNT(*) FILTER (WHERE commence_time > now()) AS upcoming
+    FROM odds_norm.games
+    GROUP BY sport_key
+"""
+
+FRESHNESS_SQL = """
+    SELECT sport_key, MAX(fetched_at) AS last_fetched_at
+    FROM odds_raw
+    GROUP BY sport_key
+"""
+
+BEST_LINES_SQL = """
+    SELECT sport_key, away_team, home_team, commence_time_utc,
+           away_best_price, away_book, home_best_price, home_book
+    FROM v_moneyline_game_best
+    WHERE commence_time_utc > now()
+    ORDER BY sport_key, commence_time_utc, game_id
+"""
+
+
+def _fmt_price(price: Optional[int], book: Optional[str]) -> str:
+    if price is None:
+        return "n/a"
+    return f"{int(price):+d} ({book})" if book else f"{int(price):+d}"
+
+
+def _sample(r: tuple) -> Dict[str, Any]:
+    _, away, home, kick, away_price, away_book, home_price, home_book = r
+    return {
+        "matchup": f"{away} @ {home}",
+        "away_best": _fmt_price(away_price, away_book),
+        "home_best": _fmt_price(home_price, home_book),
+        "kick": kick.isoformat() if kick else None,
+    }
+
+
+def _summary_text(league: str, games: int, upcoming: int, last_fetched_at: Optional[datetime]) -> str:
+    if games == 0 and upcoming == 0:
+        return "System initialized. Ingest data to see recommendations."
+    who = "all leagues" if league == ALL_LEAGUES else league
+    fresh = f", odds as of {last_fetched_at.isoformat()}" if last_fetched_at else ""
+    return f"{upcoming} upcoming of {games} games for {who}{fresh}."
+
+
+class SummaryBuilder:
+    """Builds per-league coach summaries and keeps the latest set in memory."""
+
+    def __init__(
+        self,
+        db_url: Optional[str],
+        poll_seconds: float = 30.0,
+        max_age_seconds: float = 300.0,
+        samples_per_league: int = 50,
+    ) -> None:
+        self.db_url = db_url
+        self.poll_seconds = poll_seconds
+        self.max_age_seconds = max_age_seconds
+        self.samples_per_league = samples_per_league
+
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+        self._watermark: Optional[int] = None
+        self._built_at: float = 0.0
+        self._build_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_error: Optional[str] = None
+
+    # -- lifecycle ---------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="coach-summary", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                # keep serving the previous snapshot; surface the failure on the endpoint
+                self.last_error = str(e)
+            self._stop.wait(self.poll_seconds)
+
+    # -- building ----------------------------------------------------------------
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._snapshots)
+
+    def refresh(self, force: bool = False) -> bool:
+        """Rebuild if new odds landed or the snapshot is too old. Returns True if rebuilt."""
+        with self._build_lock:
+            with timed_connect(self.db_url, connect_timeout=5) as conn:
+                with conn.cursor() as cur:
+                    cur.execute(WATERMARK_SQL)
+                    (mark,) = cur.fetchone()
+                    stale = time.monotonic() - self._built_at > self.max_age_seconds
+                    if not force and self._snapshots and mark == self._watermark and not stale:
+                        return False
+                    with time_query("summary_build", "direct"):
+                        self._snapshots = self._build(cur)
+            self._watermark = mark
+            self._built_at = time.monotonic()
+            return True
+
+    def _build(self, cur: psycopg.Cursor) -> Dict[str, Dict[str, Any]]:
+        pg_execute(cur, "coach_totals", TOTALS_SQL)
+        g, m, o, p = cur.fetchone()
+        totals = {"games": int(g), "markets": int(m), "odds": int(o), "picks": int(p)}
+
+        pg_execute(cur, "coach_games", GAMES_SQL)
+        games = {r[0]: (int(r[1]), int(r[2])) for r in cur.fetchall()}
+
+        pg_execute(cur, "coach_freshness", FRESHNESS_SQL)
+        fresh = {r[0]: r[1] for r in cur.fetchall()}
+
+        pg_execute(cur, "coach_best_lines", BEST_LINES_SQL)
+        samples: Dict[str, List[Dict[str, Any]]] = {}
+        all_samples: List[Dict[str, Any]] = []
+        for r in cur.fetchall():
+            bucket = samples.setdefault(r[0], [])
+            if len(bucket) < self.samples_per_league:
+                s = _sample(r)
+                bucket.append(s)
+                all_samples.append(s)
+
+        as_of = datetime.now(timezone.utc).isoformat()
+        snapshots: Dict[str, Dict[str, Any]] = {}
+        for league in set(games) | set(fresh) | set(samples):
+            n_games, n_upcoming = games.get(league, (0, 0))
+            last = fresh.get(league)
+            snapshots[league] = {
+                "league": league,
+                "games": n_games,
+                "upcoming": n_upcoming,
+                "last_fetched_at": last.isoformat() if last else None,
+                "summary": _summary_text(league, n_games, n_upcoming, last),
+                "samples": samples.get(league, []),
+                "as_of": as_of,
+            }
+
+        n_games = sum(v[0] for v in games.values())
+        n_upcoming = sum(v[1] for v in games.values())
+        last = max(fresh.values()) if fresh else None
+        all_samples.sort(key=lambda s: s["kick"] or "")
+        snapshots[ALL_LEAGUES] = {
+            "league": None,
+            "games": n_games,
+            "upcoming": n_upcoming,
+            "last_fetched_at": last.isoformat() if last else None,
+            "summary": _summary_text(ALL_LEAGUES, n_games, n_upcoming, last),
+            "samples": all_samples[: self.samples_per_league],
+            "as_of": as_of,
+            "totals": totals,
+        }
+        return snapshots
+
+    # -- reads -------------------------------------------------------------------
+
+    def get(self, league: Optional[str], limit: int) -> Dict[str, Any]:
+        """Return the snapshot for a league (or all leagues), trimmed to `limit` samples."""
+        snaps = self._snapshots  # swap-on-build, so a plain read is consistent
+        key = league or ALL_LEAGUES
+        snap = snaps.get(key)
+        if snap is None:
+            snap = {
+                "league": league,
+                "games": 0,
+                "upcoming": 0,
+                "last_fetched_at": None,
+                "summary": f"No data for {league}.",
+                "samples": [],
+                "as_of": snaps.get(ALL_LEAGUES, {}).get("as_of"),
+            }
+        out = dict(snap, samples=snap["samples"][:limit])
+        out["totals"] = snaps.get(ALL_LEAGUES, {}).get("totals", {})
+        return out
@@ -1,14 +1,19 @@
 import os, re
-from typing import Optional, List
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field, validator
+from typing import List
+from fastapi import FastAPI
+from pydantic import BaseModel, Field
 import psycopg
 from psycopg.types.json import Json
 
+from services.common.health import HealthProber
+from services.common.metrics import install_metrics, time_query, timed_connect
+from services.common.picks import PickIn
+
 APP_NAME = "gsa_compliance"
 DB_URL   = os.getenv("DATABASE_URL")
 
 app = FastAPI(title="GoSignals Compliance", version="0.1.0")
+install_metrics(app)
 
 # --------- Models ----------
 class SanitizeIn(BaseModel):
@@ -22,57 +27,21 @@ BAD_PATTERNS = [
 ]
 REDACT = "[REDACTED]"
 
-class PickIn(BaseModel):
-    game_id: Optional[int] = None
-    league: Optional[str] = None
-    market_key: str
-    outcome: str
-    price: float
-    point: Optional[float] = None
-    stake: float = 0.0
-
-    @validator("market_key")
-    def check_market(cls, v):
-        allowed = {"h2h","spreads","totals"}
-        if v not in allowed:
-            raise ValueError(f"market_key must be one of {sorted(allowed)}")
-        return v
-
-    @validator("outcome")
-    def check_outcome(cls, v):
-        allowed = {"home","away","draw","over","under"}
-        if v not in allowed:
-            raise ValueError(f"outcome must be one of {sorted(allowed)}")
-        return v
-
-    @validator("stake")
-    def non_negative_stake(cls, v):
-        if v < 0:
-            raise ValueError("stake must be >= 0")
-        return v
-
-    @validator("price")
-    def realistic_price(cls, v):
-        # Allow common American odds range
-        if v == 0 or v < -2000 or v > 2000:
-            raise ValueError("price must be within -2000..2000 and non-zero")
-        return v
-
 # --------- Routes ----------
 @app.get("/")
 def root():
     return {"service": APP_NAME, "status": "ready"}
 
-@app.get("/health")
-def health():
-    try:
-        with psycopg.connect(DB_URL, connect_timeout=3) as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT 1")
-                cur.fetchone()
-        return {"service": APP_NAME, "db": "ok"}
-    except Exception as e:
-        raise HTTPException(500, f"DB error: {e}")
+def _probe_db():
+    with psycopg.connect(DB_URL, connect_timeout=3) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            cur.fetchone()
+
+# /health and /ready answer from the cached result of a background probe (one connection per interval)
+health = HealthProber(APP_NAME, interval=float(os.getenv("HEALTH_INTERVAL_SECONDS", "15")))
+health.add_probe("db", _probe_db)
+health.install(app)
 
 @app.post("/compliance/sanitize")
 def sanitize(payload: SanitizeIn):
@@ -81,8 +50,8 @@ def sanitize(payload: SanitizeIn):
         redacted = re.sub(pat, REDACT, redacted, flags=re.IGNORECASE)
     # audit log
     try:
-        with psycopg.connect(DB_URL) as conn:
-            with conn.cursor() as cur:
+        with timed_connect(DB_URL) as conn:
+            with conn.cursor() as cur, time_query("audit_insert", "direct"):
                 cur.execute(
                     "INSERT INTO audit_logs (module, event, detail) VALUES (%s, %s, %s)",
                     ("compliance", "sanitize", Json({"len_in": len(payload.text), "len_out": len(redacted)})),
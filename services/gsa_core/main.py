@@ -1,33 +1,41 @@
 ﻿import os
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException
 import psycopg
 
+from services.common.auth import require_admin_token
+from services.common.health import HealthProber
+from services.common.metrics import install_metrics, timed_connect
+from services.common.querylog import install_slow_query_log, pg_execute
+
 APP_NAME = "gsa_core"
 DB_URL = os.getenv("DATABASE_URL")
 
 app = FastAPI(title="GoSignals Core", version="0.1.0")
+install_metrics(app)
+# SQL text, parameters and plans: admin token only (services/common/auth.py)
+install_slow_query_log(app, dependencies=[Depends(require_admin_token)])
 
 @app.get("/")
 def root():
     return {"service": APP_NAME, "status": "ready"}
 
-@app.get("/health")
-def health():
-    try:
-        with psycopg.connect(DB_URL, connect_timeout=3) as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT 1")
-                cur.fetchone()
-        return {"service": APP_NAME, "db": "ok"}
-    except Exception as e:
-        raise HTTPException(500, f"DB error: {e}")
+def _probe_db():
+    with psycopg.connect(DB_URL, connect_timeout=3) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            cur.fetchone()
+
+# /health and /ready answer from the cached result of a background probe (one connection per interval)
+health = HealthProber(APP_NAME, interval=float(os.getenv("HEALTH_INTERVAL_SECONDS", "15")))
+health.add_probe("db", _probe_db)
+health.install(app)
 
 @app.get("/core/metrics")
 def metrics():
     try:
-        with psycopg.connect(DB_URL) as conn:
+        with timed_connect(DB_URL) as conn:
             with conn.cursor() as cur:
-                cur.execute("""
+                pg_execute(cur, "table_counts", """
                     SELECT
                       (SELECT COUNT(*) FROM games)   AS games,
                       (SELECT COUNT(*) FROM markets) AS markets,
@@ -42,9 +50,9 @@ def metrics():
 @app.get("/core/sample-picks")
 def sample_picks(limit: int = 5):
     try:
-        with psycopg.connect(DB_URL) as conn:
+        with timed_connect(DB_URL) as conn:
             with conn.cursor() as cur:
-                cur.execute("""
+                pg_execute(cur, "sample_picks", """
                   SELECT g.league, g.home_team, g.away_team,
                          m.market_key, o.outcome, o.price, o.point, o.fetched_at
                   FROM v_latest_odds o
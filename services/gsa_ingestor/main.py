@@ -1,52 +1,108 @@
 ﻿import os
+from typing import Optional
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+import asyncpg
 import httpx
 import psycopg
 from psycopg.types.json import Json
 
+from services.common.health import HealthProber
+from services.common.metrics import install_metrics, time_query, timed_connect
+from services.common.odds_api import OddsApiError, get_client
+from services.common.sports_catalog import discover, ensure_schema as ensure_catalog, sync_catalog
+
 APP_NAME = "gsa_ingestor"
 ODDS_API_KEY = os.getenv("ODDS_API_KEY")
 DB_URL = os.getenv("DATABASE_URL")
+ODDS_API_BASE_URL = os.getenv("ODDS_API_BASE_URL", "https://api.the-odds-api.com").rstrip("/")
 
 app = FastAPI(title="GoSignals Ingestor", version="0.1.0")
+install_metrics(app)
+
+@app.on_event("shutdown")
+async def shutdown():
+    await get_client(ODDS_API_KEY, ODDS_API_BASE_URL).aclose()
 
 @app.get("/")
 def root():
     return {"service": APP_NAME, "status": "ready"}
 
-@app.get("/health")
-def health():
-    try:
-        with psycopg.connect(DB_URL, connect_timeout=3) as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT 1")
-                cur.fetchone()
-        return {"service": APP_NAME, "db": "ok"}
-    except Exception as e:
-        raise HTTPException(500, f"DB error: {e}")
+def _probe_db():
+    with psycopg.connect(DB_URL, connect_timeout=3) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            cur.fetchone()
+
+async def _probe_odds_api():
+    # /v4/sports does not count against the Odds API quota; within the catalog TTL this is a disk read
+    if not ODDS_API_KEY:
+        raise RuntimeError("ODDS_API_KEY not set")
+    client = get_client(ODDS_API_KEY, ODDS_API_BASE_URL)
+    res = await client.sports()
+    led = await run_in_threadpool(client.ledger.status)
+    return {"remaining": led.get("remaining"), "used": led.get("used"), "cached": res.cached}
+
+# /health and /ready answer from the cached result of a background probe (one connection per interval)
+health = HealthProber(APP_NAME, interval=float(os.getenv("HEALTH_INTERVAL_SECONDS", "15")))
+health.add_probe("db", _probe_db)
+health.add_probe("odds_api", _probe_odds_api, interval=300, critical=False)
+health.install(app)
+
+def _audit_sports_fetch(summary: dict):
+    with timed_connect(DB_URL) as conn:
+        with conn.cursor() as cur, time_query("audit_insert", "direct"):
+            cur.execute(
+                "INSERT INTO audit_logs (module, event, detail) VALUES (%s, %s, %s)",
+                ("ingestor", "sports_fetch", Json(summary)),
+            )
+        conn.commit()
+
+async def _catalog_conn() -> asyncpg.Connection:
+    conn = await asyncpg.connect(DB_URL)
+    await ensure_catalog(conn)
+    return conn
 
 @app.get("/ingest/sports")
-def ingest_sports(dry_run: int = 1):
+async def ingest_sports(dry_run: int = 1):
+    """Fetch /v4/sports?all=true, diff it against sports_catalog and (dry_run=0) store it."""
     if not ODDS_API_KEY:
         raise HTTPException(500, "ODDS_API_KEY not set")
-    url = f"https://api.the-odds-api.com/v4/sports?all=true&apiKey={ODDS_API_KEY}"
     try:
-        r = httpx.get(url, timeout=15)
-        r.raise_for_status()
-        data = r.json()
-    except Exception as e:
+        conn = await _catalog_conn()
+        try:
+            res = await sync_catalog(conn, get_client(ODDS_API_KEY, ODDS_API_BASE_URL), store=dry_run == 0)
+        finally:
+            await conn.close()
+        res.pop("sports")
+        # Optional DB write (audit)
+        if dry_run == 0:
+            await run_in_threadpool(_audit_sports_fetch, {"count": res["fetched"], "changes": res["changes"]})
+        return {**res, "dry_run": bool(dry_run)}
+    except (OddsApiError, httpx.HTTPError) as e:
         raise HTTPException(502, f"Odds API error: {e}")
+    except (asyncpg.PostgresError, asyncpg.InterfaceError, psycopg.Error, OSError) as e:
+        # catalog read (and, with dry_run=0, the catalog/audit writes); anything else is a bug and surfaces as-is
+        raise HTTPException(500, f"DB error: {e}")
 
-    # Optional DB write (audit)
+@app.get("/ingest/discover")
+async def ingest_discover(groups: Optional[str] = None, include_outrights: int = 0, dry_run: int = 1):
+    """Sports worth an /odds call: active, with events in the next DISCOVER_HORIZON_HOURS."""
+    if not ODDS_API_KEY:
+        raise HTTPException(500, "ODDS_API_KEY not set")
+    conn = await _catalog_conn()
     try:
-        if dry_run == 0:
-            with psycopg.connect(DB_URL) as conn:
-                with conn.cursor() as cur:
-                    cur.execute(
-                        "INSERT INTO audit_logs (module, event, detail) VALUES (%s, %s, %s)",
-                        ("ingestor", "sports_fetch", Json({"count": len(data)})),
-                    )
-                conn.commit()
-        return {"fetched": len(data), "dry_run": bool(dry_run)}
-    except Exception as e:
-        raise HTTPException(500, f"DB write error: {e}")
+        return await discover(
+            conn, get_client(ODDS_API_KEY, ODDS_API_BASE_URL),
+            groups=groups.split(",") if groups else None,
+            include_outrights=bool(include_outrights), store=dry_run == 0,
+        )
+    except (OddsApiError, httpx.HTTPError) as e:
+        raise HTTPException(502, f"Odds API error: {e}")
+    finally:
+        await conn.close()
+
+@app.get("/odds_api/quota")
+def odds_api_quota():
+    """Quota ledger (remaining/used from the latest response, per-endpoint calls and cache hits)."""
+    return get_client(ODDS_API_KEY, ODDS_API_BASE_URL).status()
@@ -2,14 +2,16 @@
 # FastAPI app for GSA Portfolio (admin endpoints + normalization)
 # - Auth via 64-char token in "Authorization: Bearer <TOKEN>" or "x-gsa-token"
 # - DB via psycopg async pool using DATABASE_URL
-# - Fixed source SELECT using DISTINCT ON (..., fetched_at DESC)
+# - normalize reads odds_raw snapshots oldest first, one per (game_id, sport_key, payload_hash), starting
+#   after the stored cursor (services/common/odds_source.py)
 
 from __future__ import annotations
 
 import os
 import json
 import hashlib
-from typing import Any, Dict, List, Optional
+from contextlib import nullcontext
+from typing import Any, Dict, Optional
 
 from fastapi import FastAPI, APIRouter, Depends, Header, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
@@ -17,7 +19,20 @@ from pydantic import BaseModel
 
 import psycopg
 from psycopg.rows import dict_row
-from psycopg_pool import AsyncConnectionPool
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+from services.common.clv import install_clv
+from services.common.health import HealthProber, psycopg_pool_stats
+from services.common.metrics import install_metrics, timed_connection
+from services.common.odds_changes import LastKnown
+from services.common.odds_source import (
+    CHUNK_ROWS, PROJECTION_DEFAULT, STREAM_DEFAULT, SourceCursor, batches, open_source,
+)
+from services.common.portfolio_ledger import install_portfolio_ledger
+from services.common.querylog import install_slow_query_log, pg_execute_async
+from services.common.risk_sim import install_risk_sim, shutdown_pool
+from services.common.statements import POOL_WARM_SIZE, POOL_WARM_TIMEOUT, StatementRegistry
+from services.common.teams import TeamResolver, install_team_alias_admin
 
 # --------------------------------------------------------------------------------------
 # Config
@@ -30,16 +45,66 @@ if not DATABASE_URL:
 ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN") or os.environ.get("TOKEN")
 ADMIN_LEN_EXPECTED = 64
 
+# Hot statements: counts and normalize upserts (services/common/statements.py)
+STATEMENTS = StatementRegistry()
+
+RAW_COUNT_SQL = STATEMENTS.add("raw_counts", "select count(*) from public.odds_raw;")
+NORM_COUNT_SQL = {
+    "games": STATEMENTS.add("norm_counts_games", "select count(*) from odds_norm.games;"),
+    "markets": STATEMENTS.add("norm_counts_markets", "select count(*) from odds_norm.markets;"),
+    "odds": STATEMENTS.add("norm_counts_odds", "select count(*) from odds_norm.odds;"),
+}
+
+GAME_UPSERT_SQL = STATEMENTS.add("game_upsert", """
+INSERT INTO odds_norm.games (game_uid, sport_key, game_id, home_team, away_team, commence_time)
+VALUES (%(game_uid)s, %(sport_key)s, %(game_id)s, %(home_team)s, %(away_team)s, %(commence_time)s)
+ON CONFLICT (game_uid) DO UPDATE
+  SET home_team = EXCLUDED.home_team,
+      away_team = EXCLUDED.away_team,
+      commence_time = EXCLUDED.commence_time
+""")
+
+MARKET_UPSERT_SQL = STATEMENTS.add("market_upsert", """
+INSERT INTO odds_norm.markets (game_uid, market_key, book_key, last_update)
+VALUES (%(game_uid)s, %(market_key)s, %(book_key)s, %(last_update)s)
+ON CONFLICT (game_uid, market_key, book_key) DO UPDATE
+  SET last_update = GREATEST(odds_norm.markets.last_update, EXCLUDED.last_update)
+""")
+
+# commence_time is the partition key of odds_norm.odds: `python -m services.db.odds_partitions --migrate`
+# must have run before this writes (normalize answers 503 until it has). No conflict target: the
+# routed partition's unique indexes decide, so rows of games without a commence_time are deduplicated by
+# odds_default's (game_uid, market_key, book_key, side, last_update) key, where the series key cannot
+# (NULLs never conflict)
+ODDS_INSERT_SQL = STATEMENTS.add("odds_insert", """
+INSERT INTO odds_norm.odds
+    (game_uid, market_key, book_key, side, price, point, last_update, commence_time)
+VALUES
+    (%(game_uid)s, %(market_key)s, %(book_key)s, %(side)s, %(price)s, %(point)s, %(last_update)s, %(commence_time)s)
+ON CONFLICT DO NOTHING
+""")
+
+ODDS_MIGRATED_SQL = """
+SELECT 1 FROM pg_attribute
+WHERE attrelid = 'odds_norm.odds'::regclass AND attname = 'commence_time' AND NOT attisdropped
+"""
+_odds_migrated = False  # set once the check passes; the migration is one-way
+
 # Small async pool; Render free tier is modest
 pool = AsyncConnectionPool(
     conninfo=DATABASE_URL,
-    min_size=1,
+    min_size=POOL_WARM_SIZE,
+    configure=STATEMENTS.psycopg_configure,
     max_size=5,
     open=False,  # open lazily
 )
 
+# Team-name aliases for outcome -> side resolution (see services/common/teams.py)
+RESOLVER = TeamResolver()
+
 app = FastAPI(title="GSA Portfolio")
 router = APIRouter(prefix="/admin", tags=["admin"])
+install_metrics(app)
 
 
 # --------------------------------------------------------------------------------------
@@ -72,9 +137,15 @@ async def require_admin(
     raise HTTPException(status_code=401, detail="unauthorized")
 
 
-async def _ensure_pool_open() -> None:
+async def _ensure_pool_open(wait: bool = False) -> None:
     if pool.closed:
         await pool.open()
+        if wait:
+            # startup: hold until min_size (DB_POOL_WARM_SIZE) connections are connected and configured
+            try:
+                await pool.wait(timeout=POOL_WARM_TIMEOUT)
+            except PoolTimeout:
+                pass  # DB slow/unreachable: serve anyway, the pool keeps connecting in the background
 
 
 # --------------------------------------------------------------------------------------
@@ -87,38 +158,6 @@ class Counts(BaseModel):
     odds: int
 
 
-# --------------------------------------------------------------------------------------
-# Helpers
-# --------------------------------------------------------------------------------------
-
-def _safe_market_side(market_key: str, outcome_name: str, home_team: str, away_team: str) -> Optional[str]:
-    """
-    Map outcome 'name' to canonical side for each market.
-    - h2h/spreads: 'home' or 'away'
-    - totals: 'over' or 'under'
-    """
-    mk = (market_key or "").strip().lower()
-    nm = (outcome_name or "").strip().lower()
-    h = (home_team or "").strip().lower()
-    a = (away_team or "").strip().lower()
-
-    if mk in ("h2h", "spreads", "spread", "line"):
-        if nm in ("home", h):
-            return "home"
-        if nm in ("away", a):
-            return "away"
-        return None
-
-    if mk in ("totals", "total", "over_under"):
-        if nm.startswith("over"):
-            return "over"
-        if nm.startswith("under"):
-            return "under"
-        return None
-
-    return None
-
-
 # --------------------------------------------------------------------------------------
 # Admin endpoints
 # --------------------------------------------------------------------------------------
@@ -139,7 +178,7 @@ async def __debug_token(_: Request) -> Dict[str, Any]:
 @router.get("/db_info")
 async def db_info(_: str = Depends(require_admin)) -> Dict[str, Any]:
     await _ensure_pool_open()
-    async with pool.connection() as ac, ac.cursor(row_factory=dict_row) as cur:
+    async with timed_connection(pool, "portfolio") as ac, ac.cursor(row_factory=dict_row) as cur:
         await cur.execute("select current_database() as db, current_schema() as schema;")
         row = await cur.fetchone()
 
@@ -159,8 +198,8 @@ async def db_info(_: str = Depends(require_admin)) -> Dict[str, Any]:
 @router.get("/raw_counts")
 async def raw_counts(_: str = Depends(require_admin)) -> Dict[str, int]:
     await _ensure_pool_open()
-    async with pool.connection() as ac, ac.cursor() as cur:
-        await cur.execute("select count(*) from public.odds_raw;")
+    async with timed_connection(pool, "portfolio") as ac, ac.cursor() as cur:
+        await pg_execute_async(cur, "raw_counts", RAW_COUNT_SQL)
         (n,) = await cur.fetchone()
     return {"odds_raw": int(n)}
 
@@ -168,173 +207,218 @@ async def raw_counts(_: str = Depends(require_admin)) -> Dict[str, int]:
 @router.get("/norm_counts", response_model=Counts)
 async def norm_counts(_: str = Depends(require_admin)) -> Counts:
     await _ensure_pool_open()
-    async with pool.connection() as ac, ac.cursor() as cur:
-        await cur.execute("select count(*) from odds_norm.games;")
+    async with timed_connection(pool, "portfolio") as ac, ac.cursor() as cur:
+        await pg_execute_async(cur, "norm_counts_games", NORM_COUNT_SQL["games"])
         (g,) = await cur.fetchone()
-        await cur.execute("select count(*) from odds_norm.markets;")
+        await pg_execute_async(cur, "norm_counts_markets", NORM_COUNT_SQL["markets"])
         (m,) = await cur.fetchone()
-        await cur.execute("select count(*) from odds_norm.odds;")
+        await pg_execute_async(cur, "norm_counts_odds", NORM_COUNT_SQL["odds"])
         (o,) = await cur.fetchone()
     return Counts(games=int(g), markets=int(m), odds=int(o))
 
 
+async def _require_odds_migrated(ac: psycopg.AsyncConnection) -> None:
+    global _odds_migrated
+    if _odds_migrated:
+        return
+    async with ac.cursor() as cur:
+        await cur.execute(ODDS_MIGRATED_SQL)
+        _odds_migrated = await cur.fetchone() is not None
+    if not _odds_migrated:
+        raise HTTPException(
+            status_code=503,
+            detail="odds_norm.odds has no commence_time yet: run python -m services.db.odds_partitions --migrate",
+        )
+
+
 @router.post("/normalize")
 async def normalize_from_raw(
     _: str = Depends(require_admin),
     dry_run: bool = Query(True),
     limit: int = Query(200, ge=1, le=10000),
+    projection: Optional[bool] = Query(None, description="project payload fields server-side (default NORMALIZE_PROJECTION)"),
+    stream: Optional[bool] = Query(None, description="read the source in chunks via a server-side cursor (default NORMALIZE_STREAM)"),
+    chunk: int = Query(CHUNK_ROWS, ge=10, le=5000, description="rows per streamed chunk"),
+    reset_cursor: bool = Query(False, description="read every snapshot from the oldest; leaves the stored cursor alone"),
 ) -> JSONResponse:
     """
     Normalize data from public.odds_raw.payload into odds_norm.* tables.
-    - Dedup source using DISTINCT ON (game_id, sport_key, payload_hash), latest by fetched_at.
+    - Reads the oldest `limit` snapshots after the stored cursor, in fetched_at order (each
+      (game_id, sport_key, payload_hash) once); committed writes move the cursor forward.
     - Idempotent upserts with ON CONFLICT guards.
+    - Odds rows are written only when a quote's price/point changes (services/common/odds_changes.py).
+    - projection=true builds a compact payload in Postgres (only the fields read below).
+    - stream=true reads `chunk` rows at a time and commits writes per chunk (upserts are idempotent,
+      so a failed run can simply be repeated).
     - dry_run=true -> compute would-be inserts, no writes.
     """
     await _ensure_pool_open()
-
-    # 1) Source selection (fixed: DISTINCT ON + ordered by fetched_at DESC)
-    async with pool.connection() as ac, ac.cursor(row_factory=dict_row) as cur:
-        await cur.execute(
-            """
-            SELECT DISTINCT ON (game_id, sport_key, payload_hash)
-                id, sport_key, game_id, fetched_at, payload, payload_hash
-            FROM public.odds_raw
-            ORDER BY game_id, sport_key, payload_hash, fetched_at DESC
-            LIMIT %(limit)s
-            """,
-            {"limit": limit},
-        )
-        rows: List[Dict[str, Any]] = await cur.fetchall()
-
-    if not rows:
-        return JSONResponse({"ok": True, "source": {"rows": 0}, "dry_run": dry_run, "limit": limit})
+    if RESOLVER.stale():
+        async with timed_connection(pool, "portfolio") as ac:
+            await RESOLVER.refresh_async(ac)
+    if projection is None:
+        projection = PROJECTION_DEFAULT
+    if stream is None:
+        stream = STREAM_DEFAULT
 
     # Counters (we'll increment in both dry_run and write paths for visibility)
+    n_rows = 0
     ins_games = 0
     ins_markets = 0
     ins_odds = 0
-
-    async with pool.connection() as ac:
-        async with ac.cursor() as cur:
-            for r in rows:
-                sport_key: str = r["sport_key"]
-                game_id_raw: str = r["game_id"]
-                payload = r["payload"]
-                if isinstance(payload, str):
-                    payload = json.loads(payload)
-
-                gid = payload.get("id") or game_id_raw
-                home_team = (payload.get("home_team") or "").strip()
-                away_team = (payload.get("away_team") or "").strip()
-                commence_time = payload.get("commence_time")
-                game_uid = f"{sport_key}:{gid}"
-
-                # -- games
-                if dry_run:
-                    ins_games += 1
-                else:
-                    await cur.execute(
-                        """
-                        INSERT INTO odds_norm.games (game_uid, sport_key, game_id, home_team, away_team, commence_time)
-                        VALUES (%(game_uid)s, %(sport_key)s, %(game_id)s, %(home_team)s, %(away_team)s, %(commence_time)s)
-                        ON CONFLICT (game_uid) DO UPDATE
-                          SET home_team = EXCLUDED.home_team,
-                              away_team = EXCLUDED.away_team,
-                              commence_time = EXCLUDED.commence_time
-                        """,
-                        {
-                            "game_uid": game_uid,
-                            "sport_key": sport_key,
-                            "game_id": gid,
-                            "home_team": home_team,
-                            "away_team": away_team,
-                            "commence_time": commence_time,
-                        },
-                    )
-                    # rowcount isn’t reliable for upserts; we still surface totals via separate counts
-
-                # -- markets & odds
-                bookmakers = payload.get("bookmakers") or []
-                for bk in bookmakers:
-                    book_key = (bk.get("key") or "").strip()
-                    book_ts = bk.get("last_update") or bk.get("lastUpdate") or payload.get("fetched_at")
-
-                    markets = bk.get("markets") or []
-                    for mk in markets:
-                        market_key = (mk.get("key") or "").strip().lower()
-                        m_ts = mk.get("last_update") or mk.get("lastUpdate") or book_ts
-
-                        if dry_run:
-                            ins_markets += 1
-                        else:
-                            await cur.execute(
-                                """
-                                INSERT INTO odds_norm.markets (game_uid, market_key, book_key, last_update)
-                                VALUES (%(game_uid)s, %(market_key)s, %(book_key)s, %(last_update)s)
-                                ON CONFLICT (game_uid, market_key, book_key) DO UPDATE
-                                  SET last_update = GREATEST(odds_norm.markets.last_update, EXCLUDED.last_update)
-                                """,
-                                {
-                                    "game_uid": game_uid,
-                                    "market_key": market_key,
-                                    "book_key": book_key,
-                                    "last_update": m_ts,
-                                },
-                            )
-
-                        for oc in mk.get("outcomes") or []:
-                            name = oc.get("name") or ""
-                            side = _safe_market_side(market_key, name, home_team, away_team)
-                            if not side:
-                                continue
-
-                            price = oc.get("price") or oc.get("odds")
-                            point = oc.get("point")
-                            last_update = oc.get("last_update") or oc.get("lastUpdate") or m_ts
-
-                            if market_key in ("totals", "total", "over_under"):
-                                # Enforce check constraint with canonical values
-                                if side not in ("over", "under"):
-                                    continue
+    unresolved = 0
+
+    # Source rows feed the writes as they arrive; in stream mode writes are pipelined and committed per chunk
+    known = LastKnown()  # last-known quote per series: only changes are written
+    position = SourceCursor()  # where the previous run stopped (odds_norm.normalize_cursor)
+    # two pool connections: this write connection and the source stream (max_size=5)
+    async with timed_connection(pool, "portfolio") as ac:
+        if not dry_run:
+            await _require_odds_migrated(ac)
+        await position.load(ac, reset=reset_cursor)
+        async with open_source(pool, limit, projection, chunk if stream else None, position) as source, ac.cursor() as cur, (
+            ac.pipeline() if stream and not dry_run else nullcontext()
+        ):
+            async for rows in batches(source, chunk):
+                if stream and not dry_run and n_rows:
+                    await known.flush(cur)
+                    await position.save(cur)
+                    await ac.commit()
+                # stored quotes of the chunk's games, in one query on this connection
+                for r in rows:
+                    if isinstance(r["payload"], str):
+                        r["payload"] = json.loads(r["payload"])
+                await known.load(ac, (f"{r['sport_key']}:{r['payload'].get('id') or r['game_id']}" for r in rows))
+                for r in rows:
+                    n_rows += 1
+                    position.advance(r)
+                    sport_key: str = r["sport_key"]
+                    game_id_raw: str = r["game_id"]
+                    payload = r["payload"]
+
+                    gid = payload.get("id") or game_id_raw
+                    home_team = (payload.get("home_team") or "").strip()
+                    away_team = (payload.get("away_team") or "").strip()
+                    commence_time = payload.get("commence_time")
+                    game_uid = f"{sport_key}:{gid}"
+                    sides = RESOLVER.game(sport_key, game_uid, home_team, away_team)
+
+                    # -- games
+                    if dry_run:
+                        ins_games += 1
+                    else:
+                        await cur.execute(
+                            GAME_UPSERT_SQL,
+                            {
+                                "game_uid": game_uid,
+                                "sport_key": sport_key,
+                                "game_id": gid,
+                                "home_team": home_team,
+                                "away_team": away_team,
+                                "commence_time": commence_time,
+                            },
+                            prepare=STATEMENTS.prepare,
+                        )
+                        # rowcount isn’t reliable for upserts; we still surface totals via separate counts
+
+                    # -- markets & odds
+                    bookmakers = payload.get("bookmakers") or []
+                    for bk in bookmakers:
+                        book_key = (bk.get("key") or "").strip()
+                        book_ts = bk.get("last_update") or bk.get("lastUpdate") or payload.get("fetched_at")
+
+                        markets = bk.get("markets") or []
+                        for mk in markets:
+                            market_key = (mk.get("key") or "").strip().lower()
+                            m_ts = mk.get("last_update") or mk.get("lastUpdate") or book_ts
 
                             if dry_run:
-                                ins_odds += 1
+                                ins_markets += 1
                             else:
                                 await cur.execute(
-                                    """
-                                    INSERT INTO odds_norm.odds
-                                        (game_uid, market_key, book_key, side, price, point, last_update)
-                                    VALUES
-                                        (%(game_uid)s, %(market_key)s, %(book_key)s, %(side)s, %(price)s, %(point)s, %(last_update)s)
-                                    ON CONFLICT (game_uid, market_key, book_key, side, last_update) DO NOTHING
-                                    """,
+                                    MARKET_UPSERT_SQL,
                                     {
                                         "game_uid": game_uid,
                                         "market_key": market_key,
                                         "book_key": book_key,
-                                        "side": side,
-                                        "price": price,
-                                        "point": point,
-                                        "last_update": last_update,
+                                        "last_update": m_ts,
                                     },
+                                    prepare=STATEMENTS.prepare,
                                 )
 
+                            for oc in mk.get("outcomes") or []:
+                                if isinstance(oc, list):  # projected: [name, price, point, last_update]
+                                    name, price, point, last_update = oc
+                                    last_update = last_update or m_ts
+                                else:
+                                    name = oc.get("name")
+                                    price = oc.get("price") or oc.get("odds")
+                                    point = oc.get("point")
+                                    last_update = oc.get("last_update") or oc.get("lastUpdate") or m_ts
+
+                                side = sides.side(market_key, name or "")
+                                if not side:
+                                    unresolved += 1
+                                    continue
+
+                                if market_key in ("totals", "total", "over_under"):
+                                    # Enforce check constraint with canonical values
+                                    if side not in ("over", "under"):
+                                        continue
+
+                                if not known.observe((game_uid, market_key, book_key, side), price, point, last_update):
+                                    continue  # same price/point as the last-known quote (or an older snapshot)
+
+                                if dry_run:
+                                    ins_odds += 1
+                                else:
+                                    await cur.execute(
+                                        ODDS_INSERT_SQL,
+                                        {
+                                            "game_uid": game_uid,
+                                            "market_key": market_key,
+                                            "book_key": book_key,
+                                            "side": side,
+                                            "price": price,
+                                            "point": point,
+                                            "last_update": last_update,
+                                            "commence_time": commence_time,
+                                        },
+                                        prepare=STATEMENTS.prepare,
+                                    )
+
             if dry_run:
                 await ac.rollback()
             else:
+                await known.flush(cur)
+                await position.save(cur)
                 await ac.commit()
 
+    if not n_rows:
+        return JSONResponse(
+            {
+                "ok": True,
+                "dry_run": dry_run,
+                "limit": limit,
+                "source": {"rows": 0, "projection": projection, "stream": stream},
+                "cursor": position.stats(),
+            }
+        )
+
     return JSONResponse(
         {
             "ok": True,
             "dry_run": dry_run,
             "limit": limit,
-            "source": {"rows": len(rows)},
+            "source": {"rows": n_rows, "projection": projection, "stream": stream},
             "counts": {
                 "games": ins_games,
                 "markets": ins_markets,
                 "odds": ins_odds,
             },
+            "unresolved_outcomes": unresolved,
+            "odds_changes": known.stats(),
+            "cursor": position.stats(),
         }
     )
 
@@ -345,18 +429,40 @@ async def normalize_from_raw(
 
 @app.on_event("startup")
 async def _on_startup() -> None:
-    await _ensure_pool_open()
+    await _ensure_pool_open(wait=True)
 
 @app.on_event("shutdown")
 async def _on_shutdown() -> None:
+    shutdown_pool()  # risk simulation workers
     try:
         await pool.close()
     except Exception:
         pass
 
+
+async def _probe_db() -> None:
+    async with pool.connection() as ac, ac.cursor() as cur:
+        await cur.execute("select 1;")
+
+
+# Cached /health and /ready (registered after startup so the pool is open)
+health = HealthProber("gsa-portfolio", interval=float(os.getenv("HEALTH_INTERVAL_SECONDS", "15")))
+health.add_probe("db", _probe_db)
+health.set_pool_stats(psycopg_pool_stats(pool, STATEMENTS))
+health.install(app)
+
 # Mount admin router
+install_slow_query_log(router, path="/slow-queries", dependencies=[Depends(require_admin)])
+install_team_alias_admin(router, RESOLVER, pool, dependencies=[Depends(require_admin)])
 app.include_router(router)
 
+# Picks, bankroll, exposure and P&L from running aggregates (services/common/portfolio_ledger.py)
+install_portfolio_ledger(app, pool, STATEMENTS, dependencies=[Depends(require_admin)])
+# Monte Carlo P&L/drawdown/ruin for a slate of open picks (services/common/risk_sim.py)
+install_risk_sim(app, pool, STATEMENTS, dependencies=[Depends(require_admin)])
+# Closing-line value against odds_norm.closing_odds (services/common/clv.py, services/db/closing_odds.py)
+install_clv(app, pool, STATEMENTS, dependencies=[Depends(require_admin)])
+
 # If you need a root for sanity (non-admin), keep it simple and unauthenticated
 @app.get("/")
 async def root() -> Dict[str, Any]:
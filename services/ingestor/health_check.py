@@ -1,10 +1,13 @@
-import os, asyncio, json, httpx, asyncpg
+import os, asyncio, json, asyncpg
 from dotenv import load_dotenv
 
+from services.common.odds_api import OddsApiError, get_client
+
 load_dotenv(".env.local")
 
 ODDS_API_KEY = os.getenv("ODDS_API_KEY")
 DATABASE_URL = os.getenv("DATABASE_URL")
+ODDS_API_BASE_URL = os.getenv("ODDS_API_BASE_URL", "https://api.the-odds-api.com").rstrip("/")
 
 async def check_db():
     conn = await asyncpg.connect(DATABASE_URL)
@@ -25,12 +28,15 @@ async def check_db():
 async def check_odds_api():
     if not ODDS_API_KEY:
         return {"ok": False, "error": "ODDS_API_KEY missing"}
-    url = "https://api.the-odds-api.com/v4/sports"
-    params = {"apiKey": ODDS_API_KEY}
-    async with httpx.AsyncClient(timeout=20) as client:
-        r = await client.get(url, params=params)
-        ok = r.status_code == 200
-        return {"ok": ok, "status": r.status_code, "len": len(r.json()) if ok else None}
+    client = get_client(ODDS_API_KEY, ODDS_API_BASE_URL)
+    try:
+        res = await client.sports()
+    except OddsApiError as e:
+        return {"ok": False, "status": e.status}
+    finally:
+        await client.aclose()
+    return {"ok": True, "status": 200, "len": len(res.data), "cached": res.cached,
+            "remaining": client.ledger.remaining()}
 
 async def main():
     db = await check_db()
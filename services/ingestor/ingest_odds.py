@@ -1,13 +1,20 @@
 from .audit_compat import log_audit_compat
 import os, sys, json, hashlib, argparse, asyncio, textwrap
 from datetime import datetime, timezone
-import httpx, asyncpg
+import asyncpg
 from dotenv import load_dotenv
 
+from services.common.odds_api import QuotaExhaustedError, get_client
+from services.common.sports_catalog import discover, ensure_schema as ensure_catalog
+
 # Load local env (never commit secrets)
 load_dotenv(".env.local", override=True)
 ODDS_API_KEY = os.getenv("ODDS_API_KEY")
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Point at a local replay server (bench/odds_replay.py) to load-test without spending quota
+ODDS_API_BASE_URL = os.getenv("ODDS_API_BASE_URL", "https://api.the-odds-api.com").rstrip("/")
+# core's latest-lines board LISTENs here and refreshes (and pushes /core/stream changes) right away
+ODDS_NOTIFY_CHANNEL = os.getenv("ODDS_NOTIFY_CHANNEL", "odds_changed")
 
 DDL = """
 CREATE TABLE IF NOT EXISTS audit_logs (
@@ -40,22 +47,10 @@ def stable_hash(obj: dict) -> str:
 async def ensure_schema(conn: asyncpg.Connection):
     await conn.execute(DDL)
 
-async def fetch_odds(sport: str, regions: str, markets: str, timeout: int = 30):
-    if not ODDS_API_KEY:
-        raise RuntimeError("ODDS_API_KEY missing")
-    url = f"https://api.the-odds-api.com/v4/sports/{sport}/odds"
-    params = {
-        "apiKey": ODDS_API_KEY,
-        "regions": regions,               # e.g., "us"
-        "markets": markets,               # e.g., "h2h,spreads,totals"
-        "oddsFormat": "american",
-        "dateFormat": "iso",
-    }
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        r = await client.get(url, params=params)
-        if r.status_code != 200:
-            raise RuntimeError(f"Odds API {r.status_code}: {r.text[:300]}")
-        return r.json(), dict(r.headers)
+async def fetch_odds(sport: str, regions: str, markets: str):
+    """One /odds call through the shared client (pooled, retried, quota-checked)."""
+    res = await get_client(ODDS_API_KEY, ODDS_API_BASE_URL).odds(sport, regions, markets)
+    return res.data, res.headers
 
 async def write_batch(conn: asyncpg.Connection, sport: str, games: list, dry_run: bool):
     now = datetime.now(timezone.utc)
@@ -110,9 +105,45 @@ async def log_audit(conn: asyncpg.Connection, action: str, details: dict):
         "ingestor", action, json.dumps(details)
     )
 
+async def ingest_sport(conn: asyncpg.Connection, sport: str, args) -> dict:
+    games, hdrs = await fetch_odds(sport, args.regions, args.markets)
+    inserted, skipped = await write_batch(conn, sport, games, dry_run=bool(args.dry_run))
+    if inserted and not args.dry_run:
+        await conn.execute("SELECT pg_notify($1, $2)", ODDS_NOTIFY_CHANNEL, sport)
+    await log_audit_compat(conn, "ingest_run", {
+        "sport": sport,
+        "regions": args.regions,
+        "markets": args.markets,
+        "dry_run": bool(args.dry_run),
+        "attempted": len(games),
+        "inserted": inserted if not args.dry_run else 0,
+        "skipped": skipped if args.dry_run else 0,
+        "odds_api_remain": hdrs.get("X-Requests-Remaining"),
+        "odds_api_used": hdrs.get("X-Requests-Used"),
+    })
+    return {
+        "ok": True,
+        "attempted": len(games),
+        "inserted": inserted if not args.dry_run else 0,
+        "skipped": skipped if args.dry_run else 0,
+        "dry_run": bool(args.dry_run),
+        "sport": sport
+    }
+
+async def discover_sports(conn: asyncpg.Connection, args) -> dict:
+    """--discover: sync sports_catalog and keep the in-season sports with upcoming events."""
+    await ensure_catalog(conn)
+    return await discover(conn, get_client(ODDS_API_KEY, ODDS_API_BASE_URL),
+                          groups=args.groups.split(",") if args.groups else None,
+                          store=not args.dry_run)  # dry run: report catalog changes without storing them
+
 async def main():
     parser = argparse.ArgumentParser(description="Ingest Odds API ? odds_raw (idempotent).")
-    parser.add_argument("--sport", required=True, help="e.g., basketball_nba, americanfootball_nfl")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--sport", help="e.g., basketball_nba, americanfootball_nfl")
+    target.add_argument("--discover", action="store_true",
+                        help="every active sport with events in the next DISCOVER_HORIZON_HOURS (from sports_catalog)")
+    parser.add_argument("--groups", default=None, help="with --discover: only these catalog groups, e.g. Basketball,Soccer")
     parser.add_argument("--regions", default="us", help="Odds API regions, e.g., us")
     parser.add_argument("--markets", default="h2h,spreads,totals", help="Odds API markets list")
     parser.add_argument("--dry-run", type=int, default=1, help="1 = no DB writes, 0 = write")
@@ -122,34 +153,31 @@ async def main():
         print("DATABASE_URL missing", file=sys.stderr)
         sys.exit(2)
 
-    # Fetch odds
-    games, hdrs = await fetch_odds(args.sport, args.regions, args.markets)
-
-    # DB work
     conn = await asyncpg.connect(DATABASE_URL)
     try:
         await ensure_schema(conn)
-        inserted, skipped = await write_batch(conn, args.sport, games, dry_run=bool(args.dry_run))
-        await log_audit_compat(conn, "ingest_run", {
-            "sport": args.sport,
-            "regions": args.regions,
-            "markets": args.markets,
-            "dry_run": bool(args.dry_run),
-            "attempted": len(games),
-            "inserted": inserted if not args.dry_run else 0,
-            "skipped": skipped if args.dry_run else 0,
-            "odds_api_remain": hdrs.get("X-Requests-Remaining"),
-            "odds_api_used": hdrs.get("X-Requests-Used"),
-        })
+        if args.sport:
+            print(json.dumps(await ingest_sport(conn, args.sport, args), indent=2))
+            return
+        found = await discover_sports(conn, args)
+        results = []
+        for sport in found["sports"]:
+            try:
+                results.append(await ingest_sport(conn, sport, args))
+            except QuotaExhaustedError as e:
+                results.append({"ok": False, "sport": sport, "error": str(e)})
+                break  # every later sport would be refused too
+            except Exception as e:
+                results.append({"ok": False, "sport": sport, "error": str(e)})
         print(json.dumps({
-            "ok": True,
-            "attempted": len(games),
-            "inserted": inserted if not args.dry_run else 0,
-            "skipped": skipped if args.dry_run else 0,
+            "ok": all(r["ok"] for r in results),
+            "sports": results,
+            "skipped": found["skipped"],
+            "catalog": found["catalog"],
             "dry_run": bool(args.dry_run),
-            "sport": args.sport
         }, indent=2))
     finally:
+        await get_client(ODDS_API_KEY, ODDS_API_BASE_URL).aclose()
         await conn.close()
 
 if __name__ == "__main__":
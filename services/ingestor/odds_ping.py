@@ -1,12 +1,23 @@
-import os, json, httpx
+import os, json, asyncio
 from dotenv import load_dotenv
 
+from services.common.odds_api import OddsApiError, get_client
+
 load_dotenv(".env.local", override=True)
 k = os.getenv("ODDS_API_KEY") or ""
 if not k:
     raise SystemExit("ODDS_API_KEY missing")
 
-url = "https://api.the-odds-api.com/v4/sports"
-with httpx.Client(timeout=20) as c:
-    r = c.get(url, params={"apiKey": k})
-print(json.dumps({"status": r.status_code, "ok": r.status_code == 200, "sample": r.json()[:2] if r.status_code==200 else r.text[:200]}, indent=2))
+base = os.getenv("ODDS_API_BASE_URL", "https://api.the-odds-api.com").rstrip("/")
+
+async def ping():
+    client = get_client(k, base)
+    try:
+        res = await client.sports()
+    except OddsApiError as e:
+        return {"status": e.status, "ok": False, "sample": str(e)[:200]}
+    finally:
+        await client.aclose()
+    return {"status": 200, "ok": True, "cached": res.cached, "sample": res.data[:2]}
+
+print(json.dumps(asyncio.run(ping()), indent=2))
@@ -0,0 +1,45 @@
+import math
+
+from services.backtest.engine import grade
+
+
+def _picks(game_uid, league, rows):
+    return {
+        "game_uid": [game_uid] * len(rows),
+        "league": [league] * len(rows),
+        "market_key": [m for m, _, _ in rows],
+        "outcome": [o for _, o, _ in rows],
+        "point": [p for _, _, p in rows],
+        "price": [100] * len(rows),
+        "stake": [10] * len(rows),
+    }
+
+
+def test_two_way_moneyline_draw_is_a_push():
+    picks = _picks("nfl:1", "americanfootball_nfl", [("h2h", "home", None), ("h2h", "away", None)])
+    g = grade(picks, {"nfl:1": (20, 20)})
+    assert list(g["result"]) == [0, 0]
+    assert list(g["profit"]) == [0, 0]
+
+
+def test_three_way_moneyline_draw_loses_home_and_away():
+    picks = _picks("epl:1", "soccer_epl", [("h2h", "home", None), ("h2h", "away", None), ("h2h", "draw", None)])
+    g = grade(picks, {"epl:1": (1, 1)})
+    assert list(g["result"]) == [-1, -1, 1]
+    assert list(g["profit"]) == [-10, -10, 10]
+
+
+def test_three_way_detected_from_a_draw_pick():
+    picks = _picks("x:1", "unknown_league", [("h2h", "home", None), ("h2h", "draw", None)])
+    assert list(grade(picks, {"x:1": (0, 0)})["result"]) == [-1, 1]
+
+
+def test_three_way_decided_game_and_spreads():
+    picks = _picks("epl:2", "soccer_epl", [("h2h", "home", None), ("h2h", "away", None), ("spreads", "away", 0.0)])
+    g = grade(picks, {"epl:2": (2, 1)})
+    assert list(g["result"]) == [1, -1, -1]
+
+
+def test_unsettled_game():
+    picks = _picks("epl:3", "soccer_epl", [("h2h", "home", None)])
+    assert math.isnan(grade(picks, {})["result"][0])
@@ -0,0 +1,42 @@
+import asyncio
+
+import httpx
+
+from services.common.service_client import ServiceClient
+
+
+def _client(max_entries):
+    client = ServiceClient("http://upstream", cache_ttl=60, max_cache_entries=max_entries)
+    client._client = httpx.AsyncClient(
+        base_url=client.base_url,
+        transport=httpx.MockTransport(lambda req: httpx.Response(200, json={"path": req.url.path})),
+    )
+    return client
+
+
+def test_cache_stays_within_bound_when_entries_are_fresh():
+    async def run():
+        client = _client(3)
+        for i in range(5):
+            await client.get_json(f"/r{i}", ttl=60 + i)
+        await client.aclose()
+        return client
+
+    client = asyncio.run(run())
+    # the entries expiring soonest were dropped
+    assert sorted(p for p, _ in client._cache) == ["/r2", "/r3", "/r4"]
+
+
+def test_refreshing_an_expired_key_evicts_nothing():
+    async def run():
+        client = _client(2)
+        await client.get_json("/a")
+        await client.get_json("/b")
+        client._cache[("/a", ())] = (0.0, {"path": "/a"})  # expired: the next get refetches it
+        result = await client.get_json("/a")
+        await client.aclose()
+        return client, result
+
+    client, result = asyncio.run(run())
+    assert not result.cached
+    assert sorted(p for p, _ in client._cache) == ["/a", "/b"]
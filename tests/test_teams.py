@@ -0,0 +1,22 @@
+from services.common.teams import TeamResolver
+
+
+def _game(resolver):
+    return resolver.game("soccer_epl", "epl:1", "Arsenal FC", "Chelsea FC")
+
+
+def test_h2h_draw_resolves_without_a_miss():
+    resolver = TeamResolver(ttl=300)
+    sides = _game(resolver)
+    assert sides.side("h2h", "Draw") == "draw"
+    assert sides.side("h2h", "Arsenal FC") == "home"
+    assert sides.side("h2h", "Chelsea FC") == "away"
+    assert resolver.unresolved() == []
+
+
+def test_draw_outside_h2h_is_still_a_miss():
+    resolver = TeamResolver(ttl=300)
+    sides = _game(resolver)
+    assert sides.side("spreads", "Draw") is None
+    assert sides.side("h2h", "Tottenham") is None
+    assert {(e["market_key"], e["name"]) for e in resolver.unresolved()} == {("spreads", "Draw"), ("h2h", "Tottenham")}